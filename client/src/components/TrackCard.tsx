@@ -8,6 +8,8 @@ export const TrackCard = ({ track }: { track: Track }) => {
                 <img
                     src={track.image_url}
                     alt={track.name}
+                    loading="lazy"
+                    decoding="async"
                     className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-105"
                 />
                 <a
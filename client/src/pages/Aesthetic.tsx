@@ -71,7 +71,7 @@ export function Aesthetic() {
         try {
             const res = await axios.get(`${API_URL}/features/aesthetic`, {
                 headers: { Authorization: `Bearer ${token}` },
-                params: { style: selectedAesthetic.name }
+                params: { style: selectedAesthetic.name, img_size: 300 }
             });
             setTracks(res.data);
             setHasGenerated(true);
@@ -26,7 +26,8 @@ export function AlternateYou() {
 
         try {
             const res = await axios.get(`${API_URL}/features/alternate`, {
-                headers: { Authorization: `Bearer ${token}` }
+                headers: { Authorization: `Bearer ${token}` },
+                params: { img_size: 300 }
             });
             setTracks(res.data);
             setHasSimulated(true);
@@ -77,7 +77,8 @@ export function Dashboard() {
 
             try {
                 const res = await axios.get(`${API_URL}/dashboard/stats`, {
-                    headers: { Authorization: `Bearer ${token}` }
+                    headers: { Authorization: `Bearer ${token}` },
+                    params: { img_size: 300 }
                 });
                 setStats(res.data);
             } catch (err: any) {
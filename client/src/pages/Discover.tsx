@@ -19,6 +19,9 @@ export function Discover() {
     const [tracks, setTracks] = useState<Track[]>([]);
     const [loading, setLoading] = useState(false);
     const [hasGenerated, setHasGenerated] = useState(false);
+    // Cursor for the next page of this feed (served from the server-side pool, no re-ranking)
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     const generateRecommendations = async () => {
         setLoading(true);
@@ -26,9 +29,11 @@ export function Discover() {
 
         try {
             const res = await axios.get(`${API_URL}/features/discover`, {
-                headers: { Authorization: `Bearer ${token}` }
+                headers: { Authorization: `Bearer ${token}` },
+                params: { img_size: 300 }
             });
             setTracks(res.data);
+            setNextCursor(res.headers['x-next-cursor'] || null);
             setHasGenerated(true);
         } catch (err) {
             console.error('Failed to get recommendations:', err);
@@ -37,6 +42,27 @@ export function Discover() {
         }
     };
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        const token = localStorage.getItem('spotify_token');
+
+        try {
+            const res = await axios.get(`${API_URL}/features/discover`, {
+                headers: { Authorization: `Bearer ${token}` },
+                params: { img_size: 300, cursor: nextCursor }
+            });
+            setTracks(prev => [...prev, ...res.data]);
+            setNextCursor(res.headers['x-next-cursor'] || null);
+        } catch (err: any) {
+            // 410: the pool expired, so the next Generate starts a fresh feed
+            setNextCursor(null);
+            console.error('Failed to load more recommendations:', err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     return (
         <div className="min-h-screen bg-black text-white flex">
             <Sidebar />
@@ -87,6 +113,18 @@ export function Discover() {
                     >
                         <h2 className="text-2xl font-bold mb-6">Your Personalized Picks</h2>
                         <TrackGrid tracks={tracks} loading={loading} emptyMessage="No recommendations found. Try again!" />
+                        {nextCursor && !loading && (
+                            <div className="flex justify-center mt-8">
+                                <button
+                                    onClick={loadMore}
+                                    disabled={loadingMore}
+                                    className="flex items-center gap-2 border border-white/20 hover:border-spotify text-white py-3 px-6 rounded-full transition-all disabled:opacity-50"
+                                >
+                                    {loadingMore && <RefreshCw className="animate-spin" size={16} />}
+                                    {loadingMore ? 'Loading...' : 'Load more'}
+                                </button>
+                            </div>
+                        )}
                     </motion.div>
                 )}
 
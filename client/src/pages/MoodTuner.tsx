@@ -1,11 +1,12 @@
-import { useState } from 'react';
-import axios from 'axios';
+import { useEffect, useRef, useState } from 'react';
 import { motion } from 'framer-motion';
 import { Radio, Smile, Frown, Zap, Moon } from 'lucide-react';
 import { Sidebar } from '../components/Sidebar';
 import { TrackGrid } from '../components/TrackGrid';
 
 const API_URL = 'https://sonicdiscoveryupdate.onrender.com';
+// Live session: the pool is fetched once, every slider move is re-ranked server-side
+const WS_URL = `${API_URL.replace(/^http/, 'ws')}/ws/mood?img_size=300`;
 
 interface Track {
     id: string;
@@ -21,25 +22,45 @@ export function MoodTuner() {
     const [tracks, setTracks] = useState<Track[]>([]);
     const [loading, setLoading] = useState(false);
     const [hasTuned, setHasTuned] = useState(false);
+    const socket = useRef<WebSocket | null>(null);
 
-    const tuneIn = async () => {
+    const tuneIn = () => {
+        socket.current?.close();
         setLoading(true);
-        const token = localStorage.getItem('spotify_token');
-
-        try {
-            const res = await axios.get(`${API_URL}/features/mood`, {
-                headers: { Authorization: `Bearer ${token}` },
-                params: { valence, energy }
-            });
-            setTracks(res.data);
-            setHasTuned(true);
-        } catch (err) {
-            console.error('Failed to tune mood:', err);
-        } finally {
+        const ws = new WebSocket(WS_URL);
+        socket.current = ws;
+
+        ws.onopen = () => {
+            const token = localStorage.getItem('spotify_token');
+            ws.send(JSON.stringify({ token, valence, energy }));
+        };
+        ws.onmessage = (event) => {
+            const msg = JSON.parse(event.data);
+            if (msg.type === 'tracks') {
+                setTracks(msg.tracks);
+                setHasTuned(true);
+                setLoading(false);
+            } else if (msg.type === 'error') {
+                console.error('Mood tuner error:', msg.detail);
+            }
+        };
+        ws.onerror = (err) => console.error('Failed to tune mood:', err);
+        ws.onclose = () => {
             setLoading(false);
-        }
+            if (socket.current === ws) socket.current = null;
+        };
     };
 
+    // Once tuned in, slider moves go straight to the open session
+    useEffect(() => {
+        const ws = socket.current;
+        if (ws && ws.readyState === WebSocket.OPEN) {
+            ws.send(JSON.stringify({ valence, energy }));
+        }
+    }, [valence, energy]);
+
+    useEffect(() => () => socket.current?.close(), []);
+
     const getMoodEmoji = () => {
         if (valence > 0.7 && energy > 0.7) return '🔥';
         if (valence > 0.7 && energy < 0.3) return '😌';
@@ -153,7 +174,7 @@ export function MoodTuner() {
                             className="flex items-center gap-3 bg-gradient-to-r from-purple-500 to-pink-500 hover:from-purple-400 hover:to-pink-400 text-white font-bold py-4 px-8 rounded-full transition-all disabled:opacity-50 shadow-lg"
                         >
                             <Radio size={20} />
-                            {loading ? 'Tuning...' : 'Tune In'}
+                            {loading ? 'Tuning...' : hasTuned ? 'Refresh Mix' : 'Tune In'}
                         </motion.button>
                     </div>
                 </motion.div>
@@ -38,7 +38,7 @@ export function TimeTravel() {
         try {
             const res = await axios.get(`${API_URL}/features/time-travel`, {
                 headers: { Authorization: `Bearer ${token}` },
-                params: { year: decade.year }
+                params: { year: decade.year, img_size: 300 }
             });
             setTracks(res.data);
             setHasWarped(true);
@@ -52,7 +52,7 @@ export function VibeTeleporter() {
         try {
             const res = await axios.get(`${API_URL}/features/vibe`, {
                 headers: { Authorization: `Bearer ${token}` },
-                params: { location, weather, time }
+                params: { location, weather, time, img_size: 300 }
             });
             setTracks(res.data);
             setHasTeleported(true);
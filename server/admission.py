@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Routes that must stay reachable when the data routes are saturated
+AUTH_PATHS = ('/login', '/callback', '/logout')
+# Anonymous, shared-cache routes: a page of <img> tags must not trip the per-user cap
+UNMETERED_USER_PATHS = ('/img',)
+
+
+class AdmissionController:
+    """
+    Admission control for the sync route handlers, which all share Starlette's
+    fixed threadpool.
+
+    A request is admitted only if all of these have room:
+    - the shared pool (`capacity - reserved_auth` slots; auth routes may also use
+      the `reserved_auth` slots nobody else can touch)
+    - its route group's concurrency limit (longest matching path prefix)
+    - the caller's per-user in-flight cap
+    Otherwise it waits in a bounded queue for up to `queue_timeout` seconds. When
+    the queue is full or the wait times out it is rejected immediately with a 503
+    (429 for a per-user cap) and a Retry-After header, so latency stays bounded
+    under spikes instead of piling up in the threadpool.
+    """
+
+    def __init__(self, capacity=32, reserved_auth=4, route_limits=None, per_user=4,
+                 queue_size=64, queue_timeout=2.0, retry_after=2):
+        self.capacity = capacity
+        self.reserved_auth = reserved_auth
+        self.route_limits = route_limits if route_limits is not None else {
+            '/features/': 12,
+            '/dashboard/': 16,
+            '/playlists/': 4,
+            '/snapshot/': 2,
+            '/img': 8,
+            '/model/': 2,
+        }
+        self.per_user = per_user
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self.in_flight = 0
+        self.auth_in_flight = 0
+        self.route_in_flight = {}
+        self.user_in_flight = {}
+        self.waiting = 0
+        # Plain lock + per-waiter events woken thread-safely, so the controller
+        # doesn't care which event loop (or how many) it's used from
+        self._lock = threading.Lock()
+        self._waiters = []
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            capacity=int(os.getenv("ADMISSION_CAPACITY", 32)),
+            reserved_auth=int(os.getenv("ADMISSION_RESERVED_AUTH", 4)),
+            per_user=int(os.getenv("ADMISSION_PER_USER", 4)),
+            queue_size=int(os.getenv("ADMISSION_QUEUE_SIZE", 64)),
+            queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 2.0)),
+        )
+
+    def _route_group(self, path):
+        matches = [p for p in self.route_limits if path.startswith(p)]
+        return max(matches, key=len) if matches else None
+
+    def _blocker(self, is_auth, group, user):
+        """Why the request can't run right now (None if it can)."""
+        shared_in_use = self.in_flight - min(self.auth_in_flight, self.reserved_auth)
+        shared_free = shared_in_use < self.capacity - self.reserved_auth
+        auth_free = is_auth and self.auth_in_flight < self.reserved_auth
+        if not (shared_free or auth_free):
+            return 'capacity'
+        if group and self.route_in_flight.get(group, 0) >= self.route_limits[group]:
+            return 'route'
+        if user and self.user_in_flight.get(user, 0) >= self.per_user:
+            return 'user'
+        return None
+
+    def _take(self, is_auth, group, user):
+        self.in_flight += 1
+        if is_auth:
+            self.auth_in_flight += 1
+        if group:
+            self.route_in_flight[group] = self.route_in_flight.get(group, 0) + 1
+        if user:
+            self.user_in_flight[user] = self.user_in_flight.get(user, 0) + 1
+
+    def _give_back(self, is_auth, group, user):
+        self.in_flight -= 1
+        if is_auth:
+            self.auth_in_flight -= 1
+        if group:
+            self.route_in_flight[group] -= 1
+        if user:
+            self.user_in_flight[user] -= 1
+            if not self.user_in_flight[user]:
+                del self.user_in_flight[user]
+
+    async def acquire(self, path, user):
+        """Returns (ticket, None) when admitted, or (None, reason) when rejected."""
+        is_auth = path in AUTH_PATHS
+        group = None if is_auth else self._route_group(path)
+        with self._lock:
+            reason = self._blocker(is_auth, group, user)
+            if reason is None:
+                self._take(is_auth, group, user)
+                return (is_auth, group, user), None
+            if self.waiting >= self.queue_size:
+                return None, reason
+            waiter = (asyncio.get_running_loop(), asyncio.Event())
+            self._waiters.append(waiter)
+            self.waiting += 1
+
+        deadline = time.monotonic() + self.queue_timeout
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    try:
+                        await asyncio.wait_for(waiter[1].wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+                waiter[1].clear()
+                with self._lock:
+                    reason = self._blocker(is_auth, group, user)
+                    if reason is None:
+                        self._take(is_auth, group, user)
+                        return (is_auth, group, user), None
+                if time.monotonic() >= deadline:
+                    return None, reason
+        finally:
+            with self._lock:
+                self._waiters.remove(waiter)
+                self.waiting -= 1
+
+    def release(self, ticket):
+        with self._lock:
+            self._give_back(*ticket)
+            for loop, event in self._waiters:
+                loop.call_soon_threadsafe(event.set)
+
+
+def _user_key(scope):
+    """Caller identity from the bearer token or spotify_token cookie (hashed)."""
+    token = None
+    for name, value in scope.get('headers', []):
+        if name == b'authorization' and value.startswith(b'Bearer '):
+            token = value[7:]
+            break
+        if name == b'cookie':
+            for part in value.split(b';'):
+                k, _, v = part.strip().partition(b'=')
+                if k == b'spotify_token':
+                    token = v
+    return hashlib.sha256(token).hexdigest()[:16] if token else None
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying an AdmissionController to HTTP requests."""
+
+    def __init__(self, app, controller=None):
+        self.app = app
+        self.controller = controller or AdmissionController.from_env()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] == 'OPTIONS':
+            await self.app(scope, receive, send)
+            return
+
+        user = None if scope['path'].startswith(UNMETERED_USER_PATHS) else _user_key(scope)
+        ticket, reason = await self.controller.acquire(scope['path'], user)
+        if ticket is None:
+            await self._reject(send, reason)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(ticket)
+
+    async def _reject(self, send, reason):
+        status = 429 if reason == 'user' else 503
+        body = json.dumps({"detail": "Too many requests in flight" if status == 429 else "Server busy, retry shortly"}).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'retry-after', str(self.controller.retry_after).encode()),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
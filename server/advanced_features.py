@@ -1,5 +1,7 @@
 import random
 
+from genre_index import genre_index
+
 class AdvancedFeatureEngine:
     def __init__(self, spotify_client):
         self.client = spotify_client
@@ -75,14 +77,12 @@ class AdvancedFeatureEngine:
         # List of distinct genres to pick from if they are NOT in top_genres
         all_genres = ["classical", "metal", "country", "jazz", "techno", "reggae", "k-pop", "opera", "blues", "dubstep"]
         
-        # Find genres the user DOESN'T listen to
-        user_genres_str = " ".join([g[0] for g in top_genres]).lower()
-        anti_genres = [g for g in all_genres if g not in user_genres_str]
-        
+        # Rank candidates by genre distance from the user's (micro-)genres, farthest first
+        anti_genres = genre_index.anti_genres(top_genres, all_genres, n=4)
         if not anti_genres:
             anti_genres = all_genres # Fallback
             
-        # Pick 2 random anti-genres
+        # Pick 2 random anti-genres from the most distant ones
         seed_genres = random.sample(anti_genres, min(2, len(anti_genres)))
         
         params = {
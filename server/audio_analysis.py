@@ -0,0 +1,205 @@
+import io
+import shutil
+import subprocess
+import wave
+from functools import lru_cache
+
+import numpy as np
+
+# Analysis settings. These are this module's own choices (40 HTK-formula mel bands,
+# unlike librosa's 128 Slaney bands), so vectors are only comparable with each other.
+SAMPLE_RATE = 22050
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 40
+N_MFCC = 13
+ROLLOFF_PERCENT = 0.85
+
+# 13 MFCC + 1 Centroid + 1 Rolloff = 15 features
+N_FEATURES = N_MFCC + 2
+
+
+def decode_audio(data, sr=SAMPLE_RATE):
+    """
+    Decodes an in-memory audio file into a mono float32 signal at `sr`.
+    WAV is decoded with the standard library; anything else (Spotify previews
+    are MP3) is piped through ffmpeg when it is installed. Nothing touches disk.
+    Returns None if the payload can't be decoded.
+    """
+    if not data:
+        return None
+
+    if data[:4] == b'RIFF' and data[8:12] == b'WAVE':
+        decoded = _decode_wav(data)
+        if decoded is None:
+            return None
+        y, orig_sr = decoded
+        return _resample(y, orig_sr, sr)
+
+    return _decode_ffmpeg(data, sr)
+
+
+def _decode_wav(data):
+    try:
+        with wave.open(io.BytesIO(data), 'rb') as wav:
+            n_channels = wav.getnchannels()
+            sample_width = wav.getsampwidth()
+            orig_sr = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError) as e:
+        print(f"Error decoding WAV: {e}")
+        return None
+
+    if sample_width == 1:
+        y = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        y = np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        y = ints.astype(np.float32) / 8388608.0
+    elif sample_width == 4:
+        y = np.frombuffer(frames, dtype='<i4').astype(np.float32) / 2147483648.0
+    else:
+        print(f"Unsupported WAV sample width: {sample_width}")
+        return None
+
+    if n_channels > 1:
+        y = y[:len(y) - len(y) % n_channels].reshape(-1, n_channels).mean(axis=1)
+    return y, orig_sr
+
+
+def _decode_ffmpeg(data, sr):
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        _warn_no_ffmpeg()
+        return None
+    try:
+        proc = subprocess.run(
+            [ffmpeg, '-v', 'quiet', '-i', 'pipe:0', '-f', 'f32le', '-ac', '1', '-ar', str(sr), 'pipe:1'],
+            input=data, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=30, check=True
+        )
+    except (subprocess.SubprocessError, OSError) as e:
+        print(f"Error decoding audio with ffmpeg: {e}")
+        return None
+    y = np.frombuffer(proc.stdout, dtype='<f4')
+    if not len(y):
+        print("ffmpeg decoded no audio samples")
+        return None
+    return y
+
+
+@lru_cache(maxsize=1)
+def _warn_no_ffmpeg():
+    # Once per process: without ffmpeg every MP3 preview analyses as a zero vector
+    print("ffmpeg not found on PATH; MP3 previews can't be decoded (audio features will be zeros)")
+
+
+def _resample(y, orig_sr, sr):
+    """Linear-interpolation resampler; good enough for MFCC-level features."""
+    if orig_sr == sr or len(y) == 0:
+        return y.astype(np.float32)
+    duration = len(y) / orig_sr
+    n_out = int(round(duration * sr))
+    t_out = np.arange(n_out) / sr
+    t_in = np.arange(len(y)) / orig_sr
+    return np.interp(t_out, t_in, y).astype(np.float32)
+
+
+@lru_cache(maxsize=8)
+def _hann_window(n_fft):
+    return np.hanning(n_fft + 1)[:-1].astype(np.float32)
+
+
+@lru_cache(maxsize=8)
+def _mel_filterbank(sr, n_fft, n_mels):
+    """HTK-style triangular mel filterbank, shape (n_mels, n_fft // 2 + 1)."""
+    def hz_to_mel(f):
+        return 2595.0 * np.log10(1.0 + f / 700.0)
+
+    def mel_to_hz(m):
+        return 700.0 * (10.0 ** (m / 2595.0) - 1.0)
+
+    fft_freqs = np.linspace(0, sr / 2, n_fft // 2 + 1)
+    mel_points = np.linspace(hz_to_mel(0.0), hz_to_mel(sr / 2), n_mels + 2)
+    hz_points = mel_to_hz(mel_points)
+
+    lower = hz_points[:-2, None]
+    center = hz_points[1:-1, None]
+    upper = hz_points[2:, None]
+    up_slope = (fft_freqs[None, :] - lower) / (center - lower)
+    down_slope = (upper - fft_freqs[None, :]) / (upper - center)
+    weights = np.maximum(0.0, np.minimum(up_slope, down_slope))
+
+    # Area-normalize each band
+    weights *= (2.0 / (upper - lower))
+    return weights.astype(np.float32)
+
+
+@lru_cache(maxsize=8)
+def _dct_matrix(n_mfcc, n_mels):
+    """Orthonormal DCT-II basis, shape (n_mfcc, n_mels)."""
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)[:, None]
+    basis = np.cos(np.pi * k * (2 * n + 1) / (2 * n_mels))
+    basis[0] *= np.sqrt(1.0 / n_mels)
+    basis[1:] *= np.sqrt(2.0 / n_mels)
+    return basis.astype(np.float32)
+
+
+def _power_spectrogram(y, n_fft=N_FFT, hop_length=HOP_LENGTH):
+    """Centered STFT power spectrogram, shape (n_fft // 2 + 1, n_frames)."""
+    y = np.pad(y, n_fft // 2, mode='reflect') if len(y) > n_fft // 2 else np.pad(y, n_fft // 2)
+    if len(y) < n_fft:
+        y = np.pad(y, (0, n_fft - len(y)))
+    n_frames = 1 + (len(y) - n_fft) // hop_length
+    frames = np.lib.stride_tricks.as_strided(
+        y, shape=(n_frames, n_fft), strides=(y.strides[0] * hop_length, y.strides[0])
+    )
+    spectrum = np.fft.rfft(frames * _hann_window(n_fft), axis=1)
+    return (np.abs(spectrum) ** 2).T
+
+
+def extract_features(y, sr=SAMPLE_RATE):
+    """
+    Computes the 15-dim timbre vector for a mono signal:
+    mean of 13 MFCCs, mean spectral centroid (Hz) and mean spectral rolloff (Hz).
+    """
+    y = np.ascontiguousarray(y, dtype=np.float32)
+    if len(y) == 0 or not np.any(y):
+        return np.zeros(N_FEATURES)
+
+    power = _power_spectrogram(y)
+    magnitude = np.sqrt(power)
+    freqs = np.linspace(0, sr / 2, power.shape[0])
+
+    # MFCC: log-mel energies projected onto the DCT basis
+    mel = _mel_filterbank(sr, N_FFT, N_MELS) @ power
+    log_mel = 10.0 * np.log10(np.maximum(mel, 1e-10))
+    log_mel = np.maximum(log_mel, log_mel.max() - 80.0)
+    mfcc = _dct_matrix(N_MFCC, N_MELS) @ log_mel
+
+    # Spectral centroid: magnitude-weighted mean frequency per frame
+    frame_energy = magnitude.sum(axis=0)
+    safe_energy = np.where(frame_energy > 0, frame_energy, 1.0)
+    centroid = (freqs[:, None] * magnitude).sum(axis=0) / safe_energy
+
+    # Spectral rolloff: frequency below which ROLLOFF_PERCENT of the energy sits
+    cumulative = np.cumsum(magnitude, axis=0)
+    threshold = ROLLOFF_PERCENT * cumulative[-1]
+    rolloff_idx = np.argmax(cumulative >= threshold[None, :], axis=0)
+    rolloff = freqs[rolloff_idx]
+
+    return np.concatenate([mfcc.mean(axis=1), [centroid.mean()], [rolloff.mean()]]).astype(np.float64)
+
+
+def analyze_bytes(data):
+    """
+    Decode + extract in one call. Top-level so it can be shipped to a process pool.
+    Returns a 15-dim vector, or None if the audio couldn't be decoded.
+    """
+    y = decode_audio(data)
+    if y is None:
+        return None
+    return extract_features(y)
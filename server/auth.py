@@ -1,12 +1,110 @@
 import os
+import threading
+import time
+
+import requests
 import spotipy
-from spotipy.oauth2 import SpotifyOAuth
+from requests.adapters import HTTPAdapter
+from spotipy.cache_handler import MemoryCacheHandler
+from spotipy.exceptions import SpotifyException
+from spotipy.oauth2 import SpotifyOAuth, SpotifyClientCredentials
 from dotenv import load_dotenv
 
 # Load .env from project root (parent of server/)
 env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
 load_dotenv(env_path)
 
+# App-token (client credentials) traffic: one connection pool and one rate budget per process
+APP_POOL_SIZE = int(os.getenv("SPOTIFY_APP_POOL_SIZE", 32))
+APP_RATE = float(os.getenv("SPOTIFY_APP_RATE", 20))  # requests per second
+APP_BURST = int(os.getenv("SPOTIFY_APP_BURST", 40))
+
+
+class RateBudgetExceeded(Exception):
+    pass
+
+
+class RateBudget:
+    """Token bucket shared by every app-token call in the process; a 429 pauses it for Retry-After."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout):
+        """Takes one token, waiting up to `timeout` seconds. Returns False if none came free in time."""
+        give_up = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            if now + wait > give_up:
+                return False
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class AppSpotify(spotipy.Spotify):
+    """
+    spotipy client on the shared app token. Instances are cheap (one per
+    background job or client); they all share the token, the connection pool
+    and the rate budget.
+    """
+
+    def __init__(self, shared):
+        self._shared = shared
+        super().__init__(auth_manager=shared['auth'], requests_session=shared['session'], status_retries=0)
+
+    def __del__(self):
+        # spotipy closes its session on collection; this one is the process-wide pool
+        pass
+
+    def fresh(self):
+        """Another client on the same shared token, pool and budget."""
+        return AppSpotify(self._shared)
+
+    def _internal_call(self, method, url, payload, params):
+        timeout = self.requests_timeout if isinstance(self.requests_timeout, (int, float)) else 5
+        if not self._shared['budget'].acquire(timeout):
+            raise RateBudgetExceeded(f"App rate budget exhausted ({APP_RATE}/s)")
+        try:
+            return super()._internal_call(method, url, payload, params)
+        except SpotifyException as e:
+            if e.http_status == 429:
+                retry_after = (e.headers or {}).get('Retry-After', '1')
+                self._shared['budget'].pause(int(retry_after) if str(retry_after).isdigit() else 1)
+            raise
+
+
+_app_shared = None
+_app_lock = threading.Lock()
+
+
+def _shared_app_context(client_id, client_secret):
+    global _app_shared
+    with _app_lock:
+        if _app_shared is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=APP_POOL_SIZE)
+            session.mount('https://', adapter)
+            # The token lives in memory only: it grants no user data, and workers each fetch their own
+            auth = SpotifyClientCredentials(client_id=client_id, client_secret=client_secret,
+                                            cache_handler=MemoryCacheHandler())
+            _app_shared = {'session': session, 'auth': auth, 'budget': RateBudget(APP_RATE, APP_BURST)}
+        return _app_shared
+
 class SpotifyAuthenticator:
     """
     Handles Spotify Authentication using Authorization Code Flow.
@@ -46,3 +144,16 @@ class SpotifyAuthenticator:
     def get_spotify_client(self, token_info):
         """Returns a spotipy client instance."""
         return spotipy.Spotify(auth=token_info['access_token'])
+
+    @staticmethod
+    def get_app_client():
+        """
+        Returns a spotipy client authenticated as the app itself (client credentials),
+        for catalog calls that don't depend on any user. Only needs the client ID and
+        secret; raises ValueError without them.
+        """
+        client_id = os.getenv("SPOTIPY_CLIENT_ID")
+        client_secret = os.getenv("SPOTIPY_CLIENT_SECRET")
+        if not client_id or not client_secret:
+            raise ValueError("Missing Spotify client credentials in .env file")
+        return AppSpotify(_shared_app_context(client_id, client_secret))
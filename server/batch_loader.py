@@ -0,0 +1,107 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# kind -> (spotipy bulk method, max IDs per call, key of the result list in the response or None)
+BULK_ENDPOINTS = {
+    'tracks': ('tracks', 50, 'tracks'),
+    'artists': ('artists', 50, 'artists'),
+    'audio_features': ('audio_features', 100, None),
+}
+# How long bulk results stay in the shared catalog cache, per kind
+SHARED_TTLS = {'tracks': 24 * 3600, 'artists': 24 * 3600, 'audio_features': 7 * 24 * 3600}
+# How long a waiting caller lets other threads add IDs to the batch before it's sent
+BATCH_WINDOW = 0.002  # seconds
+MAX_PARALLEL_CHUNKS = 4
+
+
+class BatchLoader:
+    """
+    Request-scoped DataLoader for Spotify catalog lookups. Single-ID lookups
+    (from any thread) are queued and sent as the fewest bulk calls possible;
+    every caller gets its own item back, and results are memoised for the
+    rest of the request. Unknown IDs and failed chunks resolve to None.
+
+    `prime` only queues IDs; nothing is sent until someone waits on a result,
+    so IDs that turn out not to be needed cost nothing if nobody asks.
+
+    With a `shared_cache` (app-token lookups, identical for every user), items
+    are also read from and written to it, so they're fetched once per process.
+    """
+
+    def __init__(self, sp, window=BATCH_WINDOW, shared_cache=None):
+        self.sp = sp
+        self.window = window
+        self.shared_cache = shared_cache
+        self._lock = threading.Lock()
+        self._futures = {kind: {} for kind in BULK_ENDPOINTS}
+        self._pending = {kind: [] for kind in BULK_ENDPOINTS}
+        self._opened_at = {}
+        self.calls = 0
+        # Bulk calls that failed (their IDs resolved to None, indistinguishable from unknown IDs)
+        self.failures = 0
+
+    def prime(self, kind, ids):
+        """Queues IDs without waiting for them. Returns their futures."""
+        with self._lock:
+            return [self._enqueue(kind, i) for i in ids]
+
+    def _enqueue(self, kind, item_id):
+        future = self._futures[kind].get(item_id)
+        if future is None:
+            future = self._futures[kind][item_id] = Future()
+            shared = self.shared_cache.get(f"{kind}:{item_id}") if self.shared_cache else None
+            if shared is not None:
+                future.set_result(shared)
+                return future
+            if not self._pending[kind]:
+                self._opened_at[kind] = time.monotonic()
+            self._pending[kind].append(item_id)
+        return future
+
+    def get(self, kind, item_id):
+        return self.get_many(kind, [item_id])[0]
+
+    def get_many(self, kind, ids):
+        """Items for `ids`, in order (None where Spotify has nothing)."""
+        futures = self.prime(kind, ids)
+        if not all(f.done() for f in futures):
+            wait = self.window - (time.monotonic() - self._opened_at.get(kind, 0.0))
+            if wait > 0:
+                time.sleep(wait)
+            self._dispatch(kind)
+        return [f.result() for f in futures]
+
+    def _dispatch(self, kind):
+        # Take everything queued so far; IDs another thread already took resolve through its dispatch
+        with self._lock:
+            ids, self._pending[kind] = self._pending[kind], []
+            futures = [self._futures[kind][i] for i in ids]
+        if not ids:
+            return
+        _, size, _ = BULK_ENDPOINTS[kind]
+        chunks = [(ids[i:i + size], futures[i:i + size]) for i in range(0, len(ids), size)]
+        if len(chunks) == 1:
+            self._fetch(kind, *chunks[0])
+        else:
+            with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_CHUNKS, len(chunks))) as pool:
+                list(pool.map(lambda chunk: self._fetch(kind, *chunk), chunks))
+
+    def _fetch(self, kind, ids, futures):
+        method, _, key = BULK_ENDPOINTS[kind]
+        with self._lock:
+            self.calls += 1
+        try:
+            response = getattr(self.sp, method)(ids)
+            items = (response[key] if key else response) or []
+        except Exception as e:
+            print(f"Bulk {kind} lookup failed for {len(ids)} IDs: {e}")
+            with self._lock:
+                self.failures += 1
+            items = []
+        by_id = {item['id']: item for item in items if item and item.get('id')}
+        if self.shared_cache:
+            for item_id, item in by_id.items():
+                self.shared_cache.set(f"{kind}:{item_id}", item, ttl=SHARED_TTLS[kind])
+        for item_id, future in zip(ids, futures):
+            future.set_result(by_id.get(item_id))
@@ -0,0 +1,250 @@
+"""
+Offline batch recommendations ("weekly picks") for many stored users.
+
+Loads user taste vectors and a candidate pool, prepares one standardized
+candidate matrix and scores every user through `RecommenderSystem` across a
+process pool. Workers memory-map the prepared matrix read-only (one copy in
+the page cache, shared by all of them) and each writes its own output chunk,
+so nothing big is pickled between processes.
+
+Inputs:
+- users: JSON lines of {"user_id": ..., "profile": {...}} where `profile` is a
+  `get_audio_profile`-style dict (0-100 percentages, tempo in BPM), or the
+  ingested playlist stores in data/playlists/ (one taste vector per user)
+- candidates: an .npz with `ids` and `features` (n x FEATURE_NAMES) columns,
+  or every track with features across the playlist stores
+
+Usage:
+    python batch_recommend.py build-candidates --out data/batch/candidates.npz
+    python batch_recommend.py run [--users users.jsonl] [--candidates data/batch/candidates.npz | --catalog]
+                                  [--top-n 25] [--workers 8] [--chunk-size 500]
+
+With --catalog, workers map the current published catalogue (catalog.py)
+instead of preparing a private copy of the candidate matrix for the run.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from catalog import CatalogVersion, catalog
+from disk_cache import DATA_DIR
+from exclusion import ExclusionFilter
+from playlist_ingest import FEATURE_NAMES, STORE_DIR as PLAYLIST_STORE_DIR
+from recommender import RecommenderSystem
+
+BATCH_DIR = os.path.join(DATA_DIR, 'batch')
+# Extra candidates per user so the exclusion filter doesn't leave anyone short
+OVERFETCH = 2
+
+
+# --- inputs ---
+
+def profile_vector(profile):
+    """get_audio_profile-style dict (percentages, BPM) -> raw feature vector."""
+    return [profile.get(k, 0) if k == 'tempo' else profile.get(k, 0) / 100.0 for k in FEATURE_NAMES]
+
+
+def load_users_jsonl(path):
+    user_ids, vectors = [], []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                user_ids.append(row['user_id'])
+                vectors.append(profile_vector(row['profile']))
+    return user_ids, np.array(vectors, dtype=np.float64).reshape(-1, len(FEATURE_NAMES))
+
+
+def _playlist_states(store_dir):
+    for path in sorted(glob.glob(os.path.join(store_dir, '*.json'))):
+        try:
+            with open(path) as f:
+                yield os.path.basename(path)[:-5], json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Skipping {path}: {e}")
+
+
+def load_users_from_playlists(store_dir=PLAYLIST_STORE_DIR):
+    """One taste vector per ingested user: the mean feature vector of their playlist tracks."""
+    user_ids, vectors = [], []
+    for user_id, state in _playlist_states(store_dir):
+        feats = list(state.get('features', {}).values())
+        if feats:
+            user_ids.append(user_id)
+            vectors.append(np.mean(np.array(feats, dtype=np.float64), axis=0))
+    return user_ids, np.array(vectors, dtype=np.float64).reshape(-1, len(FEATURE_NAMES))
+
+
+def build_candidates(store_dir=PLAYLIST_STORE_DIR):
+    """Every track with audio features across the playlist stores, de-duplicated."""
+    pool = {}
+    for _, state in _playlist_states(store_dir):
+        pool.update(state.get('features', {}))
+    ids = list(pool)
+    return {
+        'ids': np.array([i.encode() for i in ids], dtype=bytes) if ids else np.zeros(0, dtype='S1'),
+        'features': np.array([pool[i] for i in ids], dtype=np.float64).reshape(-1, len(FEATURE_NAMES)),
+    }
+
+
+def load_candidates(path):
+    with np.load(path) as npz:
+        return {'ids': npz['ids'], 'features': npz['features']}
+
+
+# --- workers ---
+
+_worker = {}
+
+
+def _init_worker(run_dir, catalog_path=None):
+    recommender = RecommenderSystem()
+    if catalog_path:
+        version = CatalogVersion(catalog_path)
+        recommender.scaler.mean_ = version.scaler_mean
+        recommender.scaler.scale_ = version.scaler_scale
+        _worker['matrix'], _worker['ids'] = version.features, version.ids
+    else:
+        with np.load(os.path.join(run_dir, 'scaler.npz')) as scaler:
+            recommender.scaler.mean_ = scaler['mean']
+            recommender.scaler.scale_ = scaler['scale']
+        _worker['matrix'] = np.load(os.path.join(run_dir, 'candidates.npy'), mmap_mode='r')
+        _worker['ids'] = np.load(os.path.join(run_dir, 'candidate_ids.npy'), mmap_mode='r')
+    _worker['recommender'] = recommender
+    _worker['run_dir'] = run_dir
+
+
+def _score_chunk(task):
+    chunk_no, user_ids, profiles, top_n = task
+    recommender, ids = _worker['recommender'], _worker['ids']
+    indices, scores = recommender.rank_profiles(profiles, _worker['matrix'], top_n=top_n * OVERFETCH)
+
+    path = os.path.join(_worker['run_dir'], f"part-{chunk_no:05d}.jsonl")
+    with open(path, 'w') as f:
+        for user_id, row_idx, row_scores in zip(user_ids, indices, scores):
+            exclusion = ExclusionFilter.load_existing(user_id)
+            picks = []
+            for i, score in zip(row_idx, row_scores):
+                track_id = ids[i].decode()
+                if exclusion is None or not exclusion.is_known(track_id):
+                    picks.append({'id': track_id, 'score': round(float(score), 4)})
+                    if len(picks) == top_n:
+                        break
+            f.write(json.dumps({'user_id': user_id, 'tracks': picks}, separators=(',', ':')) + '\n')
+    return len(user_ids)
+
+
+# --- driver ---
+
+def run(user_ids, profiles, candidates=None, top_n=25, workers=None, chunk_size=500, out_dir=None):
+    """
+    Scores every user and writes part-*.jsonl chunks plus a manifest. Returns the manifest.
+    Without `candidates`, the current published catalogue is used as-is.
+    """
+    workers = workers or os.cpu_count() or 1
+    run_id = time.strftime('%Y%m%d-%H%M%S')
+    run_dir = out_dir or os.path.join(BATCH_DIR, run_id)
+    os.makedirs(run_dir, exist_ok=True)
+
+    catalog_path = None
+    if candidates is None:
+        version = catalog.current()
+        if version is None:
+            raise ValueError("No catalogue has been published")
+        catalog_path, n_candidates = version.path, len(version)
+    else:
+        # Prepare the shared matrix once; workers only ever read it
+        recommender = RecommenderSystem()
+        matrix = recommender.prepare_candidate_matrix(candidates['features'])
+        np.save(os.path.join(run_dir, 'candidates.npy'), matrix)
+        np.save(os.path.join(run_dir, 'candidate_ids.npy'), candidates['ids'])
+        np.savez(os.path.join(run_dir, 'scaler.npz'), mean=recommender.scaler.mean_, scale=recommender.scaler.scale_)
+        n_candidates = len(candidates['ids'])
+
+    tasks = [(n, user_ids[i:i + chunk_size], profiles[i:i + chunk_size], top_n)
+             for n, i in enumerate(range(0, len(user_ids), chunk_size))]
+
+    started = time.perf_counter()
+    done = 0
+    if workers == 1:
+        _init_worker(run_dir, catalog_path)
+        for task in tasks:
+            done += _score_chunk(task)
+    else:
+        # One BLAS thread per process: the pool is the parallelism
+        for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+            os.environ.setdefault(var, '1')
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(processes=workers, initializer=_init_worker, initargs=(run_dir, catalog_path)) as pool:
+            for n in pool.imap_unordered(_score_chunk, tasks):
+                done += n
+                print(f"  {done}/{len(user_ids)} users", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+
+    manifest = {
+        'run_id': run_id,
+        'users': done,
+        'candidates': int(n_candidates),
+        'catalog': os.path.basename(catalog_path) if catalog_path else None,
+        'top_n': top_n,
+        'workers': workers,
+        'chunks': len(tasks),
+        'seconds': round(elapsed, 3),
+        'users_per_second': round(done / elapsed, 1) if elapsed > 0 else None,
+    }
+    with open(os.path.join(run_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute recommendations for many stored users.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build-candidates', help="Build a candidate pool from the playlist stores")
+    build.add_argument('--out', default=os.path.join(BATCH_DIR, 'candidates.npz'))
+
+    run_p = sub.add_parser('run', help="Score all users")
+    run_p.add_argument('--users', help="JSON lines of {user_id, profile}; defaults to the playlist stores")
+    source = run_p.add_mutually_exclusive_group()
+    source.add_argument('--candidates', help="Candidate .npz (ids, features); defaults to the playlist stores")
+    source.add_argument('--catalog', action='store_true', help="Score against the current published catalogue")
+    run_p.add_argument('--top-n', type=int, default=25)
+    run_p.add_argument('--workers', type=int, default=os.cpu_count())
+    run_p.add_argument('--chunk-size', type=int, default=500)
+    run_p.add_argument('--out', help="Output directory (default data/batch/<run id>)")
+    args = parser.parse_args()
+
+    if args.command == 'build-candidates':
+        cols = build_candidates()
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        np.savez(args.out, **cols)
+        print(f"Wrote {len(cols['ids'])} candidates to {args.out}")
+        return
+
+    user_ids, profiles = load_users_jsonl(args.users) if args.users else load_users_from_playlists()
+    if args.catalog:
+        candidates = None
+        if catalog.current() is None:
+            sys.exit("No catalogue has been published (python catalog.py publish)")
+    else:
+        candidates = load_candidates(args.candidates) if args.candidates else build_candidates()
+        if not len(candidates['ids']):
+            sys.exit("Nothing to do: no candidates")
+    if not user_ids:
+        sys.exit("Nothing to do: no users")
+
+    manifest = run(user_ids, profiles, candidates, top_n=args.top_n, workers=args.workers,
+                   chunk_size=args.chunk_size, out_dir=args.out)
+    print(f"{manifest['users']} users x {manifest['candidates']} candidates in {manifest['seconds']}s "
+          f"with {manifest['workers']} workers: {manifest['users_per_second']} users/s")
+
+
+if __name__ == '__main__':
+    main()
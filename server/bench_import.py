@@ -0,0 +1,84 @@
+"""
+Cold-start import budget for the API.
+
+Imports `main` in fresh interpreters, reports the best wall time and the
+slowest modules (from -X importtime), and exits non-zero when the budget is
+blown or a known-heavy module sneaks back into the import chain.
+
+Usage: python bench_import.py [--budget-ms 1500] [--runs 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that must stay out of `import main` (load them lazily where needed)
+FORBIDDEN_MODULES = ['pandas', 'sklearn', 'scipy', 'matplotlib', 'librosa']
+
+MEASURE_SNIPPET = """
+import sys, time
+t0 = time.perf_counter()
+import main
+elapsed = time.perf_counter() - t0
+heavy = [m for m in {forbidden!r} if m in sys.modules]
+print(elapsed)
+print(','.join(heavy))
+"""
+
+
+def measure_once():
+    code = MEASURE_SNIPPET.format(forbidden=FORBIDDEN_MODULES)
+    out = subprocess.run([sys.executable, '-c', code], cwd=SERVER_DIR,
+                         capture_output=True, text=True, check=True).stdout.splitlines()
+    return float(out[-2]), [m for m in out[-1].split(',') if m]
+
+
+def slowest_modules(top=10):
+    """Parses `-X importtime` output into (cumulative_us, module) pairs."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                          cwd=SERVER_DIR, capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # "import time:  self_us |  cumulative_us | name"
+        _, cumulative_us, name = line.split(':', 1)[1].split('|')
+        rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('IMPORT_BUDGET_MS', 1500)))
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    timings = []
+    heavy = []
+    for _ in range(args.runs):
+        elapsed, heavy = measure_once()
+        timings.append(elapsed * 1000)
+    best = min(timings)
+
+    print(f"import main: best {best:.0f} ms, median {sorted(timings)[len(timings) // 2]:.0f} ms "
+          f"over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    print("Slowest imports (cumulative):")
+    for cumulative_us, name in slowest_modules():
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if heavy:
+        print(f"FAIL: heavy modules imported by main: {', '.join(heavy)}")
+        failed = True
+    if best > args.budget_ms:
+        print(f"FAIL: import time {best:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
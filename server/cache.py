@@ -0,0 +1,172 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+_MISSING = object()
+# Default stale-while-revalidate window (seconds past expiry an entry may still be served)
+STALE_GRACE = int(os.getenv("CACHE_STALE_GRACE", 600))
+# How often (seconds) writes also sweep out entries past their stale window
+SWEEP_INTERVAL = 60.0
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with per-entry TTLs.
+
+    `get_or_set` runs the loader once per key even when many requests miss at the
+    same time (the others wait for its result), so a cold key never stampedes
+    Spotify. `get_or_refresh` adds stale-while-revalidate on top. Entries are kept
+    in write order, so once `max_entries` is exceeded the oldest writes are popped
+    off the front; dead entries are swept at most every `SWEEP_INTERVAL` seconds.
+    """
+
+    def __init__(self, default_ttl=300, max_entries=10000):
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        # key -> (value, expires_at, stale_until), oldest write first
+        self._data = OrderedDict()
+        self._swept_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._refreshing = set()
+        self._refresher = None
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None:
+            return default
+        value, expires_at, _ = entry
+        if expires_at < time.monotonic():
+            return default
+        return value
+
+    def set(self, key, value, ttl=None, grace=0):
+        """Stores `value` for `ttl` seconds; `grace` keeps it around (as stale) for a while longer."""
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.monotonic()
+        expires_at = now + ttl
+        with self._lock:
+            self._data[key] = (value, expires_at, expires_at + grace)
+            self._data.move_to_end(key)
+            if now - self._swept_at >= SWEEP_INTERVAL:
+                self._sweep(now)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _sweep(self, now):
+        """Drops entries past their stale window. Called with `_lock` held."""
+        for k in [k for k, (_, _, stale_until) in self._data.items() if stale_until < now]:
+            del self._data[k]
+        self._swept_at = now
+
+    @contextmanager
+    def _key_lock(self, key):
+        """
+        Holds the per-key loader lock. The lock is shared by everyone waiting on
+        `key` and only dropped once the last of them is done (even if a loader
+        raised), so a late caller can't start a second loader next to a waiter.
+        """
+        with self._lock:
+            entry = self._key_locks.get(key)
+            if entry is None:
+                entry = self._key_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[key]
+
+    def _load(self, key, loader, ttl, grace, should_cache):
+        with self._key_lock(key):
+            # Someone else may have filled it while we waited
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            value = loader()
+            if should_cache is None or should_cache(value):
+                self.set(key, value, ttl, grace)
+            return value
+
+    def get_or_set(self, key, loader, ttl=None, should_cache=None):
+        """
+        Returns the cached value for `key`, calling `loader()` on a miss.
+        `should_cache(value)` can veto storing a result (e.g. partial results).
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        return self._load(key, loader, ttl, 0, should_cache)
+
+    def get_or_refresh(self, key, loader, ttl=None, grace=STALE_GRACE, should_cache=None, refresher=None):
+        """
+        Stale-while-revalidate `get_or_set`. A fresh entry is returned as-is; one
+        that expired less than `grace` seconds ago is still returned immediately
+        while a single background `refresher()` (default: `loader`) replaces it.
+        Only a missing or too-old entry makes the caller wait for `loader()`.
+        `should_cache` vetoes foreground results only; a refresher signals a
+        result not worth keeping by raising, and the stale value stays.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is not None:
+            value, expires_at, stale_until = entry
+            now = time.monotonic()
+            if now <= expires_at:
+                return value
+            if now <= stale_until:
+                self._refresh_async(key, refresher or loader, ttl, grace)
+                return value
+
+        return self._load(key, loader, ttl, grace, should_cache)
+
+    def _refresh_async(self, key, refresher, ttl, grace):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresher is None:
+                self._refresher = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cache-refresh')
+
+        def refresh():
+            try:
+                self.set(key, refresher(), ttl, grace)
+            except Exception as e:
+                print(f"Background refresh of {key} failed (keeping stale value): {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+        self._refresher.submit(refresh)
+
+
+def token_key(token):
+    """Stable, non-reversible cache key for an access token."""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()[:24]
+
+
+# Process-wide cache shared by all routes
+cache = TTLCache()
+
+# User-independent catalog responses (fetched with the app token), shared by all users
+catalog_cache = TTLCache(default_ttl=3600, max_entries=50000)
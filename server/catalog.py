@@ -0,0 +1,192 @@
+"""
+Shared, versioned catalogue feature matrix.
+
+`publish_catalog` writes a new version directory (prepared float32 feature
+matrix, track IDs, a sorted ID index, scaler parameters) and then atomically
+swaps the `CURRENT` pointer to it. Every process - uvicorn workers, batch
+jobs - memory-maps the current version read-only, so the data lives once in
+the OS page cache no matter how many workers run, and ID lookups go through a
+binary search on the mapped sorted index instead of a per-process dict.
+Workers notice a new version on their next lookup (pointer checked at most
+every CHECK_INTERVAL seconds) without restarting; processes still holding an
+old version keep a valid mapping until they let go of it.
+
+Usage:
+    python catalog.py publish [--candidates data/batch/candidates.npz]
+    python catalog.py info
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from disk_cache import DATA_DIR
+
+CATALOG_DIR = os.path.join(DATA_DIR, 'catalog')
+CHECK_INTERVAL = 5.0  # seconds between pointer checks
+KEEP_VERSIONS = 3
+# Staging dirs older than this belong to a publish that crashed (a live one takes seconds)
+STALE_STAGING_SECONDS = 3600
+
+
+def publish_catalog(ids, features, root=CATALOG_DIR, keep=KEEP_VERSIONS):
+    """
+    Prepares `features` (n x d raw feature rows for the byte-string `ids`) the way
+    RecommenderSystem scores them, writes a new version and makes it current.
+    Returns the version name.
+    """
+    # Imported here so readers of the catalogue don't pull in the recommender stack
+    from recommender import RecommenderSystem
+
+    ids = np.asarray(ids)
+    if ids.dtype.kind != 'S':
+        ids = np.array([str(i).encode() for i in ids], dtype=bytes)
+    recommender = RecommenderSystem()
+    matrix = recommender.prepare_candidate_matrix(features)
+
+    version = f"v{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    os.makedirs(root, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=root, prefix='.staging-')
+    np.save(os.path.join(staging, 'features.npy'), matrix)
+    np.save(os.path.join(staging, 'ids.npy'), ids)
+    order = np.argsort(ids, kind='stable')
+    np.save(os.path.join(staging, 'ids_sorted.npy'), ids[order])
+    np.save(os.path.join(staging, 'sorted_rows.npy'), order.astype(np.int64))
+    np.savez(os.path.join(staging, 'scaler.npz'), mean=recommender.scaler.mean_, scale=recommender.scaler.scale_)
+    with open(os.path.join(staging, 'meta.json'), 'w') as f:
+        json.dump({'version': version, 'rows': int(len(ids)), 'dims': int(matrix.shape[1]),
+                   'published_at': time.time()}, f)
+    os.rename(staging, os.path.join(root, version))
+
+    # The swap itself: readers see either the old or the new pointer, never a partial one
+    fd, tmp = tempfile.mkstemp(dir=root, prefix='.current-')
+    with os.fdopen(fd, 'w') as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(root, 'CURRENT'))
+
+    _prune(root, keep)
+    return version
+
+
+def _prune(root, keep):
+    # Deleting a mapped file is safe on POSIX: existing mappings stay valid until unmapped
+    versions = sorted(d for d in os.listdir(root) if d.startswith('v'))
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    # Leftovers of publishes that died before their rename/replace
+    now = time.time()
+    for name in os.listdir(root):
+        if not name.startswith(('.staging-', '.current-')):
+            continue
+        path = os.path.join(root, name)
+        try:
+            if now - os.stat(path).st_mtime < STALE_STAGING_SECONDS:
+                continue
+        except OSError:
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class CatalogVersion:
+    """One published version, memory-mapped read-only."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.version = self.meta['version']
+        self.features = np.load(os.path.join(path, 'features.npy'), mmap_mode='r')
+        self.ids = np.load(os.path.join(path, 'ids.npy'), mmap_mode='r')
+        try:
+            self._ids_sorted = np.load(os.path.join(path, 'ids_sorted.npy'), mmap_mode='r')
+            self._sorted_rows = np.load(os.path.join(path, 'sorted_rows.npy'), mmap_mode='r')
+        except FileNotFoundError:
+            # Versions published without the index: build it in this process instead
+            self._sorted_rows = np.argsort(self.ids, kind='stable')
+            self._ids_sorted = self.ids[self._sorted_rows]
+        with np.load(os.path.join(path, 'scaler.npz')) as scaler:
+            self.scaler_mean = scaler['mean']
+            self.scaler_scale = scaler['scale']
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows(self, track_ids):
+        """Row index per track ID (-1 where unknown), via binary search on the mapped index."""
+        if not len(track_ids) or not len(self._ids_sorted):
+            return np.full(len(track_ids), -1, dtype=np.int64)
+        keys = np.array([t.encode() for t in track_ids], dtype=self._ids_sorted.dtype)
+        pos = np.searchsorted(self._ids_sorted, keys)
+        pos_clipped = np.minimum(pos, len(self._ids_sorted) - 1)
+        found = (pos < len(self._ids_sorted)) & (self._ids_sorted[pos_clipped] == keys)
+        return np.where(found, self._sorted_rows[pos_clipped], -1)
+
+    def track_id(self, row):
+        return self.ids[row].decode()
+
+
+class Catalog:
+    """Per-process handle on the current catalogue version (re-checked every CHECK_INTERVAL)."""
+
+    def __init__(self, root=CATALOG_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._current = None
+        self._checked_at = 0.0
+
+    def current(self):
+        """The current CatalogVersion, or None if nothing has been published."""
+        now = time.monotonic()
+        if self._current is not None and now - self._checked_at < CHECK_INTERVAL:
+            return self._current
+        with self._lock:
+            self._checked_at = now
+            try:
+                with open(os.path.join(self.root, 'CURRENT')) as f:
+                    version = f.read().strip()
+            except OSError:
+                return self._current
+            if self._current is None or self._current.version != version:
+                try:
+                    self._current = CatalogVersion(os.path.join(self.root, version))
+                except (OSError, ValueError) as e:
+                    print(f"Failed to map catalogue {version}: {e}")
+            return self._current
+
+
+catalog = Catalog()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish or inspect the shared catalogue matrix.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    publish = sub.add_parser('publish', help="Publish a new catalogue version")
+    publish.add_argument('--candidates', help="Candidate .npz (ids, features); defaults to the playlist stores")
+    sub.add_parser('info', help="Show the current version")
+    args = parser.parse_args()
+
+    if args.command == 'publish':
+        from batch_recommend import build_candidates, load_candidates
+        cols = load_candidates(args.candidates) if args.candidates else build_candidates()
+        if not len(cols['ids']):
+            raise SystemExit("No candidates to publish")
+        print(f"Published {publish_catalog(cols['ids'], cols['features'])} ({len(cols['ids'])} tracks)")
+    else:
+        current = catalog.current()
+        print(json.dumps(current.meta if current else None, indent=2))
+
+
+if __name__ == '__main__':
+    main()
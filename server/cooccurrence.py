@@ -0,0 +1,247 @@
+"""
+Local item-item co-occurrence recommender.
+
+Users who opt in contribute their top + saved track sets. The model keeps the
+binary user x item matrix R in CSR form (plus its CSC transpose), so the
+item-item co-occurrence matrix C = R^T R never has to be materialised: scoring
+a seed vector v is two sparse matrix-vector products, C v = R^T (R v),
+with cosine-style normalisation by item popularity. A user's sync replaces
+their row, so updates are incremental and the index rebuild is O(nnz).
+
+State is one uncompressed .npz in data/cooccurrence/; workers reload it when
+its mtime changes, and writers serialise on a lock file.
+"""
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from disk_cache import DATA_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: single-process, no cross-worker lock needed
+    fcntl = None
+
+MODEL_DIR = os.path.join(DATA_DIR, 'cooccurrence')
+# Cap per contributed set, so one huge library can't dominate the model (or its size)
+MAX_ITEMS_PER_USER = 300
+# An item needs this many listeners before it's recommended (filters one-off noise)
+MIN_SUPPORT = 2
+# Below this many contributors the model isn't useful yet
+MIN_USERS = 3
+
+
+def _gather(indptr, data, rows):
+    """Concatenation of data[indptr[r]:indptr[r+1]] for every r in rows, plus the slice lengths (no Python loop)."""
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return data[offsets + np.arange(offsets.size)], lengths
+
+
+class CooccurrenceModel:
+    def __init__(self, model_dir=MODEL_DIR):
+        self.path = os.path.join(model_dir, 'model.npz')
+        self._lock_path = os.path.join(model_dir, '.lock')
+        self._lock = threading.RLock()
+        self._mtime = None
+        self.item_ids = []
+        self.item_pos = {}
+        self.user_rows = {}
+        self._dirty = True
+        self._load()
+
+    # --- persistence ---
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        with np.load(self.path) as npz:
+            item_ids = [i.decode() for i in npz['item_ids']]
+            user_ids = [u.decode() for u in npz['user_ids']]
+            indptr, indices = npz['indptr'], npz['indices']
+        self.item_ids = item_ids
+        self.item_pos = {t: i for i, t in enumerate(item_ids)}
+        self.user_rows = {u: indices[indptr[k]:indptr[k + 1]].copy() for k, u in enumerate(user_ids)}
+        self._mtime = mtime
+        self._dirty = True
+
+    def _save(self):
+        users = list(self.user_rows)
+        rows = [self.user_rows[u] for u in users]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(r) for r in rows])
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix='.tmp-', suffix='.npz')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(
+                f,
+                item_ids=np.array([i.encode() for i in self.item_ids], dtype=bytes) if self.item_ids else np.zeros(0, dtype='S1'),
+                user_ids=np.array([u.encode() for u in users], dtype=bytes) if users else np.zeros(0, dtype='S1'),
+                indptr=indptr,
+                indices=np.concatenate(rows).astype(np.int32) if rows else np.zeros(0, dtype=np.int32),
+            )
+        os.replace(tmp, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    def _locked_update(self, apply):
+        """Reload -> apply -> save under the cross-process lock, so concurrent workers don't lose syncs."""
+        with self._lock:
+            os.makedirs(os.path.dirname(self._lock_path), exist_ok=True)
+            with open(self._lock_path, 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._load()
+                    apply()
+                    self._dirty = True
+                    self._save()
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # --- updates ---
+
+    def update_user(self, user_id, track_ids):
+        """Replaces a user's contributed track set (their row of R)."""
+        track_ids = list(dict.fromkeys(t for t in track_ids if t))[:MAX_ITEMS_PER_USER]
+
+        def apply():
+            row = []
+            for t in track_ids:
+                pos = self.item_pos.get(t)
+                if pos is None:
+                    pos = self.item_pos[t] = len(self.item_ids)
+                    self.item_ids.append(t)
+                row.append(pos)
+            self.user_rows[user_id] = np.unique(np.array(row, dtype=np.int32))
+        self._locked_update(apply)
+        return len(track_ids)
+
+    def remove_user(self, user_id):
+        """Opt-out: drops the user's row. (Their items stay in the vocabulary, unused.)"""
+        self._locked_update(lambda: self.user_rows.pop(user_id, None))
+
+    def has_user(self, user_id):
+        with self._lock:
+            self._load()
+            return user_id in self.user_rows
+
+    # --- index ---
+
+    def _rebuild(self):
+        """CSR (user -> items) and CSC (item -> users) arrays plus item popularity."""
+        users = list(self.user_rows)
+        rows = [self.user_rows[u] for u in users]
+        n_items = len(self.item_ids)
+        lengths = np.array([len(r) for r in rows], dtype=np.int64)
+
+        self._users = users
+        self._user_pos = {u: k for k, u in enumerate(users)}
+        self._csr_indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        self._csr_indptr[1:] = np.cumsum(lengths)
+        self._csr_indices = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int32)
+
+        # Transpose: stable sort of the entries by item gives item -> users
+        row_of_entry = np.repeat(np.arange(len(rows), dtype=np.int32), lengths)
+        order = np.argsort(self._csr_indices, kind='stable')
+        self._csc_indices = row_of_entry[order]
+        self._popularity = np.bincount(self._csr_indices, minlength=n_items).astype(np.float64)
+        self._csc_indptr = np.zeros(n_items + 1, dtype=np.int64)
+        self._csc_indptr[1:] = np.cumsum(self._popularity.astype(np.int64))
+        self._dirty = False
+
+    # --- queries ---
+
+    def recommend(self, seed_track_ids, limit=10, user_id=None):
+        """
+        [(track_id, score), ...] for the items that co-occur most with the seeds,
+        best first. Seeds, and the asking user's own contributed tracks, are excluded.
+        Returns [] when the model can't say anything useful.
+        """
+        with self._lock:
+            self._load()
+            if self._dirty:
+                self._rebuild()
+            if len(self._users) < MIN_USERS:
+                return []
+
+            seeds = np.array([self.item_pos[t] for t in dict.fromkeys(seed_track_ids) if t in self.item_pos], dtype=np.int64)
+            if not len(seeds):
+                return []
+            inv_norm = 1.0 / np.sqrt(np.maximum(self._popularity, 1.0))
+
+            # u = R v: every user holding a seed, weighted by the seed's 1/sqrt(popularity)
+            holders, counts = _gather(self._csc_indptr, self._csc_indices, seeds)
+            u = np.bincount(holders, weights=np.repeat(inv_norm[seeds], counts), minlength=len(self._users))
+
+            # scores = R^T u, normalised by item popularity
+            active = np.nonzero(u)[0]
+            items, counts = _gather(self._csr_indptr, self._csr_indices, active)
+            scores = np.bincount(items, weights=np.repeat(u[active], counts), minlength=len(self.item_ids))
+            scores *= inv_norm
+
+            scores[seeds] = 0.0
+            scores[self._popularity < MIN_SUPPORT] = 0.0
+            own = self._user_pos.get(user_id)
+            if own is not None:
+                scores[self._csr_indices[self._csr_indptr[own]:self._csr_indptr[own + 1]]] = 0.0
+
+            candidates = np.nonzero(scores)[0]
+            if not len(candidates):
+                return []
+            k = min(limit, len(candidates))
+            top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            top = top[np.argsort(-scores[top], kind='stable')]
+            return [(self.item_ids[i], float(scores[i])) for i in top]
+
+    def stats(self):
+        with self._lock:
+            self._load()
+            return {
+                'users': len(self.user_rows),
+                'items': len(self.item_ids),
+                'entries': int(sum(len(r) for r in self.user_rows.values())),
+            }
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = CooccurrenceModel()
+        return _model
+
+
+def collect_user_tracks(sp, max_saved=200):
+    """A user's contribution: top tracks across all time ranges plus their most recent saved tracks."""
+    track_ids = []
+    for time_range in ('short_term', 'medium_term', 'long_term'):
+        try:
+            top = sp.current_user_top_tracks(limit=50, time_range=time_range)
+            track_ids.extend(t['id'] for t in top['items'] if t and t.get('id'))
+        except Exception as e:
+            print(f"Failed to fetch top tracks ({time_range}): {e}")
+    offset = 0
+    while offset < max_saved:
+        try:
+            page = sp.current_user_saved_tracks(limit=50, offset=offset)
+        except Exception as e:
+            print(f"Failed to fetch saved tracks: {e}")
+            break
+        items = page.get('items', [])
+        track_ids.extend(i['track']['id'] for i in items if i.get('track') and i['track'].get('id'))
+        offset += len(items)
+        if not items or not page.get('next'):
+            break
+    return track_ids
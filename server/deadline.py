@@ -0,0 +1,102 @@
+import copy
+import os
+import time
+
+import requests
+
+# Default end-to-end budget for one API request (override per request with X-Deadline-Ms)
+DEFAULT_DEADLINE_MS = int(os.getenv("REQUEST_DEADLINE_MS", 2500))
+# Never hand spotipy a timeout smaller than this; a call that can't finish is skipped instead
+MIN_CALL_TIMEOUT = 0.05
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    """
+    Wall-clock budget for one request. Every upstream call gets the remaining
+    budget as its timeout; once it's spent, further calls are refused and
+    `hit` is set so the route can flag its result as partial.
+    """
+
+    def __init__(self, budget_ms=DEFAULT_DEADLINE_MS):
+        self.budget_ms = budget_ms
+        self.expires_at = time.monotonic() + budget_ms / 1000.0
+        self.hit = False
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        if self.remaining() < MIN_CALL_TIMEOUT:
+            self.hit = True
+            return True
+        return False
+
+    def check(self):
+        if self.expired():
+            raise DeadlineExceeded(f"Request budget of {self.budget_ms} ms spent")
+
+    def call_timeout(self):
+        """Timeout for the next upstream call: the remaining budget, never below MIN_CALL_TIMEOUT. Raises once spent."""
+        self.check()
+        return max(self.remaining(), MIN_CALL_TIMEOUT)
+
+
+class _DeadlineSession:
+    """
+    Stand-in for a requests session that sends every request with the deadline's
+    remaining time as its timeout. Everything else goes to the real (shared) session.
+    """
+
+    def __init__(self, session, deadline):
+        self._session = session
+        self._deadline = deadline
+
+    def request(self, *args, **kwargs):
+        kwargs['timeout'] = self._deadline.call_timeout()
+        return self._session.request(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+class DeadlineBoundSpotify:
+    """
+    Wraps a spotipy client so every API method runs with the deadline's
+    remaining time as its requests timeout, and is refused outright once the
+    budget is gone. Attribute reads pass straight through.
+
+    The timeout is applied on a per-request shallow copy of the client, so the
+    wrapped client (shared by background work and other requests) keeps its
+    own configuration; the copy still shares its token and connection pool.
+    """
+
+    def __init__(self, sp, deadline):
+        self._deadline = deadline
+        session = getattr(sp, '_session', None)
+        self._copied = isinstance(session, requests.Session)
+        if self._copied:
+            # Not a requests.Session itself, so spotipy's __del__ on the copy won't close the shared pool
+            sp = copy.copy(sp)
+            sp._session = _DeadlineSession(session, deadline)
+        self._sp = sp
+
+    def __getattr__(self, name):
+        attr = getattr(self._sp, name)
+        if not callable(attr) or name.startswith('_'):
+            return attr
+
+        def bounded(*args, **kwargs):
+            self._deadline.check()
+            if self._copied:
+                # Only this request's copy; seen by anything that waits before sending (e.g. the app rate budget)
+                self._sp.requests_timeout = self._deadline.call_timeout()
+            try:
+                return attr(*args, **kwargs)
+            except requests.exceptions.Timeout:
+                self._deadline.hit = True
+                raise
+        return bounded
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+# Project-level data/ directory (parent of server/)
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+# Every worker writes into the same directory, so the on-disk total is re-read at least this often
+RESCAN_INTERVAL = 60.0  # seconds
+
+
+class ContentCache:
+    """
+    Size-bounded, content-addressed on-disk cache with LRU eviction.
+
+    Blobs are stored once under their SHA-256 digest (`blobs/ab/abcd...`), and
+    lookup keys (e.g. URLs) map onto digests via tiny pointer files (`keys/...`),
+    so identical payloads reached through different keys share one blob.
+    Recency is tracked through blob mtimes, which survive restarts. Evicting a
+    blob also removes the pointers to it. The size budget is for the whole
+    directory (shared by all workers): the total is re-read from disk before
+    evicting and at least every RESCAN_INTERVAL seconds.
+    """
+
+    def __init__(self, name, max_bytes=200 * 1024 * 1024, root=None):
+        self.root = root or os.path.join(DATA_DIR, 'cache', name)
+        self.max_bytes = max_bytes
+        self._blob_dir = os.path.join(self.root, 'blobs')
+        self._key_dir = os.path.join(self.root, 'keys')
+        os.makedirs(self._blob_dir, exist_ok=True)
+        os.makedirs(self._key_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._rescan()
+
+    def _rescan(self):
+        """Re-reads the directory's total size (other workers write to it too). Returns the blob listing."""
+        blobs = list(self._scan())
+        self._total_bytes = sum(size for _, size, _ in blobs)
+        self._scanned_at = time.monotonic()
+        return blobs
+
+    @staticmethod
+    def _digest(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def _key_path(self, key):
+        return os.path.join(self._key_dir, hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+    def _blob_path(self, digest):
+        return os.path.join(self._blob_dir, digest[:2], digest)
+
+    def _scan(self):
+        """Yields (path, size, mtime) for every blob on disk."""
+        for dirpath, _, filenames in os.walk(self._blob_dir):
+            for f in filenames:
+                path = os.path.join(dirpath, f)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def get(self, key):
+        """Returns the cached bytes for `key`, or None. Marks the blob as recently used."""
+        try:
+            with open(self._key_path(key), 'r') as f:
+                digest = f.read().strip()
+            blob_path = self._blob_path(digest)
+            with open(blob_path, 'rb') as f:
+                data = f.read()
+            os.utime(blob_path, None)
+            return data
+        except FileNotFoundError:
+            # Pointer whose blob was evicted (possibly by another worker)
+            self._remove(self._key_path(key))
+            return None
+        except OSError:
+            return None
+
+    def put(self, key, data):
+        """Stores `data` under `key` and returns its content digest."""
+        digest = self._digest(data)
+        blob_path = self._blob_path(digest)
+        with self._lock:
+            if os.path.exists(blob_path):
+                os.utime(blob_path, None)
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                self._atomic_write(blob_path, data)
+                self._total_bytes += len(data)
+            self._atomic_write(self._key_path(key), digest.encode('ascii'))
+            if self._total_bytes > self.max_bytes or time.monotonic() - self._scanned_at > RESCAN_INTERVAL:
+                blobs = self._rescan()
+                if self._total_bytes > self.max_bytes:
+                    self._evict(blobs)
+        return digest
+
+    def _atomic_write(self, path, data):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self, blobs):
+        """Drops least-recently-used blobs (and their key pointers) until we're back under 90% of the budget."""
+        target = int(self.max_bytes * 0.9)
+        evicted = set()
+        for path, size, _ in sorted(blobs, key=lambda b: b[2]):
+            if self._total_bytes <= target:
+                break
+            self._remove(path)
+            self._total_bytes -= size
+            evicted.add(os.path.basename(path))
+        if not evicted:
+            return
+        for f in os.listdir(self._key_dir):
+            pointer = os.path.join(self._key_dir, f)
+            try:
+                with open(pointer, 'r') as fh:
+                    digest = fh.read().strip()
+            except OSError:
+                continue
+            if digest in evicted:
+                self._remove(pointer)
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in list(self._scan()):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            for f in os.listdir(self._key_dir):
+                try:
+                    os.remove(os.path.join(self._key_dir, f))
+                except OSError:
+                    pass
+            self._total_bytes = 0
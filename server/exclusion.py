@@ -0,0 +1,263 @@
+import atexit
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from disk_cache import DATA_DIR
+
+STORE_DIR = os.path.join(DATA_DIR, 'exclusions')
+LIBRARY_REFRESH_SECONDS = 6 * 3600
+# Recently recommended tracks stay excluded for one to two windows
+RECENT_WINDOW_SECONDS = 24 * 3600
+MAX_LIBRARY_TRACKS = 20000
+# Filters kept in memory per process (least recently used ones are dropped and reloaded from disk)
+MAX_CACHED_FILTERS = int(os.getenv("EXCLUSION_CACHE_SIZE", 1000))
+# Recorded recommendations are written to disk in batches, at most this often per process
+SAVE_INTERVAL = 30.0  # seconds
+# File header: library built-at, recent started-at, then the three filters' byte lengths
+_HEADER = struct.Struct('<ddIII')
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over string IDs (bits in a bytearray).
+    ~1.2 bytes per item at a 1% false-positive rate: 20k tracks ~ 24 KB.
+    False positives only mean an occasional unseen track is skipped.
+    """
+
+    MAGIC = b'BLM1'
+
+    def __init__(self, capacity=20000, error_rate=0.01, num_bits=None, num_hashes=None):
+        if num_bits is None:
+            num_bits = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+            num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bytearray((num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = struct.unpack('<QQ', digest)
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        bits = self.bits
+        for p in self._positions(item):
+            bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        # Plain int ops: per-item NumPy calls cost more than the whole lookup
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def to_bytes(self):
+        return self.MAGIC + struct.pack('<QII', self.num_bits, self.num_hashes, self.count) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:4] != cls.MAGIC:
+            raise ValueError("Not a Bloom filter")
+        num_bits, num_hashes, count = struct.unpack('<QII', data[4:20])
+        bf = cls(num_bits=num_bits, num_hashes=num_hashes)
+        bf.bits = bytearray(data[20:20 + len(bf.bits)])
+        bf.count = count
+        return bf
+
+
+class ExclusionFilter:
+    """
+    Per-user "already known" filter: the saved library plus recently recommended tracks.
+
+    - `library`: rebuilt from the user's saved tracks every LIBRARY_REFRESH_SECONDS
+      (in a background thread, so requests never wait on it)
+    - `recent`: two generations of recently-recommended tracks; the older one is
+      dropped each RECENT_WINDOW_SECONDS, so nothing is excluded forever
+    Persisted as one small binary file per user; recorded tracks reach it in
+    batches (see `flush`), not on every request.
+    """
+
+    def __init__(self, user_id, store_dir=STORE_DIR):
+        self.user_id = user_id
+        self.path = os.path.join(store_dir, f"{user_id}.bin")
+        self.library = None
+        self.library_built_at = 0.0
+        self.recent = [BloomFilter(capacity=2000), BloomFilter(capacity=2000)]
+        self.recent_started_at = time.time()
+        self._lock = threading.Lock()
+        self._syncing = False
+        self._load()
+
+    @classmethod
+    def load_existing(cls, user_id, store_dir=STORE_DIR):
+        """The stored filter for `user_id`, or None if there isn't one (no allocation, no I/O beyond a stat)."""
+        if not os.path.exists(os.path.join(store_dir, f"{user_id}.bin")):
+            return None
+        return cls(user_id, store_dir)
+
+    # --- persistence ---
+
+    def _load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return
+        try:
+            library_built_at, recent_started_at, n_lib, n_cur, n_prev = _HEADER.unpack_from(data)
+            off = _HEADER.size
+            if n_lib:
+                self.library = BloomFilter.from_bytes(data[off:off + n_lib])
+            off += n_lib
+            self.recent = [BloomFilter.from_bytes(data[off:off + n_cur]),
+                           BloomFilter.from_bytes(data[off + n_cur:off + n_cur + n_prev])]
+            self.library_built_at = library_built_at
+            self.recent_started_at = recent_started_at
+        except (ValueError, struct.error) as e:
+            print(f"Ignoring corrupt exclusion filter for {self.user_id}: {e}")
+
+    def save(self):
+        with self._lock:
+            lib = self.library.to_bytes() if self.library else b''
+            cur, prev = (r.to_bytes() for r in self.recent)
+            data = _HEADER.pack(self.library_built_at, self.recent_started_at,
+                               len(lib), len(cur), len(prev)) + lib + cur + prev
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+    # --- library sync ---
+
+    def library_stale(self):
+        return self.library is None or time.time() - self.library_built_at > LIBRARY_REFRESH_SECONDS
+
+    def refresh_library_async(self, sp):
+        """Rebuilds the library filter in the background if it's missing or stale."""
+        with self._lock:
+            if self._syncing or not self.library_stale():
+                return
+            self._syncing = True
+        threading.Thread(target=self._sync_library, args=(sp,), daemon=True).start()
+
+    def _sync_library(self, sp):
+        try:
+            first = sp.current_user_saved_tracks(limit=50, offset=0)
+            total = min(first.get('total', 0), MAX_LIBRARY_TRACKS)
+            pages, complete = [first], True
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                futures = [pool.submit(sp.current_user_saved_tracks, limit=50, offset=off)
+                           for off in range(50, total, 50)]
+                for f in futures:
+                    try:
+                        pages.append(f.result())
+                    except Exception as e:
+                        print(f"Failed to fetch saved tracks page: {e}")
+                        complete = False
+
+            library = BloomFilter(capacity=max(1000, total))
+            for page in pages:
+                for item in page.get('items', []):
+                    if item.get('track') and item['track'].get('id'):
+                        library.add(item['track']['id'])
+            with self._lock:
+                self.library = library
+                # A partial library still filters, but stays stale so the next request retries the sync
+                if complete:
+                    self.library_built_at = time.time()
+            self.save()
+        except Exception as e:
+            print(f"Failed to sync library filter: {e}")
+        finally:
+            with self._lock:
+                self._syncing = False
+
+    # --- queries ---
+
+    def _rotate(self):
+        if time.time() - self.recent_started_at > RECENT_WINDOW_SECONDS:
+            self.recent = [BloomFilter(capacity=2000), self.recent[0]]
+            self.recent_started_at = time.time()
+
+    def is_known(self, track_id):
+        if self.library is not None and track_id in self.library:
+            return True
+        return any(track_id in r for r in self.recent)
+
+    def filter_tracks(self, tracks):
+        """Drops tracks the user already has or was recently shown."""
+        return [t for t in tracks if not self.is_known(t['id'])]
+
+    def record(self, tracks):
+        """Remembers tracks we just recommended (persisted by the next background flush)."""
+        with self._lock:
+            self._rotate()
+            for t in tracks:
+                self.recent[0].add(t['id'])
+        _mark_dirty(self)
+
+
+# user_id -> ExclusionFilter, least recently used first
+_filters = OrderedDict()
+# Filters with recorded tracks not yet on disk; they stay reachable here even once evicted from _filters
+_dirty = {}
+_filters_lock = threading.Lock()
+_flusher = None
+
+
+def get_exclusion_filter(user_id):
+    """Process-wide ExclusionFilter per user (loaded from disk on first use, LRU-bounded)."""
+    with _filters_lock:
+        f = _filters.get(user_id)
+        if f is not None:
+            _filters.move_to_end(user_id)
+            return f
+        # An evicted filter with unsaved writes is newer than its file
+        f = _dirty.get(user_id)
+    if f is None:
+        f = ExclusionFilter(user_id)
+    with _filters_lock:
+        f = _filters.setdefault(user_id, f)
+        _filters.move_to_end(user_id)
+        while len(_filters) > MAX_CACHED_FILTERS:
+            _filters.popitem(last=False)
+    return f
+
+
+def _mark_dirty(f):
+    global _flusher
+    with _filters_lock:
+        _dirty[f.user_id] = f
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name='exclusion-flush', daemon=True)
+            _flusher.start()
+
+
+def flush():
+    """Writes every filter with unsaved recorded tracks to disk."""
+    with _filters_lock:
+        pending = list(_dirty.values())
+        _dirty.clear()
+    for f in pending:
+        try:
+            f.save()
+        except OSError as e:
+            print(f"Failed to save exclusion filter for {f.user_id}: {e}")
+
+
+def _flush_loop():
+    while True:
+        time.sleep(SAVE_INTERVAL)
+        flush()
+
+
+atexit.register(flush)
@@ -1,16 +1,14 @@
 import numpy as np
-import requests
 import os
-import tempfile
-import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 
-# librosa is not supported on Python 3.14 yet, so we disable it.
-# import librosa 
+from audio_analysis import N_FEATURES, N_MFCC, analyze_bytes
 
 class FeatureExtractor:
     """
     Handles extraction of audio features from Spotify API.
-    Raw audio analysis (Librosa) is currently disabled due to Python 3.14 incompatibility.
+    Raw audio analysis (MFCC, spectral centroid/rolloff) runs on the 30s previews
+    with a NumPy-only DSP path in `audio_analysis`, fully in memory.
     """
     
     SPOTIFY_AUDIO_FEATURES = [
@@ -19,38 +17,74 @@ class FeatureExtractor:
         'liveness', 'valence', 'tempo'
     ]
 
-    def __init__(self):
-        pass
+    def __init__(self, max_workers=None, fetcher=None):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._fetcher = fetcher
+        # Analysed audio vectors, keyed by track ID
+        self.audio_cache = {}
+
+    @property
+    def fetcher(self):
+        # requests + the preview cache are only loaded once a preview is actually needed
+        if self._fetcher is None:
+            from preview_fetcher import get_preview_fetcher
+            self._fetcher = get_preview_fetcher()
+        return self._fetcher
 
     def download_preview(self, preview_url):
-        """Downloads the preview MP3 to a temporary file."""
+        """Downloads the preview MP3 into memory (via the shared fetcher) and returns its bytes."""
         if not preview_url:
             return None
-        
-        try:
-            response = requests.get(preview_url)
-            if response.status_code == 200:
-                fd, path = tempfile.mkstemp(suffix=".mp3")
-                with os.fdopen(fd, 'wb') as tmp:
-                    tmp.write(response.content)
-                return path
-        except Exception as e:
-            print(f"Error downloading preview: {e}")
-        return None
+        return self.fetcher.fetch(preview_url)
+
+    def extract_audio_features(self, audio_bytes):
+        """
+        13 MFCC + spectral centroid + spectral rolloff for one in-memory audio file.
+        Returns a zero vector if the audio can't be decoded.
+        """
+        vector = analyze_bytes(audio_bytes)
+        if vector is None:
+            return np.zeros(N_FEATURES)
+        return vector
 
-    def extract_librosa_features(self, file_path):
+    def extract_batch(self, tracks):
         """
-        Mock function for Librosa features.
-        Returns a zero vector since librosa is disabled.
+        Analyses the previews of every uncached track in `tracks` across a process pool.
+        Results land in `audio_cache`; returns {track_id: vector} for the whole batch.
         """
-        # 13 MFCC + 1 Centroid + 1 Rolloff = 15 features
-        return np.zeros(15)
+        to_fetch = {}
+        for t in tracks:
+            if t['id'] in self.audio_cache or t['id'] in to_fetch or not t.get('preview_url'):
+                continue
+            to_fetch[t['id']] = t['preview_url']
+
+        downloads = self.fetcher.fetch_many(to_fetch.values()) if to_fetch else {}
+        pending = {tid: downloads[url] for tid, url in to_fetch.items() if downloads.get(url)}
+
+        if pending:
+            ids = list(pending)
+            payloads = [pending[i] for i in ids]
+            try:
+                if len(payloads) == 1 or self.max_workers == 1:
+                    vectors = [analyze_bytes(p) for p in payloads]
+                else:
+                    with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                        vectors = list(pool.map(analyze_bytes, payloads))
+            except Exception as e:
+                print(f"Error in audio analysis pool: {e}")
+                vectors = [None] * len(ids)
+
+            for track_id, vector in zip(ids, vectors):
+                self.audio_cache[track_id] = vector if vector is not None else np.zeros(N_FEATURES)
+
+        return {t['id']: self.audio_cache[t['id']] for t in tracks if t['id'] in self.audio_cache}
 
     def process_track(self, track_info, audio_features):
         """
-        Combines Spotify features and (Mock) Librosa features into a single vector.
+        Combines Spotify features and preview audio features into a single vector.
         track_info: dict containing 'preview_url', 'id', 'name'
         audio_features: dict from Spotify API
+        Audio features come from `audio_cache` (see extract_batch); zeros if not analysed.
         """
         # 1. Spotify Features
         spotify_vector = []
@@ -60,13 +94,15 @@ class FeatureExtractor:
         else:
             spotify_vector = [0] * len(self.SPOTIFY_AUDIO_FEATURES)
             
-        # 2. Librosa Features (Skipped)
-        librosa_vector = np.zeros(15)
+        # 2. Preview Audio Features
+        audio_vector = self.audio_cache.get(track_info.get('id'))
+        if audio_vector is None:
+            audio_vector = np.zeros(N_FEATURES)
         
         # Combine
-        full_vector = np.concatenate([spotify_vector, librosa_vector])
+        full_vector = np.concatenate([spotify_vector, audio_vector])
         return full_vector
 
     def get_feature_names(self):
-        librosa_names = [f'mfcc_{i}' for i in range(13)] + ['spectral_centroid', 'spectral_rolloff']
-        return self.SPOTIFY_AUDIO_FEATURES + librosa_names
+        audio_names = [f'mfcc_{i}' for i in range(N_MFCC)] + ['spectral_centroid', 'spectral_rolloff']
+        return self.SPOTIFY_AUDIO_FEATURES + audio_names
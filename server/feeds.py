@@ -0,0 +1,80 @@
+import base64
+import hashlib
+import json
+import os
+import uuid
+
+from cache import cache
+
+# Candidates ranked per feed; pages are slices of this pool
+POOL_SIZE = int(os.getenv("FEED_POOL_SIZE", 60))
+FEED_TTL = 1800  # seconds
+
+
+class FeedExpired(Exception):
+    pass
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def feed_scope(mode, params=None):
+    """Short hash of a feed's mode and query parameters; a cursor is only valid for the same scope."""
+    raw = json.dumps([mode, params or {}], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()[:12]
+
+
+def encode_cursor(feed_id, offset, scope):
+    raw = json.dumps({'f': feed_id, 'o': offset, 's': scope}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor, scope):
+    """(feed_id, offset) from a cursor issued for `scope`; InvalidCursor otherwise."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+        feed_id, offset, cursor_scope = data['f'], int(data['o']), data['s']
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(str(e))
+    if offset < 0:
+        raise InvalidCursor("negative offset")
+    if cursor_scope != scope:
+        raise InvalidCursor("cursor belongs to a different feed or parameters")
+    return feed_id, offset
+
+
+def create_feed(owner, scope, tracks):
+    """Stores a ranked candidate pool server-side and returns its ID."""
+    feed_id = uuid.uuid4().hex[:16]
+    cache.set(f"feed:{feed_id}", {'owner': owner, 'scope': scope, 'tracks': tracks}, ttl=FEED_TTL)
+    return feed_id
+
+
+def page(owner, scope, feed_id, offset, limit):
+    """
+    One page of a stored pool: (tracks, next_cursor or None). Pure slicing, no
+    upstream calls. Raises FeedExpired when the pool is gone (or isn't the caller's).
+    """
+    feed = cache.get(f"feed:{feed_id}")
+    if feed is None or feed['owner'] != owner or feed['scope'] != scope:
+        raise FeedExpired(feed_id)
+    tracks = feed['tracks'][offset:offset + limit]
+    end = offset + len(tracks)
+    return tracks, (encode_cursor(feed_id, end, scope) if end < len(feed['tracks']) else None)
+
+
+def serve(owner, mode, build, limit, cursor=None, params=None):
+    """
+    First request (no cursor): `build(POOL_SIZE)` ranks a pool once and page 1 is
+    served from it. With a cursor, the next slice of that pool is served; the
+    cursor must come from the same mode and `params`.
+    Returns (tracks, next_cursor).
+    """
+    scope = feed_scope(mode, params)
+    if cursor:
+        feed_id, offset = decode_cursor(cursor, scope)
+        return page(owner, scope, feed_id, offset, limit)
+    tracks = build(max(POOL_SIZE, limit))
+    return page(owner, scope, create_feed(owner, scope, tracks), 0, limit)
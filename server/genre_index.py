@@ -0,0 +1,260 @@
+import re
+
+import numpy as np
+
+# Spotify's recommendation seed genres (hardcoded to avoid a slow API call on startup)
+VALID_SEED_GENRES = frozenset({
+    'acoustic', 'afrobeat', 'alt-rock', 'alternative', 'ambient', 'anime',
+    'black-metal', 'bluegrass', 'blues', 'bossanova', 'brazil', 'breakbeat',
+    'british', 'cantopop', 'chicago-house', 'children', 'chill', 'classical',
+    'club', 'comedy', 'country', 'dance', 'dancehall', 'death-metal',
+    'deep-house', 'detroit-techno', 'disco', 'disney', 'drum-and-bass', 'dub',
+    'dubstep', 'edm', 'electro', 'electronic', 'emo', 'folk', 'forro', 'french',
+    'funk', 'garage', 'german', 'gospel', 'goth', 'grindcore', 'groove',
+    'grunge', 'guitar', 'happy', 'hard-rock', 'hardcore', 'hardstyle',
+    'heavy-metal', 'hip-hop', 'holidays', 'honky-tonk', 'house', 'idm',
+    'indian', 'indie', 'indie-pop', 'industrial', 'iranian', 'j-dance', 'j-idol',
+    'j-pop', 'j-rock', 'jazz', 'k-pop', 'kids', 'latin', 'latino', 'malay',
+    'mandopop', 'metal', 'metal-misc', 'metalcore', 'minimal-techno', 'movies',
+    'mpb', 'new-age', 'new-release', 'opera', 'pagode', 'party', 'philippines-opm',
+    'piano', 'pop', 'pop-film', 'post-dubstep', 'power-pop', 'progressive-house',
+    'psych-rock', 'punk', 'punk-rock', 'r-n-b', 'rainy-day', 'reggae', 'reggaeton',
+    'road-trip', 'rock', 'rock-n-roll', 'rockabilly', 'romance', 'sad', 'salsa',
+    'samba', 'sertanejo', 'show-tunes', 'singer-songwriter', 'ska', 'sleep',
+    'songwriter', 'soul', 'soundtracks', 'spanish', 'study', 'summer', 'swedish',
+    'synth-pop', 'tango', 'techno', 'trance', 'trip-hop', 'turkish', 'work-out',
+    'world-music'
+})
+
+# Seeds that name a listing rather than a genre: only an exact/phrase match resolves to them
+NON_GENRE_SEEDS = frozenset({'new-release'})
+# Seed tokens too generic to mean their seed on their own ('new wave' isn't 'new-age')
+PHRASE_ONLY_TOKENS = frozenset({'new'})
+
+# Micro-genre vocabulary that doesn't share a token with its natural seed.
+# Keys are tokenized like genres, so multi-word keys ('lo-fi', 'new wave') match as phrases.
+ALIASES = {
+    'rap': 'hip-hop', 'trap': 'hip-hop', 'drill': 'hip-hop', 'grime': 'hip-hop',
+    'r&b': 'r-n-b', 'rnb': 'r-n-b', 'bossa': 'bossanova',
+    'chanson': 'french', 'variete': 'french', 'schlager': 'german',
+    'kpop': 'k-pop', 'jpop': 'j-pop', 'anime': 'anime', 'bollywood': 'indian',
+    'filmi': 'indian', 'desi': 'indian', 'corrido': 'latin', 'cumbia': 'latin',
+    'bachata': 'latin', 'urbano': 'reggaeton', 'afrobeats': 'afrobeat',
+    'amapiano': 'afrobeat', 'lo-fi': 'chill', 'lofi': 'chill', 'shoegaze': 'alternative',
+    'bedroom': 'indie', 'motown': 'soul', 'new wave': 'synth-pop',
+    'thrash': 'metal', 'doom': 'metal', 'djent': 'metalcore', 'dnb': 'drum-and-bass',
+    'jungle': 'drum-and-bass', 'uk': 'british', 'britpop': 'british',
+    'worship': 'gospel', 'ccm': 'gospel', 'orchestra': 'classical', 'baroque': 'classical',
+    'soundtrack': 'soundtracks', 'score': 'soundtracks', 'broadway': 'show-tunes',
+}
+
+# Coarse families, so "distance" between seeds means more than shared words
+FAMILIES = {
+    'fam:electronic': {'house', 'techno', 'edm', 'electro', 'electronic', 'trance', 'dubstep',
+                       'idm', 'drum', 'breakbeat', 'garage', 'hardstyle', 'dub', 'club',
+                       'disco', 'dance', 'minimal', 'synth', 'industrial', 'trip'},
+    'fam:rock': {'rock', 'grunge', 'punk', 'alt', 'alternative', 'emo', 'guitar', 'indie',
+                 'psych', 'rockabilly', 'goth'},
+    'fam:metal': {'metal', 'metalcore', 'grindcore', 'hardcore', 'death', 'black', 'heavy'},
+    'fam:urban': {'hip', 'hop', 'r', 'b', 'soul', 'funk', 'groove', 'gospel', 'dancehall',
+                  'reggae', 'reggaeton', 'afrobeat', 'ska'},
+    'fam:pop': {'pop', 'power', 'k', 'j', 'idol', 'cantopop', 'mandopop', 'party', 'happy',
+                'summer', 'new', 'release', 'disney', 'kids', 'children'},
+    'fam:acoustic': {'acoustic', 'folk', 'country', 'bluegrass', 'honky', 'tonk',
+                     'singer', 'songwriter', 'piano', 'sad', 'rainy', 'romance'},
+    'fam:art': {'classical', 'opera', 'jazz', 'blues', 'ambient', 'new', 'age', 'sleep',
+                'study', 'soundtracks', 'movies', 'show', 'tunes', 'film'},
+    'fam:world': {'latin', 'latino', 'salsa', 'samba', 'tango', 'forro', 'mpb', 'pagode',
+                  'sertanejo', 'bossanova', 'brazil', 'indian', 'iranian', 'turkish', 'malay',
+                  'philippines', 'opm', 'world', 'music', 'spanish', 'french', 'german',
+                  'swedish', 'british'},
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9&]+")
+
+
+def tokenize(genre):
+    """'Indie Pop Rap' -> ('indie', 'pop', 'rap'); 'r-n-b' -> ('r', 'n', 'b')."""
+    return tuple(_TOKEN_RE.findall(genre.lower().replace('-', ' ')))
+
+
+class _TrieNode:
+    __slots__ = ('children', 'terminal')
+
+    def __init__(self):
+        self.children = {}
+        self.terminal = False
+
+
+class GenreIndex:
+    """
+    Maps arbitrary Spotify artist micro-genres onto valid recommendation seeds.
+
+    Built once per process:
+    - `phrase_index`: joined token phrase -> seed (exact/multi-word matches)
+    - `token_index`: token -> seeds containing it (genre seeds only)
+    - `alias_index`: tokenized ALIASES key phrase -> seed
+    - a character trie over seed tokens for longest-prefix matches
+      ("electronica" -> "electronic", "synthwave" -> "synth-pop")
+    - `distance`: seed x seed Jaccard distance matrix over tokens + families
+    Resolutions are memoized, so repeat lookups are a dict hit.
+    """
+
+    def __init__(self, seeds=VALID_SEED_GENRES):
+        self.seeds = sorted(seeds)
+        self.seed_pos = {s: i for i, s in enumerate(self.seeds)}
+        self.phrase_index = {}
+        self.token_index = {}
+        self.alias_index = {}
+        self._trie = _TrieNode()
+        self._memo = {}
+
+        for seed in self.seeds:
+            tokens = tokenize(seed)
+            self.phrase_index[' '.join(tokens)] = seed
+            self.phrase_index[''.join(tokens)] = seed
+            if seed in NON_GENRE_SEEDS:
+                continue
+            for tok in tokens:
+                # Single letters ('r', 'n', 'b', 'j', 'k') only count as part of a phrase
+                if len(tok) > 1 and tok not in PHRASE_ONLY_TOKENS:
+                    self.token_index.setdefault(tok, []).append(seed)
+                    self._trie_insert(tok)
+
+        for alias, seed in ALIASES.items():
+            tokens = tokenize(alias)
+            self.alias_index[' '.join(tokens)] = seed
+            self.alias_index[''.join(tokens)] = seed
+
+        self.distance = self._build_distance_matrix()
+
+    def _trie_insert(self, token):
+        node = self._trie
+        for ch in token:
+            node = node.children.setdefault(ch, _TrieNode())
+        node.terminal = True
+
+    def _longest_prefix(self, word, min_len=4):
+        """Longest seed token that is a prefix of `word` (at least `min_len` chars)."""
+        node = self._trie
+        best = None
+        for i, ch in enumerate(word):
+            node = node.children.get(ch)
+            if node is None:
+                break
+            if node.terminal and i + 1 >= min_len:
+                best = word[:i + 1]
+        return best
+
+    def _build_distance_matrix(self):
+        features = {}
+        for seed in self.seeds:
+            tokens = set(tokenize(seed))
+            feats = set(tokens)
+            for fam, members in FAMILIES.items():
+                if tokens & members:
+                    feats.add(fam)
+            features[seed] = feats
+
+        vocab = sorted(set().union(*features.values()))
+        col = {f: i for i, f in enumerate(vocab)}
+        A = np.zeros((len(self.seeds), len(vocab)), dtype=np.float32)
+        for i, seed in enumerate(self.seeds):
+            A[i, [col[f] for f in features[seed]]] = 1.0
+
+        # Vectorized Jaccard: |a & b| / |a | b|
+        inter = A @ A.T
+        sizes = A.sum(axis=1)
+        union = sizes[:, None] + sizes[None, :] - inter
+        return 1.0 - inter / np.maximum(union, 1.0)
+
+    def resolve(self, genre, k=2):
+        """Closest valid seed genres for any genre string, best first (may be empty)."""
+        key = (genre.lower().strip(), k)
+        cached = self._memo.get(key)
+        if cached is not None:
+            return cached
+
+        result = self._resolve(key[0])[:k]
+        self._memo[key] = result
+        return result
+
+    def _resolve(self, genre):
+        if genre in self.seed_pos:
+            return [genre]
+        tokens = tokenize(genre)
+        if not tokens:
+            return []
+
+        scores = {}
+        aliased = set()
+
+        def add(seed, score):
+            scores[seed] = max(scores.get(seed, 0.0), score)
+
+        # Whole string or any contiguous run of tokens forming a seed ("indie pop" in "indie pop rap")
+        n = len(tokens)
+        for length in range(n, 0, -1):
+            for start in range(n - length + 1):
+                run = tokens[start:start + length]
+                for phrase in (' '.join(run), ''.join(run)):
+                    seed = self.phrase_index.get(phrase)
+                    if seed and (length > 1 or len(run[0]) > 1):
+                        # Longer runs and later (head-noun) positions are more specific
+                        add(seed, 2.0 + length + 0.1 * start)
+                    alias = self.alias_index.get(phrase)
+                    if alias:
+                        add(alias, 0.5 + length + 0.1 * start)
+                        aliased.update(range(start, start + length))
+
+        for pos, tok in enumerate(tokens):
+            for seed in self.token_index.get(tok, ()):
+                # Prefer seeds that are exactly this token ('pop' over 'synth-pop')
+                add(seed, (1.2 if seed == tok else 1.0) + 0.1 * pos)
+            if tok not in self.token_index and pos not in aliased:
+                prefix = self._longest_prefix(tok)
+                if prefix:
+                    for seed in self.token_index[prefix]:
+                        add(seed, 0.8 + 0.1 * pos)
+
+        return [s for s, _ in sorted(scores.items(), key=lambda x: (-x[1], x[0]))]
+
+    def validate_seeds(self, genres, max_seeds=5):
+        """
+        Maps a list of genre strings onto valid, de-duplicated seeds so no upstream
+        call is spent on a seed Spotify will reject.
+        """
+        valid = []
+        for g in genres or []:
+            for seed in self.resolve(g, k=1):
+                if seed not in valid:
+                    valid.append(seed)
+            if len(valid) >= max_seeds:
+                break
+        return valid[:max_seeds]
+
+    def seed_weights(self, weighted_genres):
+        """[(micro_genre, count), ...] -> weight vector over `seeds`."""
+        w = np.zeros(len(self.seeds), dtype=np.float32)
+        for genre, count in weighted_genres:
+            for rank, seed in enumerate(self.resolve(genre)):
+                w[self.seed_pos[seed]] += count / (rank + 1)
+        return w
+
+    def anti_genres(self, weighted_genres, candidates=None, n=2):
+        """
+        Candidate seeds ranked by weighted distance from the user's genre profile
+        (farthest first). Falls back to the candidates unchanged for an empty profile.
+        """
+        candidates = [c for c in (candidates or self.seeds) if c in self.seed_pos]
+        w = self.seed_weights(weighted_genres)
+        if not w.any():
+            return candidates[:n] if n else candidates
+        cols = [self.seed_pos[c] for c in candidates]
+        dist = (w @ self.distance[:, cols]) / w.sum()
+        order = np.argsort(-dist, kind='stable')
+        ranked = [candidates[i] for i in order]
+        return ranked[:n] if n else ranked
+
+
+genre_index = GenreIndex()
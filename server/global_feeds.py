@@ -0,0 +1,123 @@
+"""
+Background refresh of user-independent catalog feeds.
+
+New releases per market and per-genre track pools are the same for every user
+and change slowly, so instead of fetching them on each dashboard load, one
+scheduler thread per process refreshes them on a jittered timer (through the
+app's client-credentials client) and stores them in the shared cache. Readers
+get the last good value in O(1); a failed refresh keeps serving it and is
+retried sooner.
+
+Configuration (comma-separated):
+- FEED_MARKETS: markets for new releases (default "US")
+- FEED_GENRES: seed genres to keep search pools for (default none)
+"""
+import os
+import random
+import threading
+import time
+
+from cache import cache
+
+FEED_MARKETS = [m.strip().upper() for m in os.getenv("FEED_MARKETS", "US").split(",") if m.strip()]
+FEED_GENRES = [g.strip().lower() for g in os.getenv("FEED_GENRES", "").split(",") if g.strip()]
+NEW_RELEASES_INTERVAL = 6 * 3600  # seconds
+GENRE_POOL_INTERVAL = 12 * 3600
+GENRE_POOL_SIZE = 100
+# Each refresh lands within +/- this fraction of its interval, so workers and feeds don't fire together
+JITTER = 0.1
+RETRY_DELAY = 300
+# How long a value stays servable without a successful refresh
+STALE_TTL = 7 * 24 * 3600
+
+
+def _jittered(seconds):
+    return seconds * random.uniform(1 - JITTER, 1 + JITTER)
+
+
+def feed_key(name):
+    return f"global:{name}"
+
+
+class FeedScheduler:
+    def __init__(self, sp_factory):
+        self._sp_factory = sp_factory
+        self._sp = None
+        self._feeds = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def register(self, name, load, interval):
+        """`load(sp)` produces the feed's value; it's refreshed every ~`interval` seconds."""
+        with self._lock:
+            # Spread first refreshes a little too, so a cold start doesn't burst
+            self._feeds[name] = {'load': load, 'interval': interval, 'due': time.monotonic() + random.uniform(0, 5),
+                                 'refreshed_at': None, 'error': None}
+        self._wake.set()
+
+    def ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='global-feeds', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                name, feed = min(self._feeds.items(), key=lambda kv: kv[1]['due'], default=(None, None))
+            wait = feed['due'] - time.monotonic() if feed else None
+            if wait is None or wait > 0:
+                self._wake.wait(wait)
+                self._wake.clear()
+                continue
+            self.refresh(name)
+
+    def refresh(self, name):
+        feed = self._feeds[name]
+        try:
+            if self._sp is None:
+                self._sp = self._sp_factory()
+            cache.set(feed_key(name), feed['load'](self._sp), ttl=STALE_TTL)
+            feed.update(refreshed_at=time.time(), error=None, due=time.monotonic() + _jittered(feed['interval']))
+        except Exception as e:
+            print(f"Global feed {name} refresh failed (serving last value): {e}")
+            feed.update(error=str(e), due=time.monotonic() + _jittered(RETRY_DELAY))
+
+    def status(self):
+        with self._lock:
+            return {name: {'refreshed_at': f['refreshed_at'], 'error': f['error'],
+                           'next_in': round(f['due'] - time.monotonic())}
+                    for name, f in self._feeds.items()}
+
+
+def _load_new_releases(market):
+    return lambda sp: sp.new_releases(country=market, limit=50)['albums']['items']
+
+
+def _load_genre_pool(genre):
+    def load(sp):
+        tracks = []
+        for offset in range(0, GENRE_POOL_SIZE, 50):
+            tracks.extend(sp.search(q=f"genre:{genre}", type='track', limit=50, offset=offset)['tracks']['items'])
+        return [t for t in tracks if t]
+    return load
+
+
+def _app_client():
+    # Imported lazily: the scheduler module itself needs no credentials to be importable
+    from auth import SpotifyAuthenticator
+    return SpotifyAuthenticator.get_app_client()
+
+
+scheduler = FeedScheduler(_app_client)
+for _market in FEED_MARKETS:
+    scheduler.register(f"new_releases:{_market}", _load_new_releases(_market), NEW_RELEASES_INTERVAL)
+for _genre in FEED_GENRES:
+    scheduler.register(f"genre_pool:{_genre}", _load_genre_pool(_genre), GENRE_POOL_INTERVAL)
+
+
+def get_feed(name):
+    """The feed's latest value (possibly stale), or None if it hasn't loaded yet. Starts the scheduler on first use."""
+    scheduler.ensure_started()
+    return cache.get(feed_key(name))
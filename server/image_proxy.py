@@ -0,0 +1,60 @@
+import hashlib
+import os
+import threading
+from urllib.parse import quote, urlparse
+
+from disk_cache import ContentCache
+
+# Only Spotify's image CDNs are proxied, so /img can't be used to fetch arbitrary URLs
+ALLOWED_HOSTS = frozenset({
+    'i.scdn.co', 'mosaic.scdn.co', 'image-cdn-ak.spotifycdn.com', 'image-cdn-fa.spotifycdn.com',
+})
+IMAGE_CACHE_BYTES = int(os.getenv("IMAGE_CACHE_MB", 100)) * 1024 * 1024
+MAX_IMAGE_BYTES = 1024 * 1024
+# Spotify image URLs are content-addressed (a new cover gets a new URL), so caching can be permanent
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_MAGIC = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF8', 'image/gif'),
+)
+
+
+def is_allowed(url):
+    parsed = urlparse(url)
+    return parsed.scheme == 'https' and parsed.hostname in ALLOWED_HOSTS
+
+
+def content_type(data):
+    for magic, mime in _MAGIC:
+        if data.startswith(magic):
+            return mime
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def etag(data):
+    return '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+
+
+def proxied_url(base, url):
+    """`url` routed through the /img proxy mounted at `base` (e.g. 'https://api.example.com/')."""
+    return f"{base.rstrip('/')}/img?u={quote(url, safe='')}" if url else url
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_image_fetcher():
+    """Process-wide fetcher for cover art: its own connection pool and on-disk LRU cache."""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            # Imported lazily: requests is only needed once an image is actually proxied
+            from preview_fetcher import PreviewFetcher
+            _fetcher = PreviewFetcher(max_concurrency=8, timeout=(3.05, 5), max_bytes=MAX_IMAGE_BYTES,
+                                      cache=ContentCache('images', max_bytes=IMAGE_CACHE_BYTES))
+        return _fetcher
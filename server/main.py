@@ -1,9 +1,15 @@
-from fastapi import FastAPI, HTTPException, Request, Response, Depends
-from fastapi.responses import RedirectResponse
+from fastapi import FastAPI, HTTPException, Request, Response, Depends, Header, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import RedirectResponse, FileResponse
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
 from typing import Optional, List
 
+import asyncio
+import hmac
+import time
 import os
 import sys
 
@@ -13,9 +19,33 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from auth import SpotifyAuthenticator
 from spotify_client import SpotifyClient
 from advanced_features import AdvancedFeatureEngine
+from deadline import Deadline, DEFAULT_DEADLINE_MS
+from cache import cache, token_key
+from projection import parse_fields, project, wants
+from admission import AdmissionMiddleware
+from snapshot import SnapshotSpotify, export_snapshot, snapshot_bytes
+from image_proxy import is_allowed as image_allowed, get_image_fetcher, content_type, etag, CACHE_CONTROL
+import feeds
+from mood import MOOD_RESULTS, parse_targets
+from catalog import catalog
+from strategy_stats import strategy_stats
+from global_feeds import scheduler as feed_scheduler
+from profiling import ProfilingMiddleware, profiler, profiled_endpoint, trace_client, PROFILE_SECRET, PROFILE_DIR
 import spotipy
 
+class ProfiledRoute(APIRoute):
+    """Lets the profiler see which threadpool thread is running a profiled request's endpoint."""
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, profiled_endpoint(endpoint), **kwargs)
+
 app = FastAPI(title="SonicDiscovery API")
+app.router.route_class = ProfiledRoute
+
+# Profiling is innermost, so profiles cover the handler rather than queueing/compression
+app.add_middleware(ProfilingMiddleware)
+
+# Admission control sits inside CORS so 503/429 rejections still carry CORS headers
+app.add_middleware(AdmissionMiddleware)
 
 origins = [
     "https://sonic-discovery-update-pi.vercel.app",  # Your actual Vercel URL
@@ -29,8 +59,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Partial-Results", "Retry-After", "X-Profile-Id", "X-Next-Cursor"],
 )
 
+# Compress anything bigger than ~1 KB; prefer brotli when brotli-asgi is installed
+COMPRESSION_MIN_SIZE = 1000
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+# Snapshot-serving mode: answer reads from a memory-mapped user snapshot, no Spotify calls
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH")
+_snapshot_sp = None
+
+def get_snapshot_sp():
+    global _snapshot_sp
+    if _snapshot_sp is None:
+        _snapshot_sp = SnapshotSpotify(SNAPSHOT_PATH)
+    return _snapshot_sp
+
 class LoginRequest(BaseModel):
     code: str
 
@@ -41,7 +90,22 @@ def get_authenticator():
     except ValueError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-def get_client(request: Request, auth: SpotifyAuthenticator = Depends(get_authenticator)):
+def get_deadline(request: Request):
+    """Per-request time budget; clients may ask for a tighter one via X-Deadline-Ms."""
+    budget_ms = DEFAULT_DEADLINE_MS
+    header = request.headers.get("X-Deadline-Ms")
+    if header and header.isdigit():
+        budget_ms = min(int(header), DEFAULT_DEADLINE_MS)
+    return Deadline(budget_ms)
+
+def get_client(request: Request, deadline: Deadline = Depends(get_deadline),
+               img_size: Optional[int] = Query(None, ge=16, le=2000), img_proxy: bool = False):
+    # ?img_size= picks the closest cover variant (e.g. 300 for 150px cards on 2x screens);
+    # ?img_proxy=true routes image URLs through this API's cached /img endpoint
+    image_opts = {'img_size': img_size, 'image_proxy': str(request.base_url) if img_proxy else None}
+    if SNAPSHOT_PATH:
+        return make_client(None, deadline, image_opts)
+
     token = request.cookies.get("spotify_token")
     if not token:
         # Check header just in case
@@ -53,11 +117,52 @@ def get_client(request: Request, auth: SpotifyAuthenticator = Depends(get_authen
          raise HTTPException(status_code=401, detail="Not authenticated")
     
     try:
-        sp = spotipy.Spotify(auth=token)
-        return SpotifyClient(sp)
+        return make_client(token, deadline, image_opts)
     except Exception as e:
         raise HTTPException(status_code=401, detail=str(e))
 
+def make_client(token, deadline, image_opts):
+    """SpotifyClient for a user token (or the snapshot in snapshot mode); shared by HTTP and WebSocket routes."""
+    if SNAPSHOT_PATH:
+        return trace_client(SpotifyClient(get_snapshot_sp(), deadline=deadline, user_key="snapshot",
+                                          global_feeds=False, **image_opts))
+    # No status retries: spotipy would sleep on Retry-After well past our deadline
+    sp = spotipy.Spotify(auth=token, status_retries=0)
+    return trace_client(SpotifyClient(sp, deadline=deadline, user_key=token_key(token), catalog_sp=get_catalog_sp(),
+                                      **image_opts))
+
+def get_catalog_sp():
+    """App-token client for catalog calls, or None (user token for everything) without client credentials."""
+    try:
+        return SpotifyAuthenticator.get_app_client()
+    except ValueError:
+        return None
+
+def get_page(limit: int = Query(12, ge=1, le=50), cursor: Optional[str] = None):
+    return {'limit': limit, 'cursor': cursor}
+
+def get_rec_client(page: dict = Depends(get_page), client: SpotifyClient = Depends(get_client)):
+    """
+    Client for recommendation routes: skips tracks the user already has or was just shown.
+    Cursor pages only slice a stored pool, so they just record what's served (no library sync).
+    """
+    client.enable_exclusion(sync_library=not page['cursor'])
+    return client
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin routes are only enabled when PROFILE_SECRET is set."""
+    if not PROFILE_SECRET or not x_admin_token or not hmac.compare_digest(x_admin_token, PROFILE_SECRET):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+def get_fields(fields: Optional[str] = None):
+    """`?fields=a,b.c` projection shared by all data routes."""
+    return parse_fields(fields)
+
+def mark_partial(response: Response, client: SpotifyClient):
+    """Flags results that were cut short by the request deadline."""
+    if client.partial:
+        response.headers["X-Partial-Results"] = "true"
+
 # --- Auth Routes ---
 
 @app.get("/login")
@@ -91,106 +196,331 @@ def logout(response: Response):
     response.delete_cookie("spotify_token")
     return {"status": "logged_out"}
 
+@app.get("/img")
+def image(u: str, request: Request):
+    """Spotify cover art, fetched once and served from a local LRU cache with long-lived cache headers."""
+    if not image_allowed(u):
+        raise HTTPException(status_code=400, detail="Unsupported image URL")
+    data = get_image_fetcher().fetch(u)
+    if not data:
+        raise HTTPException(status_code=502, detail="Image unavailable")
+    headers = {"Cache-Control": CACHE_CONTROL, "ETag": etag(data)}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=content_type(data), headers=headers)
+
+# --- Admin Routes ---
+
+@app.post("/admin/profiling", dependencies=[Depends(require_admin)])
+def arm_profiling(path_prefix: str = "/", count: int = 1):
+    """Profiles the next `count` requests under `path_prefix` (count=0 disarms)."""
+    profiler.arm(path_prefix, count)
+    return profiler.status()
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+def get_profile_output(profile_id: str, kind: str = "speedscope"):
+    """Downloads a stored profile: kind=speedscope (open in speedscope.app) or kind=spans."""
+    if kind not in ("speedscope", "spans") or not profile_id.replace("-", "").isalnum():
+        raise HTTPException(status_code=400, detail="Invalid profile request")
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.{kind}.json")
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json")
+
+@app.get("/admin/catalog", dependencies=[Depends(require_admin)])
+def catalog_status():
+    """The catalogue version this worker has mapped (workers pick up a new one within seconds)."""
+    current = catalog.current()
+    return {"pid": os.getpid(), "catalog": current.meta if current else None}
+
+@app.get("/admin/feeds", dependencies=[Depends(require_admin)])
+def global_feed_status():
+    """When each background-refreshed global feed last loaded, and when it's next due."""
+    return {"pid": os.getpid(), "feeds": feed_scheduler.status()}
+
+@app.get("/admin/strategies", dependencies=[Depends(require_admin)])
+def fallback_strategy_stats():
+    """This worker's per-strategy latency and yield for the search-based recommendation fallback."""
+    return {"pid": os.getpid(), "strategies": strategy_stats.snapshot(),
+            "order": strategy_stats.order(strategy_stats.snapshot())}
+
+@app.get("/snapshot/export")
+def export_user_snapshot(client: SpotifyClient = Depends(get_client)):
+    """Downloads the caller's dashboard data as a columnar .npz snapshot."""
+    cols = export_snapshot(client.raw_sp)
+    return Response(
+        content=snapshot_bytes(cols),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": "attachment; filename=sonic-snapshot.npz"}
+    )
+
 @app.get("/me")
-def get_profile(client: SpotifyClient = Depends(get_client)):
-    return client.get_user_profile()
+def get_profile(fields: Optional[dict] = Depends(get_fields), client: SpotifyClient = Depends(get_client)):
+    return project(client.get_user_profile(), fields)
 
 # --- Dashboard Routes ---
 
+DASHBOARD_SECTIONS = {
+    "top_genres": lambda c: c.get_top_genres(5),
+    "top_artists": lambda c: c.get_top_artists(5),
+    "top_tracks": lambda c: c.get_top_tracks(4),
+    "new_releases": lambda c: c.get_new_releases(4),
+    "recent": lambda c: c.get_liked_tracks(8),
+    "audio_profile": lambda c: c.get_audio_profile(),
+    "listening_stats": lambda c: c.get_listening_stats(),
+}
+# Served from the global feed cache already (user-independent)
+UNCACHED_SECTIONS = {"new_releases"}
+DASHBOARD_TTL = 300  # seconds
+# Past its TTL, per-user data is still served instantly for this long while one background refresh runs
+DASHBOARD_STALE_GRACE = int(os.getenv("DASHBOARD_STALE_GRACE", 1800))
+
+def user_data(client: SpotifyClient, name, load, ttl=DASHBOARD_TTL):
+    """
+    Per-user data, stale-while-revalidate: only a cold (or long-expired) entry
+    waits on Spotify. Empty or partial results (deadline hit, or an upstream
+    failure the loader papered over) are never cached, and a background refresh
+    that comes back that way keeps the stale value.
+    """
+    def refresh():
+        background = client.unbounded()
+        value = load(background)
+        if not value or background.partial:
+            raise ValueError("empty or partial result")
+        return value
+
+    # Image options change URLs in the payload, so they're part of the key
+    key = f"user:{name}:{client.user_key}:{client.img_size}:{client.image_proxy}"
+    return cache.get_or_refresh(key, lambda: load(client), ttl=ttl, grace=DASHBOARD_STALE_GRACE,
+                                should_cache=lambda value: bool(value) and not client.partial, refresher=refresh)
+
+def dashboard_section(client: SpotifyClient, name):
+    load = DASHBOARD_SECTIONS[name]
+    return load(client) if name in UNCACHED_SECTIONS else user_data(client, name, load)
+
 @app.get("/dashboard/stats")
-def get_dashboard_stats(client: SpotifyClient = Depends(get_client)):
-    return {
-        "top_genres": client.get_top_genres(5),
-        "top_artists": client.get_top_artists(5),
-        "top_tracks": client.get_top_tracks(4),
-        "new_releases": client.get_new_releases(4),
-        "recent": client.get_liked_tracks(8),
-        "audio_profile": client.get_audio_profile(),
-        "listening_stats": client.get_listening_stats()
-    }
+def get_dashboard_stats(response: Response, fields: Optional[dict] = Depends(get_fields), client: SpotifyClient = Depends(get_client)):
+    # Only sections selected by ?fields= are computed, so unused sections cost no upstream calls
+    stats = {name: dashboard_section(client, name) for name in DASHBOARD_SECTIONS if wants(fields, name)}
+    mark_partial(response, client)
+    return project(stats, fields)
 
 @app.get("/dashboard/audio-profile")
-def get_audio_profile(client: SpotifyClient = Depends(get_client)):
+def get_audio_profile(fields: Optional[dict] = Depends(get_fields), client: SpotifyClient = Depends(get_client)):
     """Returns user's audio profile based on their top tracks."""
-    profile = client.get_audio_profile()
+    profile = dashboard_section(client, "audio_profile")
     if not profile:
         raise HTTPException(status_code=404, detail="Could not generate audio profile")
-    return profile
+    return project(profile, fields)
 
 @app.get("/dashboard/listening-stats")
-def get_listening_stats(client: SpotifyClient = Depends(get_client)):
+def get_listening_stats(response: Response, fields: Optional[dict] = Depends(get_fields), client: SpotifyClient = Depends(get_client)):
     """Returns comprehensive listening statistics."""
-    return client.get_listening_stats()
+    stats = dashboard_section(client, "listening_stats")
+    mark_partial(response, client)
+    return project(stats, fields)
+
+ANALYTICS_TTL = 600  # seconds
+
+@app.get("/dashboard/analytics")
+def get_taste_analytics(response: Response, fields: Optional[dict] = Depends(get_fields), client: SpotifyClient = Depends(get_client)):
+    """Short/medium/long-term taste profiles, genre distributions and drift, cached per user."""
+    analytics = user_data(client, "analytics", lambda c: c.get_taste_analytics(), ttl=ANALYTICS_TTL)
+    mark_partial(response, client)
+    return project(analytics, fields)
+
+@app.get("/playlists/analytics")
+def get_playlist_analytics(response: Response, refresh: bool = False, fields: Optional[dict] = Depends(get_fields),
+                           client: SpotifyClient = Depends(get_client)):
+    """Per-playlist genre and audio-feature histograms plus a combined taste vector."""
+    key = f"playlists:{client.user_key}"
+    if refresh:
+        cache.delete(key)
+    # An ingestion that missed pages is served but not cached, so the next request retries it
+    analytics = cache.get_or_set(key, client.get_playlist_analytics, ttl=ANALYTICS_TTL,
+                                 should_cache=lambda value: value['complete'])
+    if not analytics['complete']:
+        response.headers["X-Partial-Results"] = "true"
+    return project(analytics, fields)
+
+# --- Co-occurrence model (opt-in) ---
+
+@app.post("/model/contribute")
+def contribute_listening(client: SpotifyClient = Depends(get_client)):
+    """Opts in (or re-syncs): shares the caller's top + saved tracks with the local recommender."""
+    return client.contribute_listening()
+
+@app.delete("/model/contribute")
+def withdraw_listening(client: SpotifyClient = Depends(get_client)):
+    """Opts out: removes the caller's tracks from the local recommender."""
+    client.withdraw_listening()
+    return {"status": "withdrawn"}
 
 # --- Feature Routes ---
+# Each mode ranks a pool of FEED_POOL_SIZE candidates once; ?cursor= pages through it
+# with no upstream calls. The next page's cursor comes back in X-Next-Cursor.
+
+def serve_feed(response: Response, client: SpotifyClient, mode: str, build, page: dict, params: Optional[dict] = None):
+    # Cursors are bound to the mode, the route's parameters and the image options baked into the pool
+    params = {**(params or {}), 'img_size': client.img_size, 'image_proxy': client.image_proxy}
+    try:
+        tracks, next_cursor = feeds.serve(client.user_key, mode, build, page['limit'], page['cursor'], params)
+    except feeds.InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    except feeds.FeedExpired:
+        raise HTTPException(status_code=410, detail="Feed expired, request the first page again")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    # Only what's actually served counts as shown for the exclusion filter
+    if client.exclusion:
+        client.exclusion.record(tracks)
+    mark_partial(response, client)
+    return tracks
 
 @app.get("/features/discover")
-def discover(client: SpotifyClient = Depends(get_client)):
+def discover(response: Response, page: dict = Depends(get_page), fields: Optional[dict] = Depends(get_fields), client: SpotifyClient = Depends(get_rec_client)):
     """
     Improved discovery using mixed seeds from:
     - Top tracks (listening history)
     - Top artists
     - Liked tracks (fallback)
     """
-    seeds = client.get_mixed_seeds()
-    
-    # Build recommendation request with available seeds
-    kwargs = {'limit': 12}
-    if seeds['seed_tracks']:
-        kwargs['seed_tracks'] = seeds['seed_tracks']
-    if seeds['seed_artists']:
-        kwargs['seed_artists'] = seeds['seed_artists']
-    
-    # If we have no seeds at all, use genre fallback
-    if not seeds['seed_tracks'] and not seeds['seed_artists']:
-        return client.get_recommendations(seed_genres=['pop', 'rock'], limit=12)
-    
-    return client.get_recommendations(**kwargs)
+    def build(pool_size):
+        seeds = client.get_mixed_seeds()
+
+        # Build recommendation request with available seeds
+        kwargs = {'limit': pool_size, 'record': False}
+        if seeds['seed_tracks']:
+            kwargs['seed_tracks'] = seeds['seed_tracks']
+        if seeds['seed_artists']:
+            kwargs['seed_artists'] = seeds['seed_artists']
+
+        # If we have no seeds at all, use genre fallback
+        if not seeds['seed_tracks'] and not seeds['seed_artists']:
+            kwargs['seed_genres'] = ['pop', 'rock']
+
+        return client.get_recommendations(**kwargs)
+
+    return project(serve_feed(response, client, "discover", build, page), fields)
 
 @app.get("/features/mood")
-def mood_tuner(valence: float, energy: float, client: SpotifyClient = Depends(get_client)):
+def mood_tuner(valence: float, energy: float, response: Response, page: dict = Depends(get_page), fields: Optional[dict] = Depends(get_fields), client: SpotifyClient = Depends(get_rec_client)):
     """
     Mood-based recommendations using mixed seeds.
     """
-    seeds = client.get_mixed_seeds()
-    
-    kwargs = {
-        'limit': 12,
-        'target_valence': valence,
-        'target_energy': energy
-    }
-    
-    if seeds['seed_tracks']:
-        kwargs['seed_tracks'] = seeds['seed_tracks']
-    if seeds['seed_artists']:
-        kwargs['seed_artists'] = seeds['seed_artists']
-    
-    if not seeds['seed_tracks'] and not seeds['seed_artists']:
-        kwargs['seed_genres'] = ['pop']
-    
-    return client.get_recommendations(**kwargs)
+    def build(pool_size):
+        seeds = client.get_mixed_seeds()
+
+        kwargs = {
+            'limit': pool_size,
+            'record': False,
+            'target_valence': valence,
+            'target_energy': energy
+        }
+
+        if seeds['seed_tracks']:
+            kwargs['seed_tracks'] = seeds['seed_tracks']
+        if seeds['seed_artists']:
+            kwargs['seed_artists'] = seeds['seed_artists']
+
+        if not seeds['seed_tracks'] and not seeds['seed_artists']:
+            kwargs['seed_genres'] = ['pop']
+
+        return client.get_recommendations(**kwargs)
+
+    return project(serve_feed(response, client, "mood", build, page, {"valence": valence, "energy": energy}), fields)
+
+# Live Mood Tuner sessions are closed after this long without a slider event
+MOOD_IDLE_TIMEOUT = 600  # seconds
+
+@app.websocket("/ws/mood")
+async def mood_session(websocket: WebSocket, img_size: Optional[int] = Query(None, ge=16, le=2000)):
+    """
+    Live Mood Tuner. The first message is {"valence", "energy"} (plus "token" when
+    the spotify_token cookie isn't sent); the candidate pool and its audio features
+    are fetched once, then every {"valence", "energy"} message gets the re-ranked
+    top tracks back as {"type": "tracks", ...} with no further Spotify calls.
+    CORS doesn't cover WebSockets, so browser connections from other origins are
+    refused here (the cookie would otherwise authenticate them cross-site).
+    """
+    origin = websocket.headers.get("origin")
+    if origin is not None and origin not in origins:
+        await websocket.close(code=1008, reason="Origin not allowed")
+        return
+    await websocket.accept()
+    try:
+        first = await asyncio.wait_for(websocket.receive_json(), timeout=30)
+        token = websocket.cookies.get("spotify_token") or first.get("token")
+        if not token and not SNAPSHOT_PATH:
+            await websocket.close(code=1008, reason="Not authenticated")
+            return
+        targets = parse_targets(first)
+
+        def build():
+            client = make_client(token, Deadline(DEFAULT_DEADLINE_MS), {'img_size': img_size, 'image_proxy': None})
+            client.enable_exclusion()
+            return client, client.build_mood_pool()
+        try:
+            client, pool = await run_in_threadpool(build)
+        except Exception as e:
+            print(f"Mood pool failed: {e}")
+            await websocket.send_json({"type": "error", "detail": "Could not load the candidate pool"})
+            await websocket.close(code=1011, reason="Upstream error")
+            return
+        await websocket.send_json({"type": "ready", "pool": len(pool), "partial": client.partial})
+
+        while True:
+            started = time.perf_counter()
+            tracks = pool.rank(*targets, limit=MOOD_RESULTS)
+            await websocket.send_json({
+                "type": "tracks", "valence": targets[0], "energy": targets[1], "tracks": tracks,
+                "ms": round((time.perf_counter() - started) * 1000, 3),
+            })
+            while True:
+                message = await asyncio.wait_for(websocket.receive_json(), timeout=MOOD_IDLE_TIMEOUT)
+                try:
+                    targets = parse_targets(message)
+                    break
+                except ValueError as e:
+                    await websocket.send_json({"type": "error", "detail": str(e)})
+    except (ValueError, AttributeError) as e:
+        await websocket.close(code=1003, reason=f"Invalid message: {e}")
+    except asyncio.TimeoutError:
+        await websocket.close(code=1000, reason="Idle")
+    except WebSocketDisconnect:
+        pass
 
 @app.get("/features/time-travel")
-def time_travel(year: int, client: SpotifyClient = Depends(get_client)):
-    return client.search_decade(year, year+9, limit=12)
+def time_travel(year: int, response: Response, page: dict = Depends(get_page), fields: Optional[dict] = Depends(get_fields), client: SpotifyClient = Depends(get_rec_client)):
+    build = lambda pool_size: client.search_decade(year, year+9, limit=pool_size, record=False)
+    return project(serve_feed(response, client, "time-travel", build, page, {"year": year}), fields)
 
 @app.get("/features/vibe")
-def vibe_teleporter(location: str, weather: str, time: str, client: SpotifyClient = Depends(get_client)):
-    engine = AdvancedFeatureEngine(client)
-    params, seed_genres = engine.vibe_teleporter(location, weather, time)
-    return client.get_recommendations(seed_genres=seed_genres, limit=12, **params)
+def vibe_teleporter(location: str, weather: str, time: str, response: Response, page: dict = Depends(get_page), fields: Optional[dict] = Depends(get_fields), client: SpotifyClient = Depends(get_rec_client)):
+    def build(pool_size):
+        engine = AdvancedFeatureEngine(client)
+        params, seed_genres = engine.vibe_teleporter(location, weather, time)
+        return client.get_recommendations(seed_genres=seed_genres, limit=pool_size, record=False, **params)
+
+    return project(serve_feed(response, client, "vibe", build, page, {"location": location, "weather": weather, "time": time}), fields)
 
 @app.get("/features/aesthetic")
-def aesthetic(style: str, client: SpotifyClient = Depends(get_client)):
-    engine = AdvancedFeatureEngine(client)
-    params, seed_genres = engine.aesthetic_generator(style)
-    return client.get_recommendations(seed_genres=seed_genres, limit=12, **params)
+def aesthetic(style: str, response: Response, page: dict = Depends(get_page), fields: Optional[dict] = Depends(get_fields), client: SpotifyClient = Depends(get_rec_client)):
+    def build(pool_size):
+        engine = AdvancedFeatureEngine(client)
+        params, seed_genres = engine.aesthetic_generator(style)
+        return client.get_recommendations(seed_genres=seed_genres, limit=pool_size, record=False, **params)
+
+    return project(serve_feed(response, client, "aesthetic", build, page, {"style": style}), fields)
 
 @app.get("/features/alternate")
-def alternate_you(client: SpotifyClient = Depends(get_client)):
-    engine = AdvancedFeatureEngine(client)
-    top_genres = client.get_top_genres()
-    params, seed_genres = engine.alternate_you(top_genres)
-    return client.get_recommendations(seed_genres=seed_genres, limit=12, **params)
+def alternate_you(response: Response, page: dict = Depends(get_page), fields: Optional[dict] = Depends(get_fields), client: SpotifyClient = Depends(get_rec_client)):
+    def build(pool_size):
+        engine = AdvancedFeatureEngine(client)
+        top_genres = client.get_top_genres()
+        params, seed_genres = engine.alternate_you(top_genres)
+        return client.get_recommendations(seed_genres=seed_genres, limit=pool_size, record=False, **params)
+
+    return project(serve_feed(response, client, "alternate", build, page), fields)
 
 # Run with: uvicorn main:app --reload
\ No newline at end of file
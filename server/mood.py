@@ -0,0 +1,43 @@
+import numpy as np
+
+# Candidates fetched once per Mood Tuner session; every slider move re-ranks these locally
+MOOD_POOL_SIZE = 100
+MOOD_RESULTS = 12
+MOOD_FEATURES = ('valence', 'energy')
+
+
+class MoodPool:
+    """
+    A fixed candidate pool plus each track's (valence, energy), re-rankable
+    against any target in microseconds. Tracks without audio features rank last.
+    """
+
+    def __init__(self, tracks, features):
+        self.tracks = tracks
+        # (n, 2) matrix; NaN rows are tracks Spotify returned no features for
+        self.features = np.asarray(features, dtype=np.float64).reshape(-1, len(MOOD_FEATURES))
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def rank(self, valence, energy, limit=MOOD_RESULTS):
+        """The `limit` tracks closest to the (valence, energy) target, closest first."""
+        if not self.tracks:
+            return []
+        dist = np.linalg.norm(self.features - np.array([valence, energy]), axis=1)
+        dist[np.isnan(dist)] = np.inf
+        k = min(limit, len(dist))
+        top = np.argpartition(dist, k - 1)[:k]
+        top = top[np.argsort(dist[top], kind='stable')]
+        return [self.tracks[i] for i in top]
+
+
+def parse_targets(message):
+    """(valence, energy) from a client message, clamped to 0-1. Raises ValueError if missing or not numbers."""
+    try:
+        valence, energy = float(message['valence']), float(message['energy'])
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"expected numeric valence and energy: {e}")
+    if np.isnan(valence) or np.isnan(energy):
+        raise ValueError("valence and energy must be numbers")
+    return min(max(valence, 0.0), 1.0), min(max(energy, 0.0), 1.0)
@@ -0,0 +1,266 @@
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from disk_cache import DATA_DIR
+
+# Audio features summarised per playlist, with histogram ranges
+HISTOGRAM_FEATURES = {
+    'energy': (0.0, 1.0),
+    'danceability': (0.0, 1.0),
+    'valence': (0.0, 1.0),
+    'acousticness': (0.0, 1.0),
+    'instrumentalness': (0.0, 1.0),
+    'tempo': (40.0, 220.0),
+}
+FEATURE_NAMES = list(HISTOGRAM_FEATURES)
+HISTOGRAM_BINS = 10
+ITEM_FIELDS = 'items(track(id,type,artists(id))),next,total'
+STORE_DIR = os.path.join(DATA_DIR, 'playlists')
+
+
+class PlaylistIngestor:
+    """
+    Ingests all of a user's playlists and their items.
+
+    - Playlist pages and item pages are fetched concurrently (offset pagination
+      lets us issue every page request as soon as we know the total)
+    - Item pages are reduced to track/artist IDs as they arrive, so memory is
+      bounded by ID lists rather than full track objects
+    - Tracks are de-duplicated across playlists before features/genres are fetched
+    - Per-user state (snapshot IDs, ID lists, features, genres) is persisted;
+      playlists whose `snapshot_id` hasn't changed are not re-fetched
+    - A playlist is only stored once every one of its pages loaded, and stored
+      playlists are only forgotten after a complete listing, so a failed page
+      means "retry next time", never lost or half-saved data
+    """
+
+    def __init__(self, sp, max_workers=8, store_dir=STORE_DIR):
+        self.sp = sp
+        self.max_workers = max_workers
+        self.store_dir = store_dir
+
+    # --- state ---
+
+    def _state_path(self, user_id):
+        return os.path.join(self.store_dir, f"{user_id}.json")
+
+    def _load_state(self, user_id):
+        try:
+            with open(self._state_path(user_id), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'playlists': {}, 'features': {}, 'artist_genres': {}}
+
+    def _save_state(self, user_id, state):
+        os.makedirs(self.store_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.store_dir, prefix='.tmp-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f, separators=(',', ':'))
+        os.replace(tmp, self._state_path(user_id))
+
+    # --- fetching ---
+
+    def _paginate(self, pool, fetch, page_size):
+        """
+        Fetches page 0, then every remaining offset concurrently. Yields pages as
+        they complete, and None for a page that failed (after page 0, nothing more).
+        """
+        try:
+            first = fetch(limit=page_size, offset=0)
+        except Exception as e:
+            print(f"Failed to fetch first page: {e}")
+            yield None
+            return
+        yield first
+        total = first.get('total') or 0
+        futures = [pool.submit(fetch, limit=page_size, offset=off) for off in range(page_size, total, page_size)]
+        for f in as_completed(futures):
+            try:
+                yield f.result()
+            except Exception as e:
+                print(f"Failed to fetch page: {e}")
+                yield None
+
+    def list_playlists(self, pool):
+        return self._list_playlists(pool)[0]
+
+    def _list_playlists(self, pool):
+        """(playlists, complete): `complete` is False if any listing page failed."""
+        playlists, complete = [], True
+        for page in self._paginate(pool, self.sp.current_user_playlists, 50):
+            if page is None:
+                complete = False
+                continue
+            for p in page.get('items', []):
+                if p:
+                    playlists.append({
+                        'id': p['id'],
+                        'name': p['name'],
+                        'snapshot_id': p.get('snapshot_id'),
+                        'total_items': (p.get('tracks') or p.get('items') or {}).get('total', 0),
+                    })
+        return playlists, complete
+
+    def _fetch_items(self, pool, playlist_id):
+        """
+        Streams a playlist's item pages into (track_ids, artist_ids) lists.
+        Returns None if any page failed: a partial item list must not be stored.
+        """
+        def fetch(limit, offset):
+            return self.sp.playlist_items(playlist_id, fields=ITEM_FIELDS, limit=limit, offset=offset,
+                                          additional_types=('track',))
+
+        track_ids, artist_ids = [], []
+        for page in self._paginate(pool, fetch, 100):
+            if page is None:
+                return None
+            for item in page.get('items', []):
+                track = item.get('track') if item else None
+                if not track or not track.get('id') or track.get('type', 'track') != 'track':
+                    continue
+                track_ids.append(track['id'])
+                artist_ids.extend(a['id'] for a in track.get('artists', []) if a.get('id'))
+        return track_ids, list(dict.fromkeys(artist_ids))
+
+    def _fetch_features(self, pool, track_ids):
+        chunks = [track_ids[i:i + 100] for i in range(0, len(track_ids), 100)]
+        found = {}
+        for f in as_completed([pool.submit(self.sp.audio_features, c) for c in chunks]):
+            try:
+                for feat in f.result() or []:
+                    if feat:
+                        found[feat['id']] = [feat.get(k) or 0.0 for k in FEATURE_NAMES]
+            except Exception as e:
+                print(f"Failed to fetch audio features: {e}")
+        return found
+
+    def _fetch_genres(self, pool, artist_ids):
+        chunks = [artist_ids[i:i + 50] for i in range(0, len(artist_ids), 50)]
+        found = {}
+        for f in as_completed([pool.submit(self.sp.artists, c) for c in chunks]):
+            try:
+                for a in f.result().get('artists', []):
+                    if a:
+                        found[a['id']] = a.get('genres', [])
+            except Exception as e:
+                print(f"Failed to fetch artist genres: {e}")
+        return found
+
+    # --- pipeline ---
+
+    def ingest(self, user_id):
+        """
+        Runs (or incrementally refreshes) ingestion and returns per-playlist + combined
+        analytics. `complete` in the result is False when some page couldn't be fetched;
+        what's shown is then the last stored state for the affected playlists.
+        """
+        state = self._load_state(user_id)
+        stored = state['playlists']
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            playlists, listed = self._list_playlists(pool)
+            complete = listed
+
+            refreshed = 0
+            changed = [p for p in playlists
+                       if p['id'] not in stored or stored[p['id']].get('snapshot_id') != p['snapshot_id']]
+            # Playlists are fetched on a separate small pool so page fetches can't starve
+            with ThreadPoolExecutor(max_workers=max(1, self.max_workers // 2)) as outer:
+                futures = {outer.submit(self._fetch_items, pool, p['id']): p for p in changed}
+                for f in as_completed(futures):
+                    p = futures[f]
+                    try:
+                        items = f.result()
+                    except Exception as e:
+                        print(f"Failed to ingest playlist {p['id']}: {e}")
+                        items = None
+                    if items is None:
+                        # Keep the previous version (and its old snapshot_id, so it's retried next time)
+                        complete = False
+                        continue
+                    track_ids, artist_ids = items
+                    refreshed += 1
+                    stored[p['id']] = {
+                        'name': p['name'], 'snapshot_id': p['snapshot_id'],
+                        'tracks': track_ids, 'artists': artist_ids,
+                    }
+
+            # Forget playlists the user deleted/unfollowed (only a complete listing says which)
+            if listed:
+                current_ids = {p['id'] for p in playlists}
+                for pid in [pid for pid in stored if pid not in current_ids]:
+                    del stored[pid]
+
+            unique_tracks = list(dict.fromkeys(t for p in stored.values() for t in p['tracks']))
+            unique_artists = list(dict.fromkeys(a for p in stored.values() for a in p['artists']))
+
+            missing_tracks = [t for t in unique_tracks if t not in state['features']]
+            missing_artists = [a for a in unique_artists if a not in state['artist_genres']]
+            state['features'].update(self._fetch_features(pool, missing_tracks))
+            state['artist_genres'].update(self._fetch_genres(pool, missing_artists))
+
+        # Drop cached features/genres nobody references anymore so state stays bounded
+        track_set, artist_set = set(unique_tracks), set(unique_artists)
+        state['features'] = {k: v for k, v in state['features'].items() if k in track_set}
+        state['artist_genres'] = {k: v for k, v in state['artist_genres'].items() if k in artist_set}
+        self._save_state(user_id, state)
+
+        return self._summarise(state, unique_tracks, unique_artists, refreshed=refreshed, complete=complete)
+
+    def _summarise(self, state, unique_tracks, unique_artists, refreshed, complete=True):
+        features = state['features']
+        genres = state['artist_genres']
+
+        track_pos = {t: i for i, t in enumerate(unique_tracks)}
+        F = np.full((len(unique_tracks), len(FEATURE_NAMES)), np.nan)
+        for t, vec in features.items():
+            if t in track_pos:
+                F[track_pos[t]] = vec
+
+        def feature_histograms(rows):
+            sub = F[rows]
+            sub = sub[~np.isnan(sub).any(axis=1)]
+            hist = {}
+            for j, name in enumerate(FEATURE_NAMES):
+                counts, _ = np.histogram(sub[:, j], bins=HISTOGRAM_BINS, range=HISTOGRAM_FEATURES[name])
+                hist[name] = counts.tolist()
+            return hist, (sub.mean(axis=0) if len(sub) else None)
+
+        def genre_histogram(artist_ids, top=10):
+            counts = {}
+            for a in artist_ids:
+                for g in genres.get(a, []):
+                    counts[g] = counts.get(g, 0) + 1
+            return sorted(counts.items(), key=lambda x: x[1], reverse=True)[:top]
+
+        playlists = []
+        for pid, p in state['playlists'].items():
+            rows = [track_pos[t] for t in dict.fromkeys(p['tracks'])]
+            hist, mean = feature_histograms(rows)
+            playlists.append({
+                'id': pid,
+                'name': p['name'],
+                'items': len(p['tracks']),
+                'feature_histograms': hist,
+                'feature_means': dict(zip(FEATURE_NAMES, np.round(mean, 3).tolist())) if mean is not None else None,
+                'top_genres': genre_histogram(p['artists']),
+            })
+
+        _, combined = feature_histograms(np.arange(len(unique_tracks)))
+        return {
+            'playlists': playlists,
+            'histogram_bins': {name: list(rng) + [HISTOGRAM_BINS] for name, rng in HISTOGRAM_FEATURES.items()},
+            'combined': {
+                'playlists': len(playlists),
+                'unique_tracks': len(unique_tracks),
+                'total_items': sum(len(p['tracks']) for p in state['playlists'].values()),
+                'taste_vector': dict(zip(FEATURE_NAMES, np.round(combined, 3).tolist())) if combined is not None else None,
+                'top_genres': genre_histogram(unique_artists, top=20),
+            },
+            'refreshed_playlists': refreshed,
+            'complete': complete,
+        }
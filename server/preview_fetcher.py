@@ -0,0 +1,104 @@
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from disk_cache import ContentCache
+
+
+class PreviewFetcher:
+    """
+    Concurrent downloader for 30s preview clips.
+
+    - One pooled `requests.Session` shared by all workers
+    - Bounded concurrency (thread pool sized to the connection pool)
+    - Connect/read timeouts and a hard size cap per response
+    - Bodies streamed into memory buffers, never temp files
+    - Concurrent requests for the same URL share one download
+    - Results stored in a content-addressed on-disk LRU cache
+    """
+
+    def __init__(self, max_concurrency=8, timeout=(3.05, 10), max_bytes=2 * 1024 * 1024,
+                 cache=None, cache_max_bytes=200 * 1024 * 1024):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='preview')
+        self.cache = cache if cache is not None else ContentCache('previews', max_bytes=cache_max_bytes)
+        self._inflight = {}
+        # Re-entrant: done-callbacks of already-finished futures run inside _submit
+        self._lock = threading.RLock()
+
+    def fetch(self, url):
+        """Returns the preview bytes for `url` (cached or downloaded), or None."""
+        if not url:
+            return None
+        return self._submit(url).result()
+
+    def fetch_many(self, urls):
+        """Downloads all `urls` concurrently. Returns {url: bytes or None}."""
+        futures = {u: self._submit(u) for u in dict.fromkeys(u for u in urls if u)}
+        return {u: f.result() for u, f in futures.items()}
+
+    def _submit(self, url):
+        with self._lock:
+            future = self._inflight.get(url)
+            if future is None:
+                future = self.executor.submit(self._fetch_one, url)
+                self._inflight[url] = future
+                future.add_done_callback(lambda _: self._forget(url))
+            return future
+
+    def _forget(self, url):
+        with self._lock:
+            self._inflight.pop(url, None)
+
+    def _fetch_one(self, url):
+        cached = self.cache.get(url)
+        if cached is not None:
+            return cached
+
+        try:
+            with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                if response.status_code != 200:
+                    return None
+                length = response.headers.get('Content-Length')
+                if length and length.isdigit() and int(length) > self.max_bytes:
+                    print(f"Preview too large ({length} bytes): {url}")
+                    return None
+
+                buf = io.BytesIO()
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    buf.write(chunk)
+                    if buf.tell() > self.max_bytes:
+                        print(f"Preview exceeded {self.max_bytes} bytes: {url}")
+                        return None
+                data = buf.getvalue()
+        except Exception as e:
+            print(f"Error downloading preview: {e}")
+            return None
+
+        if data:
+            try:
+                self.cache.put(url, data)
+            except OSError as e:
+                print(f"Error caching preview: {e}")
+        return data or None
+
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+
+def get_preview_fetcher():
+    """Process-wide shared fetcher, so every extractor reuses one connection pool."""
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = PreviewFetcher()
+        return _default_fetcher
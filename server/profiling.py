@@ -0,0 +1,357 @@
+import contextvars
+import hashlib
+import hmac
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+
+from disk_cache import DATA_DIR
+
+# Shared secret for signed X-Profile headers and the admin toggle (profiling is off without it)
+PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")
+PROFILE_DIR = os.path.join(DATA_DIR, 'profiles')
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", 2)) / 1000.0
+# Hard cap so a forgotten toggle can't sample forever
+MAX_PROFILE_SECONDS = 30
+MAX_SIGNATURE_AGE = 300
+# Only the newest profiles are kept on disk (two files each)
+MAX_PROFILES = int(os.getenv("PROFILE_KEEP", 50))
+
+_session = contextvars.ContextVar('profile_session', default=None)
+_span = contextvars.ContextVar('profile_span', default=None)
+
+
+def sign(method, path, expires=None, secret=PROFILE_SECRET):
+    """X-Profile header value for one request: '<expires>.<hmac>'."""
+    expires = int(expires or time.time() + MAX_SIGNATURE_AGE)
+    mac = hmac.new(secret.encode(), f"{expires}:{method} {path}".encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{mac}"
+
+
+def verify(value, method, path, secret=PROFILE_SECRET):
+    if not secret or not value:
+        return False
+    expires, _, _ = value.partition('.')
+    if not expires.isdigit() or int(expires) < time.time() or int(expires) > time.time() + MAX_SIGNATURE_AGE:
+        return False
+    return hmac.compare_digest(value, sign(method, path, int(expires), secret))
+
+
+class Span:
+    __slots__ = ('name', 'start', 'end', 'thread', 'error', 'children')
+
+    def __init__(self, name, start):
+        self.name = name
+        self.start = start
+        self.end = None
+        self.thread = threading.current_thread().name
+        self.error = None
+        self.children = []
+
+    def to_dict(self, origin):
+        return {
+            'name': self.name,
+            'start_ms': round((self.start - origin) * 1000, 3),
+            'duration_ms': round(((self.end or self.start) - self.start) * 1000, 3),
+            'thread': self.thread,
+            'error': self.error,
+            'children': [c.to_dict(origin) for c in self.children],
+        }
+
+
+class ProfileSession:
+    """
+    One profiled request: a sampling profiler over the threads doing the
+    request's work, plus a span tree of SpotifyClient / spotipy calls.
+
+    Threads register themselves via `attach()` while they run request code
+    (the endpoint wrapper and traced calls do this), so concurrent requests
+    on other threads don't pollute the samples.
+    """
+
+    def __init__(self, method, path):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.root = Span(f"{method} {path}", self.started)
+        self._lock = threading.Lock()
+        self._threads = {}
+        self._frames = []
+        self._frame_pos = {}
+        self._samples = {}
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    # --- thread registration ---
+
+    @contextmanager
+    def attach(self):
+        tid = threading.get_ident()
+        with self._lock:
+            self._threads[tid] = self._threads.get(tid, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                if self._threads[tid] == 1:
+                    del self._threads[tid]
+                else:
+                    self._threads[tid] -= 1
+
+    # --- spans ---
+
+    @contextmanager
+    def span(self, name):
+        parent = _span.get()
+        if parent is None or _session.get() is not self:
+            # Worker threads from a ThreadPoolExecutor don't inherit context: hang off the root
+            parent = self.root
+        s = Span(name, time.perf_counter())
+        with self._lock:
+            parent.children.append(s)
+        token = _span.set(s)
+        try:
+            yield s
+        except Exception as e:
+            s.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            s.end = time.perf_counter()
+            _span.reset(token)
+
+    # --- sampling ---
+
+    def start(self):
+        self._sampler.start()
+
+    def stop(self):
+        self.root.end = time.perf_counter()
+        self._stop.set()
+        self._sampler.join()
+
+    def _frame_index(self, code):
+        key = (code.co_filename, code.co_name, code.co_firstlineno)
+        idx = self._frame_pos.get(key)
+        if idx is None:
+            idx = self._frame_pos[key] = len(self._frames)
+            self._frames.append({'name': code.co_name, 'file': code.co_filename, 'line': code.co_firstlineno})
+        return idx
+
+    def _run(self):
+        last = time.perf_counter()
+        deadline = last + MAX_PROFILE_SECONDS
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            now = time.perf_counter()
+            if now > deadline:
+                break
+            with self._lock:
+                tids = list(self._threads)
+            frames = sys._current_frames()
+            for tid in tids:
+                frame = frames.get(tid)
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_index(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    samples, weights = self._samples.setdefault(tid, ([], []))
+                    samples.append(stack[::-1])
+                    weights.append(now - last)
+            last = now
+
+    # --- output ---
+
+    def speedscope(self):
+        """speedscope.app file: one sampled profile per thread plus the spans as an evented profile."""
+        duration = (self.root.end or time.perf_counter()) - self.started
+        profiles = []
+        for tid, (samples, weights) in self._samples.items():
+            profiles.append({
+                'type': 'sampled', 'name': f"thread {tid}", 'unit': 'seconds',
+                'startValue': 0, 'endValue': duration, 'samples': samples, 'weights': weights,
+            })
+
+        events = []
+
+        def emit(span):
+            idx = len(self._frames)
+            self._frames.append({'name': span.name})
+            events.append({'type': 'O', 'frame': idx, 'at': span.start - self.started})
+            for child in sorted(span.children, key=lambda c: c.start):
+                emit(child)
+            events.append({'type': 'C', 'frame': idx, 'at': (span.end or span.start) - self.started})
+
+        # Evented profiles must nest properly, so spans from pool threads get their own lanes
+        lanes = {}
+        for child in self.root.children:
+            lanes.setdefault(child.thread, []).append(child)
+        for thread, spans in lanes.items():
+            events = []
+            for span in sorted(spans, key=lambda s: s.start):
+                emit(span)
+            profiles.append({
+                'type': 'evented', 'name': f"spans ({thread})", 'unit': 'seconds',
+                'startValue': 0, 'endValue': duration, 'events': events,
+            })
+
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': f"{self.method} {self.path}",
+            'exporter': 'sonicdiscovery-profiler',
+            'shared': {'frames': self._frames},
+            'profiles': profiles,
+        }
+
+    def write(self, out_dir=PROFILE_DIR):
+        os.makedirs(out_dir, exist_ok=True)
+        with open(os.path.join(out_dir, f"{self.id}.speedscope.json"), 'w') as f:
+            json.dump(self.speedscope(), f, separators=(',', ':'))
+        with open(os.path.join(out_dir, f"{self.id}.spans.json"), 'w') as f:
+            json.dump(self.root.to_dict(self.started), f, indent=1)
+        prune_profiles(out_dir)
+        return self.id
+
+
+def prune_profiles(out_dir=PROFILE_DIR, keep=MAX_PROFILES):
+    """Deletes all but the `keep` newest profiles in `out_dir`."""
+    written = []
+    for name in os.listdir(out_dir):
+        if name.endswith('.spans.json'):
+            try:
+                written.append((os.stat(os.path.join(out_dir, name)).st_mtime, name[:-len('.spans.json')]))
+            except OSError:
+                continue
+    for _, profile_id in sorted(written, reverse=True)[keep:]:
+        for suffix in ('.speedscope.json', '.spans.json'):
+            try:
+                os.remove(os.path.join(out_dir, profile_id + suffix))
+            except OSError:
+                pass
+
+
+class TracedProxy:
+    """Records a span for every public method call on the wrapped object."""
+
+    def __init__(self, target, session, prefix):
+        self._target = target
+        self._session = session
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr) or name.startswith('_'):
+            return attr
+
+        def traced(*args, **kwargs):
+            with self._session.attach(), self._session.span(f"{self._prefix}.{name}"):
+                return attr(*args, **kwargs)
+        return traced
+
+
+def trace_client(client):
+    """Wraps a SpotifyClient (and its spotipy clients) in span proxies when this request is profiled."""
+    session = _session.get()
+    if session is None:
+        return client
+    client.sp = TracedProxy(client.sp, session, 'spotify')
+    client.raw_sp = TracedProxy(client.raw_sp, session, 'spotify')
+    client.catalog_sp = TracedProxy(client.catalog_sp, session, 'spotify')
+    return TracedProxy(client, session, 'SpotifyClient')
+
+
+def profiled_endpoint(endpoint):
+    """Registers the (threadpool) thread running a sync endpoint with the active session."""
+    if inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        session = _session.get()
+        if session is None:
+            return endpoint(*args, **kwargs)
+        with session.attach(), session.span(f"endpoint.{endpoint.__name__}"):
+            return endpoint(*args, **kwargs)
+    return wrapper
+
+
+class Profiler:
+    """Decides which requests get profiled: a valid signed X-Profile header, or an armed admin toggle."""
+
+    def __init__(self, secret=PROFILE_SECRET):
+        self.secret = secret
+        self._lock = threading.Lock()
+        self._armed_prefix = None
+        self._armed_remaining = 0
+
+    def arm(self, path_prefix='/', count=1):
+        with self._lock:
+            self._armed_prefix = path_prefix
+            self._armed_remaining = max(0, count)
+
+    def status(self):
+        return {'path_prefix': self._armed_prefix, 'remaining': self._armed_remaining}
+
+    def should_profile(self, scope):
+        if not self.secret:
+            return False
+        if self._armed_remaining:
+            with self._lock:
+                if self._armed_remaining and scope['path'].startswith(self._armed_prefix):
+                    self._armed_remaining -= 1
+                    return True
+        for name, value in scope.get('headers', []):
+            if name == b'x-profile':
+                return verify(value.decode('latin-1'), scope['method'], scope['path'], self.secret)
+        return False
+
+
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware. Unprofiled requests pay for one header scan and
+    nothing else; profiled ones run with a ProfileSession in context, get an
+    X-Profile-Id response header, and leave their output in data/profiles/.
+    """
+
+    def __init__(self, app, profiler=profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.profiler.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        from starlette.concurrency import run_in_threadpool
+
+        session = ProfileSession(scope['method'], scope['path'])
+
+        async def send_with_id(message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = list(message.get('headers', [])) + [(b'x-profile-id', session.id.encode())]
+            await send(message)
+
+        token = _session.set(session)
+        session.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _session.reset(token)
+            session.stop()
+            await run_in_threadpool(session.write)
+
+
+if __name__ == '__main__':
+    # python profiling.py GET /features/discover  -> prints an X-Profile header value
+    if len(sys.argv) != 3 or not PROFILE_SECRET:
+        sys.exit("usage: PROFILE_SECRET=... python profiling.py METHOD PATH")
+    print(f"X-Profile: {sign(sys.argv[1].upper(), sys.argv[2])}")
@@ -0,0 +1,41 @@
+def parse_fields(fields):
+    """
+    Parses a `fields=` projection into a tree.
+    "top_genres,top_artists.name,top_artists.image_url" ->
+        {'top_genres': None, 'top_artists': {'name': None, 'image_url': None}}
+    A None leaf means "keep the whole value". Returns None for no projection.
+    """
+    if not fields:
+        return None
+    tree = {}
+    for path in fields.split(','):
+        parts = [p.strip() for p in path.strip().split('.') if p.strip()]
+        if not parts:
+            continue
+        node = tree
+        for i, part in enumerate(parts):
+            last = i == len(parts) - 1
+            if part in node and node[part] is None:
+                # Already selected in full; a narrower path doesn't shrink it
+                break
+            if last:
+                node[part] = None
+            else:
+                node = node.setdefault(part, {})
+    return tree or None
+
+
+def project(data, tree):
+    """Keeps only the selected keys. Lists are projected element-wise."""
+    if tree is None:
+        return data
+    if isinstance(data, list):
+        return [project(item, tree) for item in data]
+    if isinstance(data, dict):
+        return {k: project(data[k], sub) for k, sub in tree.items() if k in data}
+    return data
+
+
+def wants(tree, section):
+    """True if `section` is selected (always true without a projection)."""
+    return tree is None or section in tree
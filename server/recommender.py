@@ -1,18 +1,27 @@
 import numpy as np
-import pandas as pd
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import StandardScaler
 from feature_extraction import FeatureExtractor
+from scoring import Standardizer, cosine_similarity
+from catalog import catalog
 
 class RecommenderSystem:
     def __init__(self):
         self.feature_extractor = FeatureExtractor()
-        self.scaler = StandardScaler()
+        self.scaler = Standardizer()
+
+    def analyze_previews(self, tracks):
+        """
+        Downloads and analyses the previews of `tracks` (process pool) into the
+        extractor's `audio_cache`. Run this ahead of time - e.g. when a playlist
+        or candidate pool is ingested - not on the request path.
+        """
+        return self.feature_extractor.extract_batch(tracks)
 
     def prepare_data(self, tracks, spotify_client):
         """
-        Extracts features for a list of tracks.
-        Returns a DataFrame of features and a list of track info.
+        Builds the feature matrix for a list of tracks from Spotify's audio
+        features plus whatever preview vectors are already in `audio_cache`
+        (see analyze_previews); tracks not analysed yet get zeros there.
+        Returns a feature matrix and a list of track info.
         """
         track_ids = [t['id'] for t in tracks]
         audio_features_list = spotify_client.get_audio_features(track_ids)
@@ -28,7 +37,7 @@ class RecommenderSystem:
             valid_tracks.append(track)
         
         if not feature_vectors:
-            return pd.DataFrame(), []
+            return np.empty((0, len(self.feature_extractor.get_feature_names()))), []
 
         X = np.array(feature_vectors)
         return X, valid_tracks
@@ -36,7 +45,13 @@ class RecommenderSystem:
     def recommend(self, source_tracks, candidate_tracks, spotify_client, top_n=10):
         """
         Recommends tracks from candidate_tracks based on similarity to source_tracks.
+        Candidates the user already knows (client's exclusion filter) are dropped
+        before any features are extracted.
         """
+        exclusion = getattr(spotify_client, 'exclusion', None)
+        if exclusion:
+            candidate_tracks = exclusion.filter_tracks(candidate_tracks) or candidate_tracks
+
         # 1. Prepare Source Data (User Profile)
         X_source, _ = self.prepare_data(source_tracks, spotify_client)
         
@@ -92,3 +107,65 @@ class RecommenderSystem:
              final_recs = recommendations
         
         return final_recs[:top_n]
+
+    # --- Batch scoring (see batch_recommend.py) ---
+
+    def prepare_candidate_matrix(self, X_candidates):
+        """
+        Fits the scaler on a candidate pool and returns it standardized and
+        row-normalized (float32), ready to be shared read-only across workers.
+        """
+        X = self.scaler.fit_transform(X_candidates)
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        norms[norms == 0.0] = 1.0
+        return (X / norms).astype(np.float32)
+
+    def rank_profiles(self, profiles, candidate_matrix, top_n=10):
+        """
+        Scores many taste vectors against a prepared candidate matrix in one
+        matrix product (cosine similarity, same scaling as `recommend`).
+        Returns (indices, scores), each (n_profiles, top_n), best first.
+        """
+        P = self.scaler.transform(np.atleast_2d(profiles))
+        norms = np.linalg.norm(P, axis=1, keepdims=True)
+        norms[norms == 0.0] = 1.0
+        S = (P / norms).astype(np.float32) @ candidate_matrix.T
+
+        top_n = min(top_n, S.shape[1])
+        if top_n == 0:
+            return np.empty((len(S), 0), dtype=np.int64), np.empty((len(S), 0), dtype=np.float32)
+        # Partial selection first; only the top_n columns get fully sorted
+        idx = np.argpartition(-S, top_n - 1, axis=1)[:, :top_n]
+        part = np.take_along_axis(S, idx, axis=1)
+        order = np.argsort(-part, axis=1, kind='stable')
+        return np.take_along_axis(idx, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+    def rank_catalog(self, seed_track_ids, top_n=10, version=None):
+        """
+        Catalogue tracks most similar to the seeds, scored against the shared,
+        memory-mapped matrix (see catalog.py). Seeds are found through the mapped
+        ID index and their prepared rows averaged into the profile, so no scaler
+        (and nothing on this instance) is involved. Returns [(track_id, score), ...]
+        best first without the seeds; [] if no seed is in the catalogue, None if
+        nothing has been published.
+        """
+        version = version or catalog.current()
+        if version is None or not len(version):
+            return None
+        rows = version.rows(list(seed_track_ids))
+        rows = np.unique(rows[rows >= 0])
+        if not len(rows):
+            return []
+        profile = np.asarray(version.features[rows], dtype=np.float32).mean(axis=0)
+        norm = np.linalg.norm(profile)
+        if norm == 0.0:
+            return []
+        # Rows are unit-length already, so this is cosine similarity
+        scores = version.features @ (profile / norm)
+        scores[rows] = -np.inf
+        top_n = min(top_n, len(scores) - len(rows))
+        if top_n <= 0:
+            return []
+        idx = np.argpartition(-scores, top_n - 1)[:top_n]
+        idx = idx[np.argsort(-scores[idx], kind='stable')]
+        return [(version.track_id(i), float(scores[i])) for i in idx]
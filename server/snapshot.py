@@ -0,0 +1,337 @@
+"""
+Columnar user snapshots.
+
+`export_snapshot` pulls everything the dashboard reads for one user (profile,
+top tracks/artists for all three time ranges, saved tracks, audio features,
+genre counts, new releases) into a single uncompressed .npz of flat columns.
+`SnapshotSpotify` memory-maps that file and answers the same spotipy calls
+`SpotifyClient` makes, so the dashboard can be served with zero network calls
+(demo/kiosk deployments, reproducible offline benchmarks).
+
+Usage:
+    python snapshot.py export --out data/snapshots/me.npz [--token ACCESS_TOKEN]
+    SNAPSHOT_PATH=data/snapshots/me.npz uvicorn main:app
+"""
+import argparse
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+import zipfile
+
+import numpy as np
+
+TIME_RANGES = ('short_term', 'medium_term', 'long_term')
+AUDIO_FEATURES = [
+    'danceability', 'energy', 'key', 'loudness', 'mode',
+    'speechiness', 'acousticness', 'instrumentalness',
+    'liveness', 'valence', 'tempo'
+]
+SNAPSHOT_VERSION = 1
+
+# Separator for multi-valued string cells (artist names, genres)
+SEP = '\x1f'
+
+
+def _paged(fetch, total_limit, page_size=50):
+    """Collects up to `total_limit` items from an offset-paginated spotipy call."""
+    items = []
+    offset = 0
+    while len(items) < total_limit:
+        page = fetch(limit=min(page_size, total_limit - len(items)), offset=offset)
+        batch = page.get('items', [])
+        items.extend(batch)
+        offset += len(batch)
+        if not batch or not page.get('next'):
+            return items, page.get('total', len(items))
+    return items, page.get('total', len(items))
+
+
+def _str_col(values):
+    # Fixed-width UTF-8 byte columns memory-map cleanly (object arrays can't) and are
+    # 4x smaller than numpy's UTF-32 str dtype
+    return np.array([(v or '').encode('utf-8') for v in values], dtype=bytes) if values else np.zeros(0, dtype='S1')
+
+
+def _s(value):
+    return value.decode('utf-8')
+
+
+def export_snapshot(sp, max_saved=500, market='US'):
+    """Fetches a user's dashboard data and returns {column_name: ndarray}."""
+    track_rows = {}
+    artist_rows = {}
+
+    def add_track(t):
+        if t and t.get('id') and t['id'] not in track_rows:
+            track_rows[t['id']] = t
+        return t['id'] if t and t.get('id') else None
+
+    def add_artist(a):
+        if a and a.get('id') and a['id'] not in artist_rows:
+            artist_rows[a['id']] = a
+        return a['id'] if a and a.get('id') else None
+
+    lists = {}
+    for tr in TIME_RANGES:
+        top_tracks = sp.current_user_top_tracks(limit=50, time_range=tr)['items']
+        lists[f'top_tracks_{tr}'] = [add_track(t) for t in top_tracks]
+        top_artists = sp.current_user_top_artists(limit=50, time_range=tr)['items']
+        lists[f'top_artists_{tr}'] = [add_artist(a) for a in top_artists]
+
+    saved, saved_total = _paged(sp.current_user_saved_tracks, max_saved)
+    lists['saved'] = [add_track(item['track']) for item in saved if item.get('track')]
+
+    track_ids = list(track_rows)
+    artist_ids = list(artist_rows)
+    track_pos = {tid: i for i, tid in enumerate(track_ids)}
+    artist_pos = {aid: i for i, aid in enumerate(artist_ids)}
+
+    # Audio features as one float matrix; NaN rows where Spotify has none
+    features = np.full((len(track_ids), len(AUDIO_FEATURES)), np.nan, dtype=np.float32)
+    for start in range(0, len(track_ids), 100):
+        chunk = track_ids[start:start + 100]
+        try:
+            for f in sp.audio_features(chunk) or []:
+                if f and f.get('id') in track_pos:
+                    features[track_pos[f['id']]] = [f.get(k, np.nan) or 0.0 for k in AUDIO_FEATURES]
+        except Exception as e:
+            print(f"Audio features unavailable for snapshot: {e}")
+            break
+
+    try:
+        albums = sp.new_releases(limit=20, country=market)['albums']['items']
+    except Exception as e:
+        print(f"New releases unavailable for snapshot: {e}")
+        albums = []
+
+    tracks = [track_rows[t] for t in track_ids]
+    artists = [artist_rows[a] for a in artist_ids]
+    cols = {
+        'meta_version': np.array([SNAPSHOT_VERSION], dtype=np.int32),
+        'meta_saved_total': np.array([saved_total], dtype=np.int64),
+        'meta_market': _str_col([market]),
+        'profile_json': np.frombuffer(json.dumps(sp.current_user()).encode('utf-8'), dtype=np.uint8),
+
+        'track_id': _str_col(track_ids),
+        'track_name': _str_col([t['name'] for t in tracks]),
+        'track_artist_names': _str_col([SEP.join(a['name'] for a in t['artists']) for t in tracks]),
+        'track_artist_ids': _str_col([SEP.join(a['id'] or '' for a in t['artists']) for t in tracks]),
+        'track_preview_url': _str_col([t.get('preview_url') for t in tracks]),
+        'track_external_url': _str_col([t['external_urls'].get('spotify') for t in tracks]),
+        'track_uri': _str_col([t.get('uri') for t in tracks]),
+        'track_popularity': np.array([t.get('popularity', 0) for t in tracks], dtype=np.int16),
+        'track_images_json': _str_col([json.dumps(t['album'].get('images', [])) for t in tracks]),
+        'track_features': features,
+
+        'artist_id': _str_col(artist_ids),
+        'artist_name': _str_col([a['name'] for a in artists]),
+        'artist_genres': _str_col([SEP.join(a.get('genres', [])) for a in artists]),
+        'artist_external_url': _str_col([a['external_urls'].get('spotify') for a in artists]),
+        'artist_images_json': _str_col([json.dumps(a.get('images', [])) for a in artists]),
+
+        'album_name': _str_col([a['name'] for a in albums]),
+        'album_artist_names': _str_col([SEP.join(x['name'] for x in a['artists']) for a in albums]),
+        'album_external_url': _str_col([a['external_urls'].get('spotify') for a in albums]),
+        'album_release_date': _str_col([a.get('release_date') for a in albums]),
+        'album_images_json': _str_col([json.dumps(a.get('images', [])) for a in albums]),
+    }
+
+    for name, ids in lists.items():
+        pos = track_pos if name.startswith(('top_tracks', 'saved')) else artist_pos
+        cols[f'list_{name}'] = np.array([pos[i] for i in ids if i in pos], dtype=np.int32)
+
+    # Genre counts per time range (from that range's top artists)
+    for tr in TIME_RANGES:
+        counts = {}
+        for i in cols[f'list_top_artists_{tr}']:
+            for g in artists[i].get('genres', []):
+                counts[g] = counts.get(g, 0) + 1
+        ranked = sorted(counts.items(), key=lambda x: x[1], reverse=True)
+        cols[f'genre_names_{tr}'] = _str_col([g for g, _ in ranked])
+        cols[f'genre_counts_{tr}'] = np.array([c for _, c in ranked], dtype=np.int32)
+
+    return cols
+
+
+def write_snapshot(cols, path_or_file):
+    """Writes columns as an uncompressed .npz (stored members can be memory-mapped)."""
+    if isinstance(path_or_file, str):
+        os.makedirs(os.path.dirname(os.path.abspath(path_or_file)), exist_ok=True)
+    np.savez(path_or_file, **cols)
+
+
+def snapshot_bytes(cols):
+    buf = io.BytesIO()
+    write_snapshot(cols, buf)
+    return buf.getvalue()
+
+
+def mmap_npz(path):
+    """
+    Memory-maps every array in an uncompressed .npz without copying it.
+    Each member of a stored zip is a plain .npy, so we locate its data offset
+    and build an ndarray view straight over the mapped file.
+    """
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    arrays = {}
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                # Compressed member (e.g. np.savez_compressed): fall back to a copy
+                arrays[name] = np.load(io.BytesIO(zf.read(info)), allow_pickle=False)
+                continue
+            local = mm[info.header_offset:info.header_offset + 30]
+            name_len, extra_len = struct.unpack('<HH', local[26:30])
+            start = info.header_offset + 30 + name_len + extra_len
+
+            header = io.BytesIO(mm[start:start + min(info.file_size, 65536)])
+            version = np.lib.format.read_magic(header)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(header)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(header)
+            if dtype.hasobject:
+                raise ValueError(f"Snapshot column {name} holds Python objects")
+            arrays[name] = np.ndarray(shape, dtype=dtype, buffer=mm, offset=start + header.tell(),
+                                      order='F' if fortran else 'C')
+    return arrays
+
+
+class SnapshotSpotify:
+    """
+    Read-only stand-in for `spotipy.Spotify` backed by a memory-mapped snapshot.
+    Implements the calls SpotifyClient's dashboard reads make; anything else
+    raises, which SpotifyClient already treats like an upstream failure.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.cols = mmap_npz(path)
+        self.requests_timeout = None
+        self._track_pos = {_s(tid): i for i, tid in enumerate(self.cols['track_id'].tolist())}
+        self._artist_pos = {_s(aid): i for i, aid in enumerate(self.cols['artist_id'].tolist())}
+        self._profile = json.loads(self.cols['profile_json'].tobytes().decode('utf-8'))
+
+    def __getattr__(self, name):
+        raise AttributeError(f"'{name}' is not available in snapshot mode")
+
+    # --- row builders (spotipy-shaped dicts) ---
+
+    def _track(self, i):
+        c = self.cols
+        names = _s(c['track_artist_names'][i]).split(SEP)
+        ids = _s(c['track_artist_ids'][i]).split(SEP)
+        return {
+            'id': _s(c['track_id'][i]),
+            'name': _s(c['track_name'][i]),
+            'artists': [{'name': n, 'id': a or None} for n, a in zip(names, ids)],
+            'preview_url': _s(c['track_preview_url'][i]) or None,
+            'external_urls': {'spotify': _s(c['track_external_url'][i])},
+            'album': {'images': json.loads(_s(c['track_images_json'][i]))},
+            'uri': _s(c['track_uri'][i]),
+            'popularity': int(c['track_popularity'][i]),
+        }
+
+    def _artist(self, i):
+        c = self.cols
+        genres = _s(c['artist_genres'][i])
+        return {
+            'id': _s(c['artist_id'][i]),
+            'name': _s(c['artist_name'][i]),
+            'genres': genres.split(SEP) if genres else [],
+            'external_urls': {'spotify': _s(c['artist_external_url'][i])},
+            'images': json.loads(_s(c['artist_images_json'][i])),
+        }
+
+    def _page(self, idx, builder, limit, offset):
+        items = [builder(int(i)) for i in idx[offset:offset + limit]]
+        nxt = offset + limit < len(idx)
+        return {'items': items, 'total': len(idx), 'next': 'snapshot' if nxt else None}
+
+    # --- spotipy surface ---
+
+    def current_user(self):
+        return self._profile
+
+    def current_user_top_tracks(self, limit=20, offset=0, time_range='medium_term'):
+        return self._page(self.cols[f'list_top_tracks_{time_range}'], self._track, limit, offset)
+
+    def current_user_top_artists(self, limit=20, offset=0, time_range='medium_term'):
+        return self._page(self.cols[f'list_top_artists_{time_range}'], self._artist, limit, offset)
+
+    def current_user_saved_tracks(self, limit=20, offset=0, market=None):
+        page = self._page(self.cols['list_saved'], lambda i: {'track': self._track(i)}, limit, offset)
+        page['total'] = int(self.cols['meta_saved_total'][0])
+        return page
+
+    def current_user_playlists(self, limit=50, offset=0):
+        return {'items': [], 'total': 0, 'next': None}
+
+    def new_releases(self, country=None, limit=20, offset=0):
+        c = self.cols
+        items = []
+        for i in range(offset, min(offset + limit, len(c['album_name']))):
+            items.append({
+                'name': _s(c['album_name'][i]),
+                'artists': [{'name': n} for n in _s(c['album_artist_names'][i]).split(SEP)],
+                'images': json.loads(_s(c['album_images_json'][i])),
+                'external_urls': {'spotify': _s(c['album_external_url'][i])},
+                'release_date': _s(c['album_release_date'][i]),
+            })
+        return {'albums': {'items': items}}
+
+    def tracks(self, tracks, market=None):
+        return {'tracks': [self._track(self._track_pos[t]) if t in self._track_pos else None for t in tracks]}
+
+    def artists(self, artists):
+        return {'artists': [self._artist(self._artist_pos[a]) if a in self._artist_pos else None for a in artists]}
+
+    def audio_features(self, tracks=[]):
+        result = []
+        matrix = self.cols['track_features']
+        for tid in tracks:
+            i = self._track_pos.get(tid)
+            if i is None or np.isnan(matrix[i]).all():
+                result.append(None)
+                continue
+            f = dict(zip(AUDIO_FEATURES, matrix[i].astype(float).tolist()))
+            f['id'] = tid
+            result.append(f)
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a user's dashboard data to a columnar snapshot.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    export = sub.add_parser('export')
+    export.add_argument('--out', required=True, help="Destination .npz path")
+    export.add_argument('--token', default=os.getenv('SPOTIFY_TOKEN'),
+                        help="Spotify access token (defaults to $SPOTIFY_TOKEN, then the OAuth cache)")
+    export.add_argument('--max-saved', type=int, default=500)
+    export.add_argument('--market', default='US')
+    args = parser.parse_args()
+
+    import spotipy
+    token = args.token
+    if not token:
+        from auth import SpotifyAuthenticator
+        cached = SpotifyAuthenticator().get_cached_token()
+        if not cached:
+            print("No token: pass --token, set SPOTIFY_TOKEN or log in once via the app.")
+            return 1
+        token = cached['access_token']
+
+    cols = export_snapshot(spotipy.Spotify(auth=token), max_saved=args.max_saved, market=args.market)
+    write_snapshot(cols, args.out)
+    print(f"Wrote {args.out}: {len(cols['track_id'])} tracks, {len(cols['artist_id'])} artists, "
+          f"{os.path.getsize(args.out) / 1024:.0f} KiB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,37 +1,148 @@
 import spotipy
 from spotipy.exceptions import SpotifyException
+import json
 import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from genre_index import VALID_SEED_GENRES, genre_index
+from deadline import DeadlineBoundSpotify
+from cache import cache, catalog_cache
+from playlist_ingest import PlaylistIngestor
+from exclusion import get_exclusion_filter
+from image_proxy import proxied_url
+from cooccurrence import get_model as get_cooccurrence_model, collect_user_tracks
+from strategy_stats import strategy_stats
+from mood import MoodPool, MOOD_POOL_SIZE, MOOD_FEATURES
+from batch_loader import BatchLoader
+from global_feeds import get_feed
+from recommender import RecommenderSystem
+
+TIME_RANGES = ('short_term', 'medium_term', 'long_term')
+# Ranks seed tracks against the shared catalogue matrix; keeps no per-request state
+_catalog_ranker = RecommenderSystem()
+# Cross-user cache lifetimes for app-token catalog responses (seconds)
+CATALOG_TTLS = {'search': 3600, 'artist_top_tracks': 6 * 3600, 'recommendations': 3600, 'new_releases': 6 * 3600}
+# Features reported by the audio profile / analytics (0-1 features are shown as percentages)
+PROFILE_FEATURES = ['energy', 'danceability', 'valence', 'acousticness', 'instrumentalness', 'tempo']
+
+
+def pick_image(images, size=None):
+    """
+    URL of the best-fitting variant in a Spotify `images` list: the smallest one
+    at least `size` px wide (the largest if none is). Without a size, the largest.
+    """
+    if not images:
+        return None
+    sized = [i for i in images if i.get('width')]
+    if not size or not sized:
+        return images[0]['url']
+    fitting = [i for i in sized if i['width'] >= size]
+    best = min(fitting, key=lambda i: i['width']) if fitting else max(sized, key=lambda i: i['width'])
+    return best['url']
 
 class SpotifyClient:
-    def __init__(self, sp):
-        self.sp = sp
-        # Hardcoded safe genres to avoid slow API call on startup
-        self.valid_genres = {
-            'acoustic', 'afrobeat', 'alt-rock', 'alternative', 'ambient', 'anime', 
-            'black-metal', 'bluegrass', 'blues', 'bossanova', 'brazil', 'breakbeat', 
-            'british', 'cantopop', 'chicago-house', 'children', 'chill', 'classical', 
-            'club', 'comedy', 'country', 'dance', 'dancehall', 'death-metal', 
-            'deep-house', 'detroit-techno', 'disco', 'disney', 'drum-and-bass', 'dub', 
-            'dubstep', 'edm', 'electro', 'electronic', 'emo', 'folk', 'forro', 'french', 
-            'funk', 'garage', 'german', 'gospel', 'goth', 'grindcore', 'groove', 
-            'grunge', 'guitar', 'happy', 'hard-rock', 'hardcore', 'hardstyle', 
-            'heavy-metal', 'hip-hop', 'holidays', 'honky-tonk', 'house', 'idm', 
-            'indian', 'indie', 'indie-pop', 'industrial', 'iranian', 'j-dance', 'j-idol', 
-            'j-pop', 'j-rock', 'jazz', 'k-pop', 'kids', 'latin', 'latino', 'malay', 
-            'mandopop', 'metal', 'metal-misc', 'metalcore', 'minimal-techno', 'movies', 
-            'mpb', 'new-age', 'new-release', 'opera', 'pagode', 'party', 'philippines-opm', 
-            'piano', 'pop', 'pop-film', 'post-dubstep', 'power-pop', 'progressive-house', 
-            'psych-rock', 'punk', 'punk-rock', 'r-n-b', 'rainy-day', 'reggae', 'reggaeton', 
-            'road-trip', 'rock', 'rock-n-roll', 'rockabilly', 'romance', 'sad', 'salsa', 
-            'samba', 'sertanejo', 'show-tunes', 'singer-songwriter', 'ska', 'sleep', 
-            'songwriter', 'soul', 'soundtracks', 'spanish', 'study', 'summer', 'swedish', 
-            'synth-pop', 'tango', 'techno', 'trance', 'trip-hop', 'turkish', 'work-out', 
-            'world-music'
-        }
+    def __init__(self, sp, deadline=None, user_key=None, img_size=None, image_proxy=None, global_feeds=True,
+                 catalog_sp=None):
+        # With a deadline, every call gets the remaining budget as its timeout
+        self.deadline = deadline
+        self.sp = DeadlineBoundSpotify(sp, deadline) if deadline else sp
+        # Unbounded client for long-running exports/ingestion that opt out of the deadline
+        self.raw_sp = sp
+        # User-independent catalog traffic goes through the app-token client when there is one
+        # (SpotifyAuthenticator.get_app_client); its responses are then shared across users
+        self.shared_catalog = catalog_sp is not None
+        self.raw_catalog_sp = catalog_sp if catalog_sp is not None else sp
+        self.catalog_sp = DeadlineBoundSpotify(self.raw_catalog_sp, deadline) if deadline else self.raw_catalog_sp
+        # Per-user cache namespace (derived from the access token by the API layer)
+        self.user_key = user_key
+        self.valid_genres = VALID_SEED_GENRES
+        self.genre_index = genre_index
+        # Saved-library / recently-recommended filter (see enable_exclusion)
+        self.exclusion = None
+        # Target image width in px (None = largest variant), optionally routed via the /img proxy base URL
+        self.img_size = img_size
+        self.image_proxy = image_proxy
+        # Serve user-independent feeds (new releases, genre pools) from the background-refreshed cache
+        self.global_feeds = global_feeds
+        self._loader = None
+        # Upstream calls whose failure a method swallowed (returning a degraded result); see `partial`
+        self.failures = 0
+
+    def unbounded(self):
+        """A copy of this client without the request deadline, for work that outlives the request (background refreshes)."""
+        catalog_sp = self.raw_catalog_sp.fresh() if self.shared_catalog else None
+        return SpotifyClient(self.raw_sp, user_key=self.user_key, img_size=self.img_size,
+                             image_proxy=self.image_proxy, global_feeds=self.global_feeds, catalog_sp=catalog_sp)
+
+    @property
+    def loader(self):
+        """Request-scoped batcher for track/artist/audio-feature lookups by ID (see batch_loader.py)."""
+        if self._loader is None:
+            self._loader = BatchLoader(self.catalog_sp, shared_cache=catalog_cache if self.shared_catalog else None)
+        return self._loader
+
+    def _catalog(self, method, **kwargs):
+        """
+        A user-independent catalog call (search, top tracks, ...) on the catalog client.
+        With the app token the response is the same for everyone, so it's shared
+        across users through catalog_cache.
+        """
+        call = lambda: getattr(self.catalog_sp, method)(**kwargs)
+        if not self.shared_catalog:
+            return call()
+        key = f"{method}:{json.dumps(kwargs, sort_keys=True)}"
+        return catalog_cache.get_or_set(key, call, ttl=CATALOG_TTLS[method])
+
+    def get_audio_features(self, track_ids):
+        """Audio features per track ID, in order (None where unavailable), via bulk lookups."""
+        return self.loader.get_many('audio_features', track_ids)
+
+    def _image(self, images):
+        url = pick_image(images, self.img_size)
+        return proxied_url(self.image_proxy, url) if self.image_proxy else url
 
     def get_user_profile(self):
         return self.sp.current_user()
 
+    def get_user_id(self):
+        """Stable Spotify user ID, for per-user stores that must outlive an access token."""
+        if not self.user_key:
+            return self.sp.current_user()['id']
+        return cache.get_or_set(f"user_id:{self.user_key}", lambda: self.sp.current_user()['id'], ttl=3600)
+
+    def enable_exclusion(self, sync_library=True):
+        """
+        Turns on the per-user exclusion filter for all recommendation paths.
+        The saved-library part is (re)built in the background, so the first
+        requests for a new user are only filtered against recent recommendations.
+        `sync_library=False` only attaches the filter (e.g. to record served tracks).
+        """
+        try:
+            self.exclusion = get_exclusion_filter(self.get_user_id())
+            if sync_library:
+                self.exclusion.refresh_library_async(self.raw_sp)
+        except Exception as e:
+            print(f"Exclusion filter unavailable: {e}")
+
+    def _candidate_limit(self, limit, cap=50):
+        """Over-fetch a little when filtering so excluded tracks don't leave us short (within the API's cap)."""
+        return min(cap, limit + limit // 2 if self.exclusion else limit)
+
+    def _finalize(self, tracks, limit, record=True):
+        """
+        Drops known tracks (unless that leaves nothing) and trims. With `record`, the
+        result counts as shown; feeds pass False and record each page as it's served.
+        """
+        if not self.exclusion:
+            return tracks[:limit]
+        tracks = (self.exclusion.filter_tracks(tracks) or tracks)[:limit]
+        if record:
+            self.exclusion.record(tracks)
+        return tracks
+
     def get_liked_tracks(self, limit=20):
         try:
             results = self.sp.current_user_saved_tracks(limit=limit)
@@ -40,12 +151,21 @@ class SpotifyClient:
             return []
 
     def get_user_playlists(self):
+        """All of the user's playlists (every page, fetched concurrently)."""
         try:
-            results = self.sp.current_user_playlists(limit=20)
-            return [{'id': i['id'], 'name': i['name']} for i in results['items']]
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                return PlaylistIngestor(self.sp).list_playlists(pool)
         except Exception:
             return []
 
+    def get_playlist_analytics(self):
+        """
+        Ingests every playlist and its items (incrementally, by snapshot_id) and returns
+        per-playlist genre/audio-feature histograms plus a combined taste vector.
+        Uses the unbounded client: a first ingestion of a large library can take seconds.
+        """
+        return PlaylistIngestor(self.raw_sp).ingest(self.get_user_id())
+
     def get_top_genres(self, limit=10):
         try:
             results = self.sp.current_user_top_artists(limit=20, time_range='medium_term')
@@ -60,7 +180,7 @@ class SpotifyClient:
     def get_top_artists(self, limit=10):
         try:
             results = self.sp.current_user_top_artists(limit=limit, time_range='medium_term')
-            return [{'name': i['name'], 'image_url': i['images'][0]['url'] if i['images'] else None, 'external_url': i['external_urls']['spotify']} for i in results['items']]
+            return [{'name': i['name'], 'image_url': self._image(i['images']), 'external_url': i['external_urls']['spotify']} for i in results['items']]
         except Exception:
             return []
 
@@ -71,9 +191,12 @@ class SpotifyClient:
         except Exception:
             return []
 
-    def get_new_releases(self, limit=10):
+    def get_new_releases(self, limit=10, market='US'):
         try:
-            results = self.sp.new_releases(limit=limit, country='US')
+            # Same for every user: read the scheduler's copy, live call only until it has loaded
+            albums = get_feed(f"new_releases:{market}") if self.global_feeds else None
+            if albums is None:
+                albums = self._catalog('new_releases', limit=limit, country=market)['albums']['items']
             # New releases are albums, so we need to format differently or pick first track? 
             # Actually, standard format requires 'track' structure. 
             # API returns albums. Let's return simplified album objects or adapt.
@@ -84,136 +207,233 @@ class SpotifyClient:
             return [{
                 'name': i['name'], 
                 'artists': [a['name'] for a in i['artists']],
-                'image_url': i['images'][0]['url'] if i['images'] else None, 
+                'image_url': self._image(i['images']), 
                 'external_url': i['external_urls']['spotify'],
                 'release_date': i['release_date']
-            } for i in results['albums']['items']]
+            } for i in albums[:limit]]
         except Exception:
             return []
 
-    def get_recommendations(self, seed_tracks=None, seed_genres=None, seed_artists=None, limit=10, **kwargs):
+    @property
+    def partial(self):
+        """True if the request deadline or a swallowed upstream failure cut some work short."""
+        if self.deadline and self.deadline.hit:
+            return True
+        return bool(self.failures or (self._loader is not None and self._loader.failures))
+
+    def _out_of_time(self):
+        return bool(self.deadline and self.deadline.expired())
+
+    def get_recommendations(self, seed_tracks=None, seed_genres=None, seed_artists=None, limit=10, record=True, **kwargs):
         """
-        Robust recommendation fetcher. Tries standard API, falls back to Search/TopTracks.
+        Robust recommendation fetcher. Tries the local co-occurrence model and the
+        shared catalogue matrix first (track seeds without tuning targets), then the
+        standard API, then Search/TopTracks.
+        With a deadline, fallback strategies are skipped once the budget is spent and
+        whatever was collected is returned (check `partial`).
         """
+        # Map micro-genres / typos onto valid seeds so we never spend a call on a rejected seed
+        if seed_genres:
+            seed_genres = self.genre_index.validate_seeds(seed_genres) or None
+
         seeds = {}
         if seed_tracks: seeds['seed_tracks'] = seed_tracks[:5]
         elif seed_genres: seeds['seed_genres'] = seed_genres[:5]
         elif seed_artists: seeds['seed_artists'] = seed_artists[:5]
         else: seeds['seed_genres'] = ['pop']
 
+        # Attempt 0: local co-occurrence model. It can't honour target_*/min_*/max_*
+        # tuning, so tuned requests (mood, vibe, ...) go straight to the API paths.
+        primary = []
+        if seed_tracks and not kwargs:
+            primary = self._recommend_via_cooccurrence(seed_tracks, limit, record)
+            if len(primary) >= limit:
+                return primary
+            primary = self._merge(primary, self._recommend_via_catalog(seed_tracks, limit, record), limit)
+            if len(primary) >= limit:
+                return primary
+
         # Attempt 1: Standard API (might 404)
         try:
-            results = self.sp.recommendations(limit=limit, **seeds, **kwargs)
-            if results['tracks']: return [self._format_track(t) for t in results['tracks']]
+            results = self._catalog('recommendations', limit=self._candidate_limit(limit, cap=100), **seeds, **kwargs)
+            if results['tracks']:
+                more = self._finalize([self._format_track(t) for t in results['tracks']], limit, record)
+                return self._merge(primary, more, limit)
         except Exception as e:
             print(f"Standard Rec API failed: {e}")
 
         # Attempt 2: Search-Based Fallback (The "Manual" Way)
         print("Switching to Search-Based Recommendation Engine...")
-        return self._recommend_via_search(seed_genres, seed_artists, seed_tracks, limit)
+        more = self._recommend_via_search(seed_genres, seed_artists, seed_tracks, limit, record)
+        return self._merge(primary, more, limit)
+
+    def _merge(self, primary, more, limit):
+        """Earlier (local) picks first, topped up from the later paths without duplicates."""
+        seen = {t['id'] for t in primary}
+        return (primary + [t for t in more if t['id'] not in seen])[:limit]
+
+    def _recommend_via_cooccurrence(self, seed_tracks, limit, record=True):
+        """Seed tracks -> co-occurring tracks from opted-in users; bulk track lookups hydrate them."""
+        try:
+            user_id = self.get_user_id() if self.exclusion else None
+            scored = get_cooccurrence_model().recommend(seed_tracks, limit=self._candidate_limit(limit, cap=100),
+                                                        user_id=user_id)
+            tracks = [t for t in self.loader.get_many('tracks', [t for t, _ in scored]) if t]
+            return self._finalize([self._format_track(t) for t in tracks], limit, record)
+        except Exception as e:
+            print(f"Co-occurrence recommendations failed: {e}")
+            return []
+
+    def _recommend_via_catalog(self, seed_tracks, limit, record=True):
+        """Seed tracks -> nearest tracks in the shared catalogue matrix (catalog.py); bulk lookups hydrate them."""
+        try:
+            scored = _catalog_ranker.rank_catalog(seed_tracks, top_n=self._candidate_limit(limit, cap=100))
+            if not scored:
+                return []
+            tracks = [t for t in self.loader.get_many('tracks', [t for t, _ in scored]) if t]
+            return self._finalize([self._format_track(t) for t in tracks], limit, record)
+        except Exception as e:
+            print(f"Catalogue recommendations failed: {e}")
+            return []
 
-    def _recommend_via_search(self, genres, artists, tracks, limit):
+    def contribute_listening(self):
         """
-        Manually constructs a playlist using Search and Artist Top Tracks.
+        Opt-in: adds this user's top + saved tracks to the shared co-occurrence model
+        (replacing any earlier contribution). Uses the unbounded client.
         """
-        recs = []
-        try:
-            # Strategy A: Genre Search
-            if genres:
-                for g in genres:
-                    # Search for tracks in this genre with a random offset for variety
-                    offset = random.randint(0, 50)
-                    q = f"genre:{g}"
-                    results = self.sp.search(q=q, type='track', limit=20, offset=offset)
-                    for t in results['tracks']['items']:
+        count = get_cooccurrence_model().update_user(self.get_user_id(), collect_user_tracks(self.raw_sp))
+        return {'contributed_tracks': count}
+
+    def withdraw_listening(self):
+        """Opt-out: removes this user's contribution from the co-occurrence model."""
+        get_cooccurrence_model().remove_user(self.get_user_id())
+
+    def _recommend_via_search(self, genres, artists, tracks, limit, record=True):
+        """
+        Manually constructs a playlist using Search and Artist Top Tracks. Each seed
+        type is a strategy; strategies run best observed yield first (new tracks per
+        upstream call, see strategy_stats) and collection stops as soon as `limit`
+        usable tracks are in hand.
+        """
+        strategies = {}
+        if genres:
+            strategies['genre_search'] = self._genre_search_calls(genres)
+        if artists:
+            names = [a[len("name:"):] for a in artists if a.startswith("name:")]
+            ids = [a for a in artists if not a.startswith("name:")]
+            if names: strategies['artist_name_search'] = self._artist_name_calls(names)
+            if ids: strategies['artist_top_tracks'] = self._artist_top_track_calls(ids)
+        if tracks:
+            strategies['track_artists'] = self._track_artist_calls(tracks)
+
+        recs, seen_ids, usable = [], set(), 0
+        for name in strategy_stats.order(strategies):
+            calls = strategies[name]
+            while usable < limit and not self._out_of_time():
+                started = time.perf_counter()
+                loader_calls = self.loader.calls
+                items = next(calls, None)
+                # Bulk lookups the step needed on top of its own call (see BatchLoader.calls)
+                lookups = self.loader.calls - loader_calls
+                if items is None:
+                    if lookups:
+                        strategy_stats.observe(name, time.perf_counter() - started, 0, calls=lookups)
+                    break
+                new = 0
+                for t in items:
+                    if t and t.get('id') and t['id'] not in seen_ids:
+                        seen_ids.add(t['id'])
                         recs.append(self._format_track(t))
-            
-            # Strategy B: Artist Top Tracks (ID or Name)
-            if artists:
-                for a_seed in artists:
-                    try:
-                        # Check if it's a name-based seed (from Sonic Multiverse)
-                        if a_seed.startswith("name:"):
-                            artist_name = a_seed.replace("name:", "")
-                            print(f"Searching for artist: {artist_name}")
-                            
-                            # Try 1: Specific Artist Search
-                            q = f"artist:{artist_name}"
-                            results = self.sp.search(q=q, type='track', limit=10)
-                            if results['tracks']['items']:
-                                for t in results['tracks']['items']:
-                                    recs.append(self._format_track(t))
-                            else:
-                                # Try 2: General Search (Brute Force)
-                                print(f"Specific search failed, trying general: {artist_name}")
-                                results = self.sp.search(q=artist_name, type='track', limit=10)
-                                for t in results['tracks']['items']:
-                                    recs.append(self._format_track(t))
-
-                        else:
-                            # It's an ID (standard fallback)
-                            top = self.sp.artist_top_tracks(a_seed, country='US')
-                            if top['tracks']:
-                                for t in top['tracks']:
-                                    recs.append(self._format_track(t))
-                            else:
-                                # Fallback: Search by Name if ID fails
-                                artist_info = self.sp.artist(a_seed)
-                                q = f"artist:{artist_info['name']}"
-                                results = self.sp.search(q=q, type='track', limit=10)
-                                for t in results['tracks']['items']:
-                                    recs.append(self._format_track(t))
-                    except Exception as e:
-                        print(f"Artist search error for {a_seed}: {e}")
-                        pass
-
-            # Strategy C: Tracks -> Artists -> Top Tracks
-            if tracks:
-                # Fetch full track info to get artist IDs
-                try:
-                    full_tracks = self.sp.tracks(tracks[:5])
-                    artist_ids = set()
-                    for t in full_tracks['tracks']:
-                        if t and t['artists']:
-                            artist_ids.add(t['artists'][0]['id'])
-                    
-                    for a_id in list(artist_ids)[:3]:
-                        try:
-                            top = self.sp.artist_top_tracks(a_id, country='US')
-                            for t in top['tracks']:
-                                recs.append(self._format_track(t))
-                        except:
-                            pass
-                except:
-                    pass
-
-            # If still empty, Ultimate Fallback: Search "Pop"
-            if not recs:
-                results = self.sp.search(q="genre:pop", type='track', limit=20)
+                        if not (self.exclusion and self.exclusion.is_known(t['id'])):
+                            new += 1
+                usable += new
+                strategy_stats.observe(name, time.perf_counter() - started, new, calls=1 + lookups)
+            if usable >= limit:
+                break
+
+        # If still empty, Ultimate Fallback: Search "Pop"
+        if not recs and not self._out_of_time():
+            try:
+                results = self._catalog('search', q="genre:pop", type='track', limit=20)
                 for t in results['tracks']['items']:
                     recs.append(self._format_track(t))
+            except Exception as e:
+                print(f"Search Fallback failed: {e}")
 
-            # Shuffle and return unique tracks
-            random.shuffle(recs)
-            # Deduplicate by ID
-            unique_recs = []
-            seen_ids = set()
-            for r in recs:
-                if r['id'] not in seen_ids:
-                    unique_recs.append(r)
-                    seen_ids.add(r['id'])
-            
-            return unique_recs[:limit]
+        # Shuffle for variety (already de-duplicated)
+        random.shuffle(recs)
+        return self._finalize(recs, limit, record)
 
-        except Exception as e:
-            print(f"Search Fallback failed: {e}")
-            return []
+    # Fallback strategies: generators yielding the raw track items of one upstream call at a time
+    # (bulk ID lookups they make along the way are counted by the driver from loader.calls)
+
+    def _genre_search_calls(self, genres):
+        for g in genres:
+            pool = get_feed(f"genre_pool:{g}") if self.global_feeds else None
+            if pool:
+                # Pre-fetched pool (FEED_GENRES): a random slice for variety, no upstream call
+                yield random.sample(pool, min(20, len(pool)))
+                continue
+            try:
+                # Search for tracks in this genre with a random offset for variety
+                offset = random.randint(0, 50)
+                yield self._catalog('search', q=f"genre:{g}", type='track', limit=20, offset=offset)['tracks']['items']
+            except Exception as e:
+                print(f"Genre search error for {g}: {e}")
+                yield []
+
+    def _artist_name_calls(self, names):
+        # Name-based seeds (from Sonic Multiverse): field search first, general search if it finds nothing
+        for artist_name in names:
+            try:
+                items = self._catalog('search', q=f"artist:{artist_name}", type='track', limit=10)['tracks']['items']
+            except Exception as e:
+                print(f"Artist search error for {artist_name}: {e}")
+                items = []
+            yield items
+            if not items:
+                try:
+                    print(f"Specific search failed, trying general: {artist_name}")
+                    yield self._catalog('search', q=artist_name, type='track', limit=10)['tracks']['items']
+                except Exception as e:
+                    print(f"General search error for {artist_name}: {e}")
+                    yield []
+
+    def _artist_top_track_calls(self, artist_ids):
+        # Names are only needed for the fallback; queued now, they arrive in one bulk call if any is
+        self.loader.prime('artists', artist_ids)
+        for a_id in artist_ids:
+            try:
+                items = self._catalog('artist_top_tracks', artist_id=a_id, country='US')['tracks']
+            except Exception as e:
+                print(f"Artist top tracks error for {a_id}: {e}")
+                items = []
+            yield items
+            if not items:
+                # Fallback: Search by Name if ID fails
+                try:
+                    artist_info = self.loader.get('artists', a_id)
+                    if artist_info:
+                        yield self._catalog('search', q=f"artist:{artist_info['name']}", type='track', limit=10)['tracks']['items']
+                except Exception as e:
+                    print(f"Artist search error for {a_id}: {e}")
+                    yield []
+
+    def _track_artist_calls(self, track_ids):
+        # Tracks -> Artists -> Top Tracks
+        full_tracks = self.loader.get_many('tracks', track_ids[:5])
+        artist_ids = list(dict.fromkeys(t['artists'][0]['id'] for t in full_tracks if t and t['artists']))
+        for a_id in artist_ids[:3]:
+            try:
+                yield self._catalog('artist_top_tracks', artist_id=a_id, country='US')['tracks']
+            except Exception:
+                yield []
 
-    def search_decade(self, start_year, end_year, limit=10):
+    def search_decade(self, start_year, end_year, limit=10, record=True):
         query = f"year:{start_year}-{end_year}"
         try:
-            results = self.sp.search(q=query, type='track', limit=limit)
-            return [self._format_track(t) for t in results['tracks']['items']]
+            results = self._catalog('search', q=query, type='track', limit=self._candidate_limit(limit))
+            return self._finalize([self._format_track(t) for t in results['tracks']['items']], limit, record)
         except Exception:
             return []
 
@@ -268,6 +488,25 @@ class SpotifyClient:
             'total_sources': len(seed_tracks) + len(seed_artists)
         }
 
+    def build_mood_pool(self, pool_size=MOOD_POOL_SIZE):
+        """
+        One Mood Tuner session's candidates: untuned recommendations from the user's
+        mixed seeds plus their valence/energy, fetched once. Re-ranking the returned
+        MoodPool for a new slider position needs no further Spotify calls.
+        """
+        seeds = self.get_mixed_seeds()
+        kwargs = {k: seeds[k] for k in ('seed_tracks', 'seed_artists') if seeds[k]}
+        if not kwargs:
+            kwargs['seed_genres'] = ['pop']
+        tracks = self.get_recommendations(limit=pool_size, record=False, **kwargs)
+
+        features = np.full((len(tracks), len(MOOD_FEATURES)), np.nan)
+        pos = {t['id']: i for i, t in enumerate(tracks)}
+        for f in self.get_audio_features(list(pos)):
+            if f:
+                features[pos[f['id']]] = [f.get(k) or 0.0 for k in MOOD_FEATURES]
+        return MoodPool(tracks, features)
+
     def get_audio_profile(self):
         """
         Analyzes user's top tracks to create an audio profile.
@@ -282,7 +521,7 @@ class SpotifyClient:
                 return None
             
             # Get audio features for these tracks
-            features = self.sp.audio_features(track_ids)
+            features = self.get_audio_features(track_ids)
             
             # Calculate averages
             valid_features = [f for f in features if f is not None]
@@ -309,6 +548,93 @@ class SpotifyClient:
             print(f"Failed to get audio profile: {e}")
             return None
 
+    def get_taste_analytics(self, limit=50):
+        """
+        Compares taste across short/medium/long term in one pass.
+        Top tracks + artists for all three ranges are fetched concurrently, then
+        feature profiles and genre distributions for every range come out of a
+        couple of matrix products over a stacked feature matrix. Drift vectors
+        show how each range differs from the next longer one.
+        """
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            track_futures = {tr: pool.submit(self.sp.current_user_top_tracks, limit=limit, time_range=tr) for tr in TIME_RANGES}
+            artist_futures = {tr: pool.submit(self.sp.current_user_top_artists, limit=limit, time_range=tr) for tr in TIME_RANGES}
+            top_tracks = {tr: self._result_items(f) for tr, f in track_futures.items()}
+            top_artists = {tr: self._result_items(f) for tr, f in artist_futures.items()}
+
+        # Unique tracks across ranges -> one feature lookup per 100 IDs (chunks fetched in parallel)
+        track_ids = list(dict.fromkeys(t['id'] for tr in TIME_RANGES for t in top_tracks[tr] if t and t.get('id')))
+        features = self.get_audio_features(track_ids)
+
+        track_pos = {tid: i for i, tid in enumerate(track_ids)}
+        n_ranges = len(TIME_RANGES)
+
+        # Stacked feature matrix (tracks x features) + range membership mask (ranges x tracks)
+        F = np.zeros((len(track_ids), len(PROFILE_FEATURES)))
+        has_features = np.zeros(len(track_ids), dtype=bool)
+        for feat in features:
+            if feat and feat.get('id') in track_pos:
+                i = track_pos[feat['id']]
+                F[i] = [feat.get(k) or 0.0 for k in PROFILE_FEATURES]
+                has_features[i] = True
+        M = np.zeros((n_ranges, len(track_ids)))
+        for r, tr in enumerate(TIME_RANGES):
+            for t in top_tracks[tr]:
+                if t and t.get('id') in track_pos:
+                    M[r, track_pos[t['id']]] = 1.0
+        M_valid = M * has_features
+        counts = M_valid.sum(axis=1)
+        profiles = (M_valid @ F) / np.maximum(counts, 1)[:, None]
+
+        # Genre distributions: (ranges x artists) @ (artists x genres)
+        genres = sorted({g for tr in TIME_RANGES for a in top_artists[tr] for g in a.get('genres', [])})
+        genre_pos = {g: i for i, g in enumerate(genres)}
+        artist_ids = list(dict.fromkeys(a['id'] for tr in TIME_RANGES for a in top_artists[tr]))
+        artist_pos = {aid: i for i, aid in enumerate(artist_ids)}
+        A = np.zeros((len(artist_ids), len(genres)))
+        R = np.zeros((n_ranges, len(artist_ids)))
+        for r, tr in enumerate(TIME_RANGES):
+            for a in top_artists[tr]:
+                R[r, artist_pos[a['id']]] = 1.0
+                A[artist_pos[a['id']], [genre_pos[g] for g in a.get('genres', [])]] = 1.0
+        genre_counts = R @ A
+        genre_dist = genre_counts / np.maximum(genre_counts.sum(axis=1, keepdims=True), 1)
+
+        def scaled(vec):
+            return {k: (round(float(v)) if k == 'tempo' else round(float(v) * 100)) for k, v in zip(PROFILE_FEATURES, vec)}
+
+        ranges = {}
+        for r, tr in enumerate(TIME_RANGES):
+            top_idx = np.argsort(-genre_counts[r], kind='stable')[:10]
+            ranges[tr] = {
+                'profile': scaled(profiles[r]) if counts[r] else None,
+                'tracks_analyzed': int(counts[r]),
+                'top_genres': [(genres[i], int(genre_counts[r, i])) for i in top_idx if genre_counts[r, i] > 0],
+            }
+
+        drift = {}
+        for newer, older in (('short_term', 'medium_term'), ('medium_term', 'long_term'), ('short_term', 'long_term')):
+            a, b = TIME_RANGES.index(newer), TIME_RANGES.index(older)
+            delta = genre_dist[a] - genre_dist[b]
+            order = np.argsort(delta, kind='stable')
+            drift[f'{newer}_vs_{older}'] = {
+                'profile': scaled(profiles[a] - profiles[b]) if counts[a] and counts[b] else None,
+                # Total variation distance between the two genre distributions (0 = same, 1 = disjoint)
+                'genre_shift': round(float(0.5 * np.abs(delta).sum()), 3),
+                'rising_genres': [genres[i] for i in order[::-1][:5] if delta[i] > 0],
+                'fading_genres': [genres[i] for i in order[:5] if delta[i] < 0],
+            }
+
+        return {'ranges': ranges, 'drift': drift}
+
+    def _result_items(self, future):
+        try:
+            return future.result()['items']
+        except Exception as e:
+            print(f"Failed to fetch analytics input: {e}")
+            self.failures += 1
+            return []
+
     def get_listening_stats(self):
         """
         Returns comprehensive listening statistics.
@@ -332,11 +658,12 @@ class SpotifyClient:
                 stats['top_track'] = {
                     'name': t['name'],
                     'artist': t['artists'][0]['name'] if t['artists'] else 'Unknown',
-                    'image_url': t['album']['images'][0]['url'] if t['album']['images'] else None,
+                    'image_url': self._image(t['album']['images']),
                     'external_url': t['external_urls']['spotify']
                 }
         except Exception as e:
             print(f"Failed to get top tracks stats: {e}")
+            self.failures += 1
         
         try:
             # Top artists count and genres
@@ -355,19 +682,20 @@ class SpotifyClient:
                 a = top_artists['items'][0]
                 stats['top_artist'] = {
                     'name': a['name'],
-                    'image_url': a['images'][0]['url'] if a['images'] else None,
+                    'image_url': self._image(a['images']),
                     'external_url': a['external_urls']['spotify'],
                     'genres': a['genres'][:3]  # Top 3 genres for this artist
                 }
         except Exception as e:
             print(f"Failed to get top artists stats: {e}")
+            self.failures += 1
         
         try:
             # Liked tracks count (approximate)
             liked = self.sp.current_user_saved_tracks(limit=1)
             stats['total_liked_tracks'] = liked.get('total', 0)
         except Exception:
-            pass
+            self.failures += 1
         
         return stats
 
@@ -378,7 +706,7 @@ class SpotifyClient:
             'artists': [a['name'] for a in track['artists']],
             'preview_url': track['preview_url'],
             'external_url': track['external_urls']['spotify'],
-            'image_url': track['album']['images'][0]['url'] if track['album']['images'] else None,
+            'image_url': self._image(track['album']['images']),
             'uri': track['uri']
         }
 
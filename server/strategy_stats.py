@@ -0,0 +1,51 @@
+import threading
+
+# Weight of the newest observation in the moving averages
+ALPHA = 0.2
+# Strategies with fewer observations than this are tried first (optimistic prior)
+MIN_SAMPLES = 5
+
+
+class StrategyStats:
+    """
+    Process-wide moving averages of each fallback strategy's cost and payoff per
+    upstream call: latency, and how many tracks it contributed that weren't
+    already collected (or known to the user). Used to run the best-yielding
+    strategies first.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def observe(self, name, seconds, new_tracks, calls=1):
+        """One step of a strategy: `calls` upstream calls that took `seconds` and found `new_tracks`."""
+        latency, found = seconds / calls, new_tracks / calls
+        with self._lock:
+            s = self._stats.get(name)
+            if s is None:
+                self._stats[name] = {'calls': calls, 'latency': latency, 'yield': float(found)}
+                return
+            s['calls'] += calls
+            s['latency'] += ALPHA * (latency - s['latency'])
+            s['yield'] += ALPHA * (found - s['yield'])
+
+    def rank(self, name):
+        """Sort key: unexplored strategies first, then most new tracks per call, then fastest."""
+        with self._lock:
+            s = self._stats.get(name)
+            if s is None or s['calls'] < MIN_SAMPLES:
+                return (0, 0.0, 0.0)
+            return (1, -s['yield'], s['latency'])
+
+    def order(self, names):
+        return sorted(names, key=self.rank)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: {'calls': s['calls'], 'latency_ms': round(s['latency'] * 1000, 1),
+                           'tracks_per_call': round(s['yield'], 2)}
+                    for name, s in self._stats.items()}
+
+
+strategy_stats = StrategyStats()
@@ -0,0 +1,38 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from audio_analysis import N_FEATURES, N_MFCC, SAMPLE_RATE, analyze_bytes, decode_audio
+
+
+def _sine_wav(freq, seconds=2.0, sr=SAMPLE_RATE):
+    t = np.arange(int(seconds * sr)) / sr
+    pcm = (0.5 * np.sin(2 * np.pi * freq * t) * 32767).astype('<i2')
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize('freq', [440.0, 1000.0, 3000.0])
+def test_sine_centroid_near_tone(freq):
+    vector = analyze_bytes(_sine_wav(freq))
+    assert vector.shape == (N_FEATURES,)
+    centroid = vector[N_MFCC]
+    assert abs(centroid - freq) / freq < 0.05
+
+
+def test_shape_stable_across_lengths_and_rates():
+    short = analyze_bytes(_sine_wav(440.0, seconds=0.5, sr=44100))
+    long = analyze_bytes(_sine_wav(440.0, seconds=5.0))
+    assert short.shape == long.shape == (N_FEATURES,)
+    assert np.all(np.isfinite(short)) and np.all(np.isfinite(long))
+
+
+def test_undecodable_payload():
+    assert decode_audio(b'') is None
@@ -0,0 +1,42 @@
+import gc
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from auth import AppSpotify, RateBudget
+
+API = 'https://api.spotify.com'
+
+
+class LocalSession(requests.Session):
+    """Answers every request locally; the mounted adapter and its pools are real."""
+
+    def request(self, method, url, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"id": "app"}'
+        response.url = url
+        return response
+
+
+class StaticToken:
+    def get_access_token(self, as_dict=False):
+        return 'app-token'
+
+
+def _shared():
+    session = LocalSession()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    session.mount('https://', adapter)
+    adapter.poolmanager.connection_from_url(API)
+    return {'session': session, 'auth': StaticToken(), 'budget': RateBudget(100, 100)}, adapter
+
+
+def test_pool_survives_per_request_clients():
+    shared, adapter = _shared()
+    for _ in range(3):
+        sp = AppSpotify(shared).fresh()
+        assert sp.me() == {'id': 'app'}
+        del sp
+        gc.collect()
+    assert len(adapter.poolmanager.pools) == 1
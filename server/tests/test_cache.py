@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+
+from cache import TTLCache
+
+
+def _hammer(fn, n=20):
+    threads = [threading.Thread(target=fn) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+@pytest.mark.parametrize('method', ['get_or_set', 'get_or_refresh'])
+def test_concurrent_misses_load_once(method):
+    cache = TTLCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'value'
+
+    _hammer(lambda: getattr(cache, method)('k', loader, ttl=60))
+    assert len(calls) == 1
+    assert cache._key_locks == {}
+
+
+def test_key_lock_released_when_loader_raises():
+    cache = TTLCache()
+
+    def loader():
+        raise RuntimeError('upstream down')
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_set('k', loader)
+    assert cache._key_locks == {}
+    assert cache.get_or_set('k', lambda: 'ok') == 'ok'
+
+
+def test_overflow_drops_oldest_writes():
+    cache = TTLCache(max_entries=3)
+    for k in 'abcd':
+        cache.set(k, k)
+    cache.set('b', 'b2')
+    cache.set('e', 'e')
+    assert list(cache._data) == ['d', 'b', 'e']
+
+
+def test_dead_entries_swept_on_interval(monkeypatch):
+    import cache as cache_module
+    cache = TTLCache()
+    cache.set('old', 1, ttl=-1)
+    cache.set('new', 2)
+    assert 'old' in cache._data
+
+    monkeypatch.setattr(cache_module, 'SWEEP_INTERVAL', 0)
+    cache.set('newer', 3)
+    assert 'old' not in cache._data
+    assert cache.get('new') == 2
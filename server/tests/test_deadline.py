@@ -0,0 +1,71 @@
+import gc
+import time
+
+import pytest
+import requests
+import spotipy
+
+from deadline import MIN_CALL_TIMEOUT, Deadline, DeadlineBoundSpotify, DeadlineExceeded
+
+
+class RecordingSession(requests.Session):
+    """Answers every request locally and records the timeout it was sent with."""
+
+    def __init__(self):
+        super().__init__()
+        self.timeouts = []
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+        super().close()
+
+    def request(self, method, url, **kwargs):
+        self.timeouts.append(kwargs.get('timeout'))
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"id": "me"}'
+        response.url = url
+        return response
+
+
+def test_bounded_call_leaves_raw_client_timeout_alone():
+    session = RecordingSession()
+    raw_sp = spotipy.Spotify(auth='token', requests_session=session, requests_timeout=7)
+    bound = DeadlineBoundSpotify(raw_sp, Deadline(budget_ms=100))
+
+    bound.me()
+    assert session.timeouts[-1] <= 0.1
+    assert raw_sp.requests_timeout == 7
+
+    raw_sp.me()
+    assert session.timeouts[-1] == 7
+
+
+def test_bound_copy_does_not_close_shared_session():
+    session = RecordingSession()
+    raw_sp = spotipy.Spotify(auth='token', requests_session=session)
+    bound = DeadlineBoundSpotify(raw_sp, Deadline(budget_ms=1000))
+    bound.me()
+    del bound
+    gc.collect()
+    assert not session.closed
+
+
+def test_spent_budget_refuses_instead_of_zero_timeout():
+    session = RecordingSession()
+    raw_sp = spotipy.Spotify(auth='token', requests_session=session)
+    deadline = Deadline(budget_ms=1000)
+    bound = DeadlineBoundSpotify(raw_sp, deadline)
+    deadline.expires_at = time.monotonic() + MIN_CALL_TIMEOUT / 2
+
+    with pytest.raises(DeadlineExceeded):
+        bound.me()
+    assert deadline.hit
+    assert session.timeouts == []
+
+
+def test_call_timeout_has_a_floor():
+    deadline = Deadline(budget_ms=1000)
+    deadline.expires_at = time.monotonic() + MIN_CALL_TIMEOUT * 1.01
+    assert deadline.call_timeout() >= MIN_CALL_TIMEOUT
@@ -0,0 +1,34 @@
+import pytest
+
+from genre_index import VALID_SEED_GENRES, genre_index
+
+
+@pytest.mark.parametrize('genre, expected', [
+    ('lo-fi beats', 'chill'),
+    ('lofi', 'chill'),
+    ('new wave', 'synth-pop'),
+    ('new age', 'new-age'),
+    ('neo-psychedelic', 'psych-rock'),
+    ('neo soul', 'soul'),
+    ('nu disco', 'disco'),
+    ('nu jazz', 'jazz'),
+    ('nu metal', 'metal'),
+    ('uk drill', 'hip-hop'),
+    ('r&b', 'r-n-b'),
+    ('indie pop rap', 'indie-pop'),
+    ('synthwave', 'synth-pop'),
+    ('electronica', 'electronic'),
+    ('k-pop', 'k-pop'),
+])
+def test_resolve_best_seed(genre, expected):
+    assert genre_index.resolve(genre)[0] == expected
+
+
+@pytest.mark.parametrize('genre', ['new wave', 'new romantic', 'nu disco', 'neo-psychedelic'])
+def test_no_spurious_seeds(genre):
+    assert not {'new-release', 'new-age', 'metal', 'soul'} & set(genre_index.resolve(genre))
+
+
+def test_resolves_to_valid_seeds():
+    for genre in ('lo-fi beats', 'dark trap', 'trap latino', 'melodic death metal'):
+        assert set(genre_index.resolve(genre)) <= VALID_SEED_GENRES
@@ -1,6 +1,8 @@
 import streamlit as st
+import streamlit.components.v1 as components
+from html import escape
 from auth import SpotifyAuthenticator
-from spotify_client import SpotifyClient
+from spotify_client import SpotifyClient, pick_image
 import base64
 
 # Page Config
@@ -144,9 +146,69 @@ st.markdown("""
 
 from advanced_features import AdvancedFeatureEngine
 
+# --- CACHING ---
+# Streamlit reruns this whole script on every widget interaction, so anything
+# that talks to Spotify goes through these caches. A rerun costs zero upstream calls.
+PROFILE_TTL = 3600     # seconds
+USER_DATA_TTL = 600    # seconds
+
+@st.cache_resource(show_spinner=False)
+def get_authenticator():
+    return SpotifyAuthenticator()
+
+# Cover variant width for grid cards (Spotify serves 640/300/64px; 300 stays sharp at 2x)
+CARD_IMG_SIZE = 300
+
+@st.cache_resource(ttl=PROFILE_TTL, max_entries=100, show_spinner=False)
+def get_spotify(_authenticator, access_token):
+    # Only the spotipy client (token + connection pool) is shared between reruns and sessions
+    return _authenticator.get_spotify_client({'access_token': access_token})
+
+def get_client(authenticator, access_token):
+    """
+    A fresh SpotifyClient per script run: its BatchLoader memo and failure flags
+    are request-scoped and must not be shared by concurrent sessions.
+    """
+    sp = get_spotify(authenticator, access_token)
+    # Catalog lookups go out on the app token (shared pool, rate budget and cache across users)
+    return SpotifyClient(sp, img_size=CARD_IMG_SIZE, catalog_sp=authenticator.get_app_client())
+
+@st.cache_data(ttl=PROFILE_TTL, max_entries=100, show_spinner=False)
+def fetch_profile(access_token, _client):
+    return _client.get_user_profile()
+
+@st.cache_data(ttl=USER_DATA_TTL, max_entries=1000, show_spinner=False)
+def fetch_user_data(user_id, generation, method, args, _client):
+    # `generation` is bumped by the Refresh button, which moves this user onto fresh keys
+    return getattr(_client, method)(*args)
+
+class CachedClient:
+    """
+    Wraps SpotifyClient so per-user reads are memoized (keyed by user ID).
+    Anything not in CACHED_METHODS passes straight through.
+    """
+    CACHED_METHODS = {
+        'get_top_genres', 'get_top_artists', 'get_top_tracks',
+        'get_new_releases', 'get_liked_tracks'
+    }
+
+    def __init__(self, client, user_id):
+        self._client = client
+        self._user_id = user_id
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name not in self.CACHED_METHODS:
+            return attr
+
+        def cached_call(*args):
+            generation = st.session_state.get("cache_generation", 0)
+            return fetch_user_data(self._user_id, generation, name, args, self._client)
+        return cached_call
+
 def main():
     try:
-        authenticator = SpotifyAuthenticator()
+        authenticator = get_authenticator()
     except ValueError as e:
         st.error(f"Config Error: {e}")
         return
@@ -168,10 +230,12 @@ def main():
         show_login(authenticator)
     else:
         try:
-            sp = authenticator.get_spotify_client(st.session_state["token"])
-            client = SpotifyClient(sp)
+            access_token = st.session_state["token"]["access_token"]
+            raw_client = get_client(authenticator, access_token)
+            user = fetch_profile(access_token, raw_client)
+            client = CachedClient(raw_client, user['id'])
             engine = AdvancedFeatureEngine(client)
-            show_app(client, engine)
+            show_app(client, engine, user)
 
         except Exception as e:
             st.error(f"Session Expired or Error: {e}")
@@ -197,13 +261,11 @@ def show_login(auth):
         st.markdown("<br>", unsafe_allow_html=True)
         st.link_button("CONNECT SPOTIFY", auth.get_auth_url(), use_container_width=True)
 
-def show_app(client, engine):
-    user = client.get_user_profile()
-    
+def show_app(client, engine, user):
     with st.sidebar:
         st.markdown(f"""
         <div style="display: flex; align-items: center; gap: 15px; padding: 20px 0; border-bottom: 1px solid #222; margin-bottom: 20px;">
-            <img src="{user['images'][0]['url'] if user['images'] else 'https://via.placeholder.com/50'}" 
+            <img src="{pick_image(user['images'], 100) or 'https://via.placeholder.com/50'}" 
                  style="width: 50px; height: 50px; border-radius: 50%; border: 2px solid #1DB954;">
             <div style="font-weight: 600;">{user['display_name']}</div>
         </div>
@@ -216,6 +278,9 @@ def show_app(client, engine):
         page = st.radio("MENU", menu_options, label_visibility="collapsed")
         
         st.markdown("<br><br>", unsafe_allow_html=True)
+        if st.button("Refresh Data"):
+            st.session_state["cache_generation"] = st.session_state.get("cache_generation", 0) + 1
+            st.rerun()
         if st.button("Logout"):
             st.session_state.pop("token", None)
             import os
@@ -244,16 +309,7 @@ def show_app(client, engine):
         st.subheader("Your Top Artists")
         top_artists = client.get_top_artists(5)
         if top_artists:
-            cols = st.columns(5)
-            for i, artist in enumerate(top_artists):
-                with cols[i]:
-                    img_url = artist['image_url'] if artist['image_url'] else "https://via.placeholder.com/150"
-                    st.markdown(f"""
-                    <div style="text-align: center;">
-                        <img src="{img_url}" style="width: 100px; height: 100px; border-radius: 50%; object-fit: cover; border: 2px solid #333;">
-                        <div style="margin-top: 10px; font-weight: 600; font-size: 14px;">{artist['name']}</div>
-                    </div>
-                    """, unsafe_allow_html=True)
+            render_artist_row(top_artists)
         else:
             st.info("No top artists found yet.")
 
@@ -269,21 +325,7 @@ def show_app(client, engine):
         st.subheader("New Releases")
         new_releases = client.get_new_releases(4)
         if new_releases:
-            cols = st.columns(4)
-            for i, album in enumerate(new_releases):
-                with cols[i % 4]:
-                     img_url = album['image_url'] if album['image_url'] else "https://via.placeholder.com/300"
-                     st.markdown(f"""
-                     <div class="track-card">
-                        <div class="img-container">
-                            <img src="{img_url}">
-                        </div>
-                        <div class="track-title" title="{album['name']}">{album['name']}</div>
-                        <div class="track-artist" title="{', '.join(album['artists'])}">{', '.join(album['artists'])}</div>
-                        <div style="font_size: 12px; color: #888; margin-top: 5px;">{album['release_date']}</div>
-                        <a href="{album['external_url']}" target="_blank" class="play-btn">OPEN SPOTIFY</a>
-                     </div>
-                     """, unsafe_allow_html=True)
+            render_album_grid(new_releases)
 
         st.markdown("<br>", unsafe_allow_html=True)
 
@@ -305,10 +347,12 @@ def show_app(client, engine):
         col1, col2 = st.columns(2)
         with col1: val = st.slider("Sad <-> Happy", 0.0, 1.0, 0.5)
         with col2: en = st.slider("Chill <-> Hype", 0.0, 1.0, 0.5)
-        if st.button("TUNE IN"):
-            seeds = [t['id'] for t in client.get_liked_tracks(50)]
-            recs = client.get_recommendations(seeds, target_valence=val, target_energy=en, limit=12)
-            render_track_grid(recs)
+        # The pool is fetched once per session; slider reruns only re-rank it locally
+        if st.button("TUNE IN" if 'mood_pool' not in st.session_state else "REFRESH MIX"):
+            with st.spinner("Tuning..."):
+                st.session_state['mood_pool'] = client.build_mood_pool()
+        if 'mood_pool' in st.session_state:
+            render_track_grid(st.session_state['mood_pool'].rank(val, en))
 
     elif page == "Time Travel":
         st.title("Time Travel")
@@ -352,34 +396,95 @@ def show_app(client, engine):
             recs = client.get_recommendations(seed_genres=seed_genres, limit=12, **params)
             render_track_grid(recs)
 
+# --- GRID RENDERING ---
+# Each grid is sent as ONE html component instead of an st.markdown/st.audio
+# element per card, so a 50-track grid is a single delta over the websocket.
+# Components render in an iframe, so the card styles are inlined here.
+GRID_CSS = """
+<style>
+    body { margin: 0; font-family: 'Inter', sans-serif; color: #FFFFFF; background: transparent; }
+    .grid { display: grid; grid-template-columns: repeat(var(--cols), minmax(0, 1fr)); gap: 16px; }
+    .track-card {
+        background: rgba(255, 255, 255, 0.03);
+        border: 1px solid rgba(255, 255, 255, 0.05);
+        border-radius: 16px;
+        padding: 16px;
+        display: flex;
+        flex-direction: column;
+        gap: 12px;
+        transition: all 0.3s ease;
+    }
+    .track-card:hover { background: rgba(255, 255, 255, 0.08); border-color: rgba(29, 185, 84, 0.3); }
+    .img-container { position: relative; width: 100%; padding-top: 100%; border-radius: 12px; overflow: hidden; background: #121212; }
+    .img-container img { position: absolute; top: 0; left: 0; width: 100%; height: 100%; object-fit: cover; }
+    .track-title { font-weight: 600; font-size: 15px; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+    .track-artist { font-size: 13px; color: #b3b3b3; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+    .track-meta { font-size: 12px; color: #888; }
+    .play-btn {
+        margin-top: auto; background: rgba(255,255,255,0.1); color: #1DB954; text-align: center;
+        padding: 8px; border-radius: 8px; font-size: 12px; font-weight: 700; text-decoration: none; display: block;
+    }
+    .play-btn:hover { background: rgba(255,255,255,0.2); }
+    audio { width: 100%; height: 32px; }
+    .artist { text-align: center; }
+    .artist img { width: 100px; height: 100px; border-radius: 50%; object-fit: cover; border: 2px solid #333; }
+    .artist-name { margin-top: 10px; font-weight: 600; font-size: 14px; }
+</style>
+"""
+
+def render_html_grid(cards, columns, row_height):
+    """Renders pre-built card HTML as a single component."""
+    rows = (len(cards) + columns - 1) // columns
+    html = f"""{GRID_CSS}<div class="grid" style="--cols: {columns};">{''.join(cards)}</div>"""
+    components.html(html, height=rows * row_height + (rows - 1) * 16 + 8)
+
+def _card_html(title, subtitle, image_url, external_url, link_label, meta=None, preview_url=None):
+    img_url = escape(image_url or "https://via.placeholder.com/300")
+    title, subtitle = escape(title), escape(subtitle)
+    # loading="lazy" / preload="none": nothing is downloaded until it's on screen or played
+    meta_html = f'<div class="track-meta">{escape(meta)}</div>' if meta else ''
+    audio_html = f'<audio controls preload="none" src="{escape(preview_url)}"></audio>' if preview_url else ''
+    return f"""
+<div class="track-card">
+    <div class="img-container"><img src="{img_url}" loading="lazy" decoding="async"></div>
+    <div class="track-title" title="{title}">{title}</div>
+    <div class="track-artist" title="{subtitle}">{subtitle}</div>
+    {meta_html}
+    <a href="{escape(external_url)}" target="_blank" class="play-btn">{link_label}</a>
+    {audio_html}
+</div>"""
+
 def render_track_grid(tracks):
     if not tracks:
         st.info("No tracks found.")
         return
 
-    # Create a 4-column grid
-    cols = st.columns(4)
-    for i, t in enumerate(tracks):
-        col = cols[i % 4]
-        with col:
-            img_url = t['image_url'] if t['image_url'] else "https://via.placeholder.com/300"
-            
-            # Use flat string for HTML to avoid indentation issues
-            html = f"""
-<div class="track-card">
-    <div class="img-container">
-        <img src="{img_url}">
-    </div>
-    <div class="track-title" title="{t['name']}">{t['name']}</div>
-    <div class="track-artist" title="{', '.join(t['artists'])}">{', '.join(t['artists'])}</div>
-    <a href="{t['external_url']}" target="_blank" class="play-btn">OPEN IN SPOTIFY</a>
-</div>
-"""
-            st.markdown(html, unsafe_allow_html=True)
-            
-            # Optional: Add native audio player below card if preview exists
-            if t['preview_url']:
-                st.audio(t['preview_url'], format='audio/mp3')
+    cards = [
+        _card_html(t['name'], ', '.join(t['artists']), t['image_url'], t['external_url'],
+                   "OPEN IN SPOTIFY", preview_url=t.get('preview_url'))
+        for t in tracks
+    ]
+    has_audio = any(t.get('preview_url') for t in tracks)
+    render_html_grid(cards, columns=4, row_height=420 if has_audio else 380)
+
+def render_album_grid(albums):
+    cards = [
+        _card_html(a['name'], ', '.join(a['artists']), a['image_url'], a['external_url'],
+                   "OPEN SPOTIFY", meta=a['release_date'])
+        for a in albums
+    ]
+    render_html_grid(cards, columns=4, row_height=400)
+
+def render_artist_row(artists):
+    cards = [
+        f"""
+<div class="artist">
+    <img src="{escape(a['image_url'] or 'https://via.placeholder.com/150')}" loading="lazy" decoding="async">
+    <div class="artist-name">{escape(a['name'])}</div>
+</div>"""
+        for a in artists
+    ]
+    render_html_grid(cards, columns=5, row_height=150)
 
 if __name__ == "__main__":
     main()